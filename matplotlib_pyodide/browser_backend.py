@@ -1,10 +1,36 @@
+import asyncio
+import logging
 import math
-
-from js import document
-from matplotlib.backend_bases import FigureCanvasBase, NavigationToolbar2, TimerBase
-
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+from js import Object, document
+from matplotlib.axes import Axes
+from matplotlib.backend_bases import (
+    DrawEvent,
+    FigureCanvasBase,
+    KeyEvent,
+    LocationEvent,
+    MouseEvent,
+    NavigationToolbar2,
+    ResizeEvent,
+    TimerBase,
+)
+from matplotlib.colors import to_hex
+from matplotlib.layout_engine import PlaceHolderLayoutEngine
+from matplotlib.lines import Line2D
+from matplotlib.text import Text
+from matplotlib.transforms import Bbox
+
+from matplotlib_pyodide.pool import pool
+from matplotlib_pyodide.profiling import RenderProfiler
+from matplotlib_pyodide.scheduler import scheduler
+from matplotlib_pyodide.streaming import StreamingLine
+from pyodide.ffi import create_proxy, to_js
 from pyodide.ffi.wrappers import (
-    add_event_listener,
     clear_interval,
     clear_timeout,
     set_interval,
@@ -16,10 +42,125 @@ try:
 except ImportError:
     DEVICE_PIXEL_RATIO = 1
 
+try:
+    from js import ResizeObserver
+except ImportError:
+    ResizeObserver = None
+
+try:
+    from js import IntersectionObserver
+except ImportError:
+    IntersectionObserver = None
+
+try:
+    from js import cancelAnimationFrame, requestAnimationFrame
+except ImportError:
+    cancelAnimationFrame = requestAnimationFrame = None
+
+_log = logging.getLogger(__name__)
+
+# All the canvases alive in Python, destroyed or not, for `get_live_proxies`
+_canvases = weakref.WeakSet()
+
+
+def _get_ink_bbox(artist, renderer):
+    # The display region *artist* draws on, padded for the antialiasing, or
+    # None if it draws nothing
+    if not artist.get_visible():
+        return None
+    bbox = artist.get_tightbbox(renderer)
+    if bbox is None or not np.isfinite(bbox.bounds).all():
+        return None
+    return bbox.padded(2)
+
+
+def _get_drawing_order(parent, patch):
+    # The children of a Figure or Axes *parent* but its background *patch*,
+    # in the order they are drawn
+    return sorted(
+        (
+            artist
+            for artist in parent.get_children()
+            if artist is not patch and not artist.get_animated()
+        ),
+        key=lambda artist: artist.get_zorder(),
+    )
+
+
+def _line_overlaps(line, bbox, renderer):
+    # Whether the *line* draws over the display *bbox*, which is finer than
+    # comparing their extents for the long lines of live plots
+    if not line.get_visible():
+        return False
+    pad = renderer.points_to_pixels(
+        max(line.get_linewidth(), line.get_markersize()) / 2 + 1
+    )
+    path = line.get_transform().transform_path(line.get_path())
+    return path.intersects_bbox(bbox.padded(pad), filled=False)
+
+
+def _draws_nothing(artist):
+    # E.g. the empty titles of an Axes, which are not drawn, and stay stale
+    return not artist.get_visible() or (
+        isinstance(artist, Text) and not artist.get_text()
+    )
+
+
+def get_live_proxies():
+    """
+    Returns the number of live JavaScript proxies held by each figure canvas,
+    as a dict mapping the canvas id to the counts returned by
+    `FigureCanvasWasm.get_live_proxies`. Figures without live proxies are
+    left out, so that a destroyed figure appearing here is a leak.
+    """
+    live = {}
+    for canvas in list(_canvases):
+        proxies = canvas.get_live_proxies()
+        if proxies:
+            live[canvas._id] = proxies
+    return live
+
 
 class FigureCanvasWasm(FigureCanvasBase):
     supports_blit = False
 
+    # Time (in ms) the figure container has to keep the same size before the
+    # figure is re-rendered at that size. Until then, the last rendered frame
+    # is stretched to fit using CSS.
+    resize_debounce = 100
+
+    # Whether pan/zoom drags transform the last rendered frame instead of
+    # re-rendering the figure on every mouse move. The figure is rendered
+    # once at full quality when the mouse button is released.
+    bitmap_interaction = True
+
+    # Whether repeating timers, such as the ones driving animations, are
+    # aligned on the animation frames (see `TimerWasm`).
+    frame_aligned_timers = False
+
+    # Whether a redraw only re-renders the stale Axes of the figure, over their
+    # region of the last frame, when nothing else in the figure changed (see
+    # `_plan_incremental_draw`), and only draws the points appended to the
+    # `StreamingLine` artists of the figure over the last frame when only these
+    # changed (see `_plan_append_draw`).
+    incremental_draw = True
+
+    # Layered mode: whether the animated artists (``artist.set_animated(True)``)
+    # are drawn on a separate canvas stacked over the figure. The figure
+    # canvas, the background, is then only redrawn when the figure is stale
+    # or resized, and redrawing the animated artists only redraws the top
+    # canvas. As with blitting, the animated artists do not mark the figure
+    # stale when they change.
+    layered = False
+
+    # Time-sliced drawing: whether the idle redraws draw the figure one
+    # top-level artist (e.g. one Axes) at a time, yielding to the browser
+    # event loop every `draw_slice_budget` ms, and showing the partially drawn
+    # figure in the meantime. A newer redraw request cancels the one in
+    # progress. Explicit `draw()` calls are still synchronous.
+    time_sliced_draw = False
+    draw_slice_budget = 10
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -27,9 +168,41 @@ class FigureCanvasWasm(FigureCanvasBase):
         self._id = "matplotlib_" + hex(id(self))[2:]
         self._title = ""
         self._ratio = 1
-        matplotlib_figure_styles = self._add_matplotlib_styles()
+        self._resize_observer = None
+        self._resize_proxy = None
+        self._resize_timer = None
+        self._pending_size = None
+        self._interaction = None
+        self._event_listeners = []
+        self._last_mouse_xy = (None, None)
+        self._input_frame = None
+        self._input_frame_proxy = None
+        self._pending_mousemove = None
+        self._pending_scroll_event = None
+        self._pending_scroll_steps = 0
+        self._profiler = None
+        self._hovered = False
+        self._focused = False
+        self._in_viewport = True
+        self._page_visible = True
+        self._stale = False
+        self._intersection_pending = False
+        self._intersection_observer = None
+        self._intersection_proxy = None
+        self._timers = weakref.WeakSet()
+        self._destroyed = False
+        self._elements = None
+        self._contexts = {}
+        self._cursor = None
+        self._layout = None
+        self._frame_key = None
+        self._streams = {}
+        self._undrawn = set()
+        self._sliced_draw = None
+        self._frame_waiters = []
+        _canvases.add(self)
         if document.getElementById("matplotlib-figure-styles") is None:
-            document.head.appendChild(matplotlib_figure_styles)
+            document.head.appendChild(self._add_matplotlib_styles())
 
     def _add_matplotlib_styles(self):
         toolbar_buttons_css_content = """
@@ -65,12 +238,31 @@ class FigureCanvasWasm(FigureCanvasBase):
 
     def get_element(self, name):
         """
-        Looks up an HTMLElement created for this figure.
+        Returns an HTMLElement created for this figure, or None if the figure
+        is not shown.
+
+        The elements are held by the canvas from `show` to `destroy`, instead
+        of being looked up in the document on every use. Only references to
+        the JavaScript objects are kept, they need no explicit release.
+        """
+        if self._elements is None:
+            return None
+        return self._elements.get(name)
+
+    def get_context(self, name="canvas"):
+        """
+        Returns the 2D context of the canvas element *name* of this figure,
+        or None if the figure is not shown. Like the elements, the contexts
+        are cached until `destroy`. Resizing a canvas resets the state of
+        its context, but not its identity.
         """
-        # TODO: Should we store a reference here instead of always looking it
-        # up? I'm a little concerned about weird Python/JS
-        # cross-memory-management issues...
-        return document.getElementById(self._id + name)
+        context = self._contexts.get(name)
+        if context is None:
+            element = self.get_element(name)
+            if element is None:
+                return None
+            context = self._contexts[name] = element.getContext("2d")
+        return context
 
     def get_dpi_ratio(self, context):
         """
@@ -95,16 +287,35 @@ class FigureCanvasWasm(FigureCanvasBase):
         # just reuse it and scroll to the existing one.
         existing = self.get_element("")
         if existing is not None:
+            if not existing.isConnected:
+                # The figure was removed from the page, e.g. by clearing a
+                # notebook cell output
+                mpl_target = getattr(document, "pyodideMplTarget", document.body)
+                mpl_target.appendChild(existing)
             self.draw_idle()
             existing.scrollIntoView()
             return
 
-        # Disable the right-click context menu.
-        # Doesn't work in all browsers.
-        def ignore(event):
-            event.preventDefault()
-            return False
+        # Reuse the elements of a destroyed figure if there are some
+        width, height = self.get_width_height()
+        size = (int(width * DEVICE_PIXEL_RATIO), int(height * DEVICE_PIXEL_RATIO))
+        elements = pool.take_elements(self._pool_kind(), size)
+        if elements is None:
+            elements = self._create_elements()
+        else:
+            self._reuse_elements(elements)
+        self._elements = elements
+        self._connect_elements(elements)
+
+    def _pool_kind(self):
+        # Figures with different toolbars have different DOM structures
+        return type(self.toolbar) if self.toolbar is not None else None
 
+    def _create_elements(self):
+        """
+        Creates the DOM elements of the figure, and returns them as a dict
+        mapping the names used by `get_element` to the elements.
+        """
         # Create the main canvas and determine the physical to logical pixel
         # ratio
         canvas = document.createElement("canvas")
@@ -115,7 +326,6 @@ class FigureCanvasWasm(FigureCanvasBase):
         width *= self._ratio
         height *= self._ratio
         div = self._create_root_element()
-        add_event_listener(div, "contextmenu", ignore)
         div.setAttribute(
             "style",
             "margin: 0 auto; text-align: center;" + f"width: {width / self._ratio}px",
@@ -133,9 +343,52 @@ class FigureCanvasWasm(FigureCanvasBase):
         #   - The bottom for rendering matplotlib content
         #   - The top for rendering interactive elements, such as the zoom
         #     rubberband
+        # The container can be resized by the user (see `resize_debounce`).
         canvas_div = document.createElement("div")
-        canvas_div.setAttribute("style", "position: relative")
+        canvas_div.id = self._id + "container"
+        canvas_div.setAttribute(
+            "style",
+            "position: relative; resize: both; overflow: hidden; "
+            + "width: {}px; height: {}px".format(
+                width / self._ratio, height / self._ratio
+            ),
+        )
+
+        elements = self._create_canvases(canvas_div, canvas, width, height)
+        div.appendChild(canvas_div)
+
+        # The bottom bar, with toolbar and message display
+        bottom = document.createElement("div")
+
+        # Check if toolbar exists before trying to get its element
+        # c.f. https://github.com/pyodide/pyodide/pull/4510
+        toolbar = toolbar_buttons = None
+        if self.toolbar is not None:
+            toolbar, toolbar_buttons = self.toolbar._create_element()
+            bottom.appendChild(toolbar)
 
+        message = document.createElement("div")
+        message.id = self._id + "message"
+        message.setAttribute("style", "min-height: 1.5em")
+        bottom.appendChild(message)
+        div.appendChild(bottom)
+
+        return {
+            "": div,
+            "top": top,
+            "container": canvas_div,
+            **elements,
+            "message": message,
+            "toolbar": toolbar,
+            "toolbar_buttons": toolbar_buttons,
+        }
+
+    def _create_canvases(self, container, canvas, width, height):
+        """
+        Adds the canvases the figure is rendered on to the *container* div,
+        and returns them by name. *canvas* is the figure canvas, and *width*
+        and *height* its size in physical pixels.
+        """
         canvas.id = self._id + "canvas"
         canvas.setAttribute("width", width)
         canvas.setAttribute("height", height)
@@ -146,7 +399,7 @@ class FigureCanvasWasm(FigureCanvasBase):
                 width / self._ratio, height / self._ratio
             ),
         )
-        canvas_div.appendChild(canvas)
+        container.appendChild(canvas)
 
         rubberband = document.createElement("canvas")
         rubberband.id = self._id + "rubberband"
@@ -162,55 +415,838 @@ class FigureCanvasWasm(FigureCanvasBase):
         # Canvas must have a "tabindex" attr in order to receive keyboard
         # events
         rubberband.setAttribute("tabindex", "0")
+        container.appendChild(rubberband)
+
+        return {"canvas": canvas, "rubberband": rubberband}
+
+    def _reuse_elements(self, elements):
+        """
+        Adapts the pooled DOM *elements* of a destroyed figure to this one.
+        """
+        canvas = elements["canvas"]
+        self._ratio = self.get_dpi_ratio(canvas.getContext("2d"))
+        css_width, css_height = self.get_width_height()
+        width, height = css_width * self._ratio, css_height * self._ratio
+
+        # The foreground canvas only exists if a layered figure used them
+        canvases = [
+            name for name in ("canvas", "foreground", "rubberband") if name in elements
+        ]
+        for name in ("", "top", "container", "message", *canvases):
+            elements[name].id = self._id + name
+        elements["top"].textContent = self._title
+        elements["message"].textContent = ""
+        elements[""].style.width = f"{css_width}px"
+        for name in ("container", *canvases):
+            elements[name].style.width = f"{css_width}px"
+            elements[name].style.height = f"{css_height}px"
+        for name in canvases:
+            element = elements[name]
+            if element.width != width or element.height != height:
+                # This reallocates and clears the canvas
+                element.setAttribute("width", width)
+                element.setAttribute("height", height)
+            else:
+                element.getContext("2d").clearRect(0, 0, width, height)
+
+        mpl_target = getattr(document, "pyodideMplTarget", document.body)
+        mpl_target.appendChild(elements[""])
+
+    def _connect_elements(self, elements):
+        div = elements[""]
+        rubberband = elements["rubberband"]
+        self._frame_key = None
+        # The figure may be shown again after being destroyed
+        self._destroyed = False
+
+        # Disable the right-click context menu.
+        # Doesn't work in all browsers.
+        def ignore(event):
+            event.preventDefault()
+            return False
+
+        self._add_event_listener(div, "contextmenu", ignore)
+
         # Event handlers are added to the canvas "on top", even though most of
         # the activity happens in the canvas below.
-        # TODO: with 0.2.3, we temporarily disable event listeners for the rubberband canvas.
-        # This shall be revisited in a future release.
-        # add_event_listener(rubberband, "mousemove", self.onmousemove)
-        # add_event_listener(rubberband, "mouseup", self.onmouseup)
-        # add_event_listener(rubberband, "mousedown", self.onmousedown)
-        # add_event_listener(rubberband, "mouseenter", self.onmouseenter)
-        # add_event_listener(rubberband, "mouseleave", self.onmouseleave)
-        # add_event_listener(rubberband, "keyup", self.onkeyup)
-        # add_event_listener(rubberband, "keydown", self.onkeydown)
-        context = rubberband.getContext("2d")
+        # Mouse moves and wheel events are coalesced and dispatched at most
+        # once per animation frame. The other events are dispatched right
+        # away, after any pending coalesced event.
+        self._add_event_listener(
+            rubberband, "mousemove", self._queue_mousemove, passive=True
+        )
+        self._add_event_listener(rubberband, "wheel", self._queue_scroll, passive=True)
+        self._add_event_listener(rubberband, "mouseup", self._flushed(self.onmouseup))
+        self._add_event_listener(
+            rubberband, "mousedown", self._flushed(self.onmousedown)
+        )
+        self._add_event_listener(
+            rubberband, "mouseenter", self._flushed(self.onmouseenter), passive=True
+        )
+        self._add_event_listener(
+            rubberband, "mouseleave", self._flushed(self.onmouseleave), passive=True
+        )
+        self._add_event_listener(rubberband, "keyup", self._flushed(self.onkeyup))
+        self._add_event_listener(rubberband, "keydown", self._flushed(self.onkeydown))
+        self._add_event_listener(rubberband, "focus", self._onfocus, passive=True)
+        self._add_event_listener(rubberband, "blur", self._onblur, passive=True)
+        self._init_rubberband_context()
+
+        if self.toolbar is not None:
+            self.toolbar._connect_buttons(elements["toolbar_buttons"])
+
+        if ResizeObserver is not None:
+            self._resize_proxy = create_proxy(self._on_container_resize)
+            self._resize_observer = ResizeObserver.new(self._resize_proxy)
+            self._resize_observer.observe(elements["container"])
+
+        # Figures that are scrolled out of view or in a hidden tab are not
+        # rendered. Their draws are deferred until they become visible again.
+        self._page_visible = document.visibilityState != "hidden"
+        self._add_event_listener(
+            document, "visibilitychange", self._on_visibility_change
+        )
+        if IntersectionObserver is not None:
+            # The first draw waits for the initial intersection report
+            self._in_viewport = False
+            self._stale = True
+            self._intersection_pending = True
+            self._intersection_proxy = create_proxy(self._on_intersection)
+            self._intersection_observer = IntersectionObserver.new(
+                self._intersection_proxy
+            )
+            self._intersection_observer.observe(div)
+        elif self.is_visible():
+            self.draw()
+        else:
+            self._stale = True
+
+    def _init_rubberband_context(self):
+        # The context state is reset whenever the canvas is resized
+        context = self.get_context("rubberband")
         context.strokeStyle = "#000000"
         context.setLineDash([2, 2])
-        canvas_div.appendChild(rubberband)
 
-        div.appendChild(canvas_div)
+    def _set_css_size(self, width, height):
+        """
+        Sets the displayed size of the figure elements, in logical pixels,
+        without touching the canvas buffers.
+        """
+        div = self.get_element("")
+        if div is not None:
+            div.style.width = f"{width}px"
+        for name in ("container", "canvas", "foreground", "rubberband"):
+            element = self.get_element(name)
+            if element is not None:
+                element.style.width = f"{width}px"
+                element.style.height = f"{height}px"
+
+    def _on_container_resize(self, entries, observer=None):
+        rect = entries[0].contentRect
+        width, height = round(rect.width), round(rect.height)
+        if width <= 0 or height <= 0:
+            # The figure is hidden, keep the current size
+            return
+        if self._pending_size is None and (width, height) == self.get_width_height():
+            return
 
-        # The bottom bar, with toolbar and message display
-        bottom = document.createElement("div")
+        # While the container is still being resized, only stretch the last
+        # frame and postpone the re-rendering until the size settles.
+        self._pending_size = (width, height)
+        self._set_css_size(width, height)
+        if self._resize_timer is not None:
+            clear_timeout(self._resize_timer)
+        self._resize_timer = set_timeout(self._commit_resize, self.resize_debounce)
+
+    def _commit_resize(self):
+        self._resize_timer = None
+        if self._pending_size is None:
+            return
+        width, height = self._pending_size
+        self._pending_size = None
+        self.set_canvas_size(width, height)
 
-        # Check if toolbar exists before trying to get its element
-        # c.f. https://github.com/pyodide/pyodide/pull/4510
-        if self.toolbar is not None:
-            toolbar = self.toolbar.get_element()
-            bottom.appendChild(toolbar)
+    def set_canvas_size(self, width, height):
+        """
+        Resizes the figure to *width* x *height* logical pixels, reallocates
+        the canvas buffers to match and schedules a redraw.
+        """
+        dpi = self.figure.dpi
+        self.figure.set_size_inches(width / dpi, height / dpi, forward=False)
+        self._set_css_size(width, height)
+        for name in ("canvas", "foreground", "rubberband"):
+            element = self.get_element(name)
+            if element is not None:
+                element.setAttribute("width", width * self._ratio)
+                element.setAttribute("height", height * self._ratio)
+        if self.get_element("rubberband") is not None:
+            self._init_rubberband_context()
+
+        ResizeEvent("resize_event", self)._process()
+        if self.get_element("") is not None:
+            self.draw_idle()
 
-        message = document.createElement("div")
-        message.id = self._id + "message"
-        message.setAttribute("style", "min-height: 1.5em")
-        bottom.appendChild(message)
-        div.appendChild(bottom)
+    def _add_event_listener(self, element, event_type, listener, passive=False):
+        """
+        Adds an event listener that is removed when the figure is destroyed.
 
-        self.draw()
+        Passive listeners let the browser know that the default action of the
+        event is never prevented, so that scrolling does not wait for them.
+        """
+        proxy = create_proxy(listener)
+        if passive:
+            options = to_js({"passive": True}, dict_converter=Object.fromEntries)
+            element.addEventListener(event_type, proxy, options)
+        else:
+            element.addEventListener(event_type, proxy)
+        self._event_listeners.append((element, event_type, proxy))
+
+    def _remove_event_listeners(self):
+        for element, event_type, proxy in self._event_listeners:
+            element.removeEventListener(event_type, proxy)
+            proxy.destroy()
+        self._event_listeners = []
+
+    def _flushed(self, handler):
+        def listener(event):
+            self._flush_input()
+            handler(event)
+
+        return listener
+
+    def _queue_mousemove(self, event):
+        # Only the latest position matters
+        self._pending_mousemove = event
+        self._request_input_frame()
+
+    def _queue_scroll(self, event):
+        if event.deltaY:
+            self._pending_scroll_event = event
+            self._pending_scroll_steps += 1 if event.deltaY < 0 else -1
+            self._request_input_frame()
+
+    def _request_input_frame(self):
+        if requestAnimationFrame is None:
+            self._flush_input()
+            return
+        if self._input_frame is None:
+            if self._input_frame_proxy is None:
+                self._input_frame_proxy = create_proxy(self._on_input_frame)
+            self._input_frame = requestAnimationFrame(self._input_frame_proxy)
+
+    def _on_input_frame(self, timestamp):
+        self._input_frame = None
+        self._flush_input()
+
+    def _flush_input(self):
+        """
+        Dispatches the coalesced mouse move and scroll events, if any.
+        """
+        event, self._pending_mousemove = self._pending_mousemove, None
+        if event is not None:
+            self.onmousemove(event)
+        event, self._pending_scroll_event = self._pending_scroll_event, None
+        steps, self._pending_scroll_steps = self._pending_scroll_steps, 0
+        if event is not None and steps:
+            self.onscroll(event, steps)
 
     def destroy(self, *args, **kwargs):
-        div = document.getElementById(self._id)
+        scheduler.cancel(self)
+        self._cancel_sliced_draw()
+        self._idle_scheduled = False
+        # The figure will not be rendered anymore
+        self._resolve_frame_waiters()
+        self._remove_event_listeners()
+        if self._input_frame is not None:
+            cancelAnimationFrame(self._input_frame)
+            self._input_frame = None
+        if self._input_frame_proxy is not None:
+            self._input_frame_proxy.destroy()
+            self._input_frame_proxy = None
+        self._pending_mousemove = self._pending_scroll_event = None
+        if self._resize_timer is not None:
+            clear_timeout(self._resize_timer)
+            self._resize_timer = None
+        if self._resize_observer is not None:
+            self._resize_observer.disconnect()
+            self._resize_observer = None
+        if self._resize_proxy is not None:
+            self._resize_proxy.destroy()
+            self._resize_proxy = None
+        if self._intersection_observer is not None:
+            self._intersection_observer.disconnect()
+            self._intersection_observer = None
+        if self._intersection_proxy is not None:
+            self._intersection_proxy.destroy()
+            self._intersection_proxy = None
+
+        for timer in list(self._timers):
+            timer.stop()
+        self._destroyed = True
+
+        elements, self._elements = self._elements, None
+        self._contexts = {}
+        self._cursor = None
+        self._layout = None
+        self._frame_key = None
+        self._streams = {}
+        self._undrawn = set()
+        if elements is None:
+            return
+        div = elements[""]
         parentElement = div.parentNode
         if parentElement:
             parentElement.removeChild(div)
-        div.removeChild(div.firstChild)
+        # Figures without a single figure canvas are not pooled
+        canvas = elements.get("canvas")
+        if canvas is None or not pool.put_elements(
+            self._pool_kind(), (canvas.width, canvas.height), elements
+        ):
+            div.removeChild(div.firstChild)
+
+    def get_live_proxies(self):
+        """
+        Counts the JavaScript proxies currently held by this figure, by
+        kind. All of them are released by `destroy`.
+        """
+        live = Counter()
+        for _, event_type, _ in self._event_listeners:
+            live["listener:" + event_type] += 1
+        if self._input_frame_proxy is not None:
+            live["input_frame"] += 1
+        if self._resize_proxy is not None:
+            live["resize_observer"] += 1
+        if self._intersection_proxy is not None:
+            live["intersection_observer"] += 1
+        for timer in list(self._timers):
+            if timer._frame_proxy is not None:
+                live["timer"] += 1
+        return dict(live)
 
     def draw(self):
         pass
 
+    def _get_render_ratio(self):
+        # The ratio of rendered pixels to logical pixels of the next draw
+        return self._ratio
+
+    def _get_frame_key(self, ratio):
+        # What the frame shown on the figure canvas depends on, besides the
+        # state of the figure
+        return (*self.figure.get_size_inches(), self.figure.dpi, ratio)
+
+    def _is_frame_current(self, key):
+        """
+        Whether the figure canvas already shows the current state of the
+        figure, drawn with the frame *key*: the figure is not stale and was
+        last drawn at the same size and ratio.
+        """
+        return not self.figure.stale and self._frame_key == key
+
+    def _get_animated_artists(self):
+        # The artists drawn on the foreground canvas, in drawing order
+        return sorted(
+            self.figure.findobj(
+                lambda artist: artist.get_animated() and artist.get_visible()
+            ),
+            key=lambda artist: artist.get_zorder(),
+        )
+
+    def _get_foreground_context(self):
+        """
+        Returns the 2D context of the canvas the animated artists are drawn
+        on in layered mode, stacked between the figure canvas and the
+        rubberband one. The canvas is created on first use.
+        """
+        if self.get_element("foreground") is None:
+            canvas = self.get_element("canvas")
+            rubberband = self.get_element("rubberband")
+            if canvas is None:
+                return None
+            width, height = self.get_width_height()
+            foreground = document.createElement("canvas")
+            foreground.id = self._id + "foreground"
+            foreground.setAttribute("width", canvas.width)
+            foreground.setAttribute("height", canvas.height)
+            foreground.setAttribute(
+                "style",
+                "position: absolute; left: 0; top: 0; z-index: 0; outline: 0; "
+                + f"pointer-events: none; width: {width}px; height: {height}px",
+            )
+            rubberband.parentNode.insertBefore(foreground, rubberband)
+            self._elements["foreground"] = foreground
+        return self.get_context("foreground")
+
+    def _get_layout_key(self):
+        return (*self.figure.bbox.size, self.figure.dpi)
+
+    def _record_layout(self, renderer):
+        """
+        Records the regions covered by the Axes and the other artists of the
+        figure after a full draw, for the next incremental redraws.
+        """
+        figure = self.figure
+        self._layout = None
+        if not self.incremental_draw or len(figure.axes) < 2 or figure.subfigs:
+            return
+        # Computing the tight bboxes marks the Axes stale, although nothing
+        # changed since the draw
+        stale = {artist: artist.stale for artist in (figure, *figure.axes)}
+        axes = {}
+        others = []
+        for artist in figure.get_children():
+            if artist is figure.patch:
+                continue
+            if isinstance(artist, Axes):
+                axes[artist] = _get_ink_bbox(artist, renderer)
+            else:
+                others.append((artist, _get_ink_bbox(artist, renderer)))
+        for artist, value in stale.items():
+            if not value:
+                artist.stale = False
+        self._layout = (self._get_layout_key(), axes, others)
+
+    def _plan_incremental_draw(self, renderer):
+        """
+        Returns the passes of an incremental redraw of the figure, or None if
+        the whole figure has to be redrawn: when something else than Axes
+        changed, when a layout engine may move the Axes around, or when a
+        stale Axes overlaps another artist of the figure.
+
+        Each pass is a display region of the last frame covering a stale Axes,
+        and the Axes to draw in it, in drawing order: the stale Axes, and the
+        neighbouring Axes whose tick labels or decorations overlap it.
+        """
+        layout, self._layout = self._layout, None
+        figure = self.figure
+        if layout is None or not figure.stale or figure.patch.stale:
+            return None
+        key, axes, others = layout
+        engine = figure.get_layout_engine()
+        if (
+            key != self._get_layout_key()
+            or figure.subfigs
+            or not (engine is None or isinstance(engine, PlaceHolderLayoutEngine))
+        ):
+            return None
+        children = [
+            artist
+            for artist in figure.get_children()
+            if artist is not figure.patch and not isinstance(artist, Axes)
+        ]
+        if children != [artist for artist, _ in others] or any(
+            artist.stale for artist in children
+        ):
+            return None
+        if set(figure.axes) != axes.keys():
+            return None
+        stale = [ax for ax in axes if ax.stale]
+        if not stale or len(stale) == len(axes):
+            return None
+
+        # The region of a stale Axes covers both its last and its new extent
+        extents = dict(axes)
+        regions = []
+        for ax in stale:
+            bbox = _get_ink_bbox(ax, renderer)
+            bboxes = [b for b in (axes[ax], bbox) if b is not None]
+            axes[ax] = bbox
+            if not bboxes:
+                continue
+            # Aligned on the pixels, which are cleared whole
+            (x0, y0), (x1, y1) = Bbox.union(bboxes).get_points()
+            region = Bbox(
+                [[math.floor(x0), math.floor(y0)], [math.ceil(x1), math.ceil(y1)]]
+            )
+            if any(bbox and region.overlaps(bbox) for _, bbox in others):
+                return None
+            extents[ax] = region
+            regions.append(region)
+        self._layout = layout
+
+        order = sorted(axes, key=lambda ax: ax.get_zorder())
+        return [
+            (
+                region,
+                [
+                    ax
+                    for ax in order
+                    if extents[ax] is not None and region.overlaps(extents[ax])
+                ],
+            )
+            for region in regions
+        ]
+
+    def _draw_stale_axes(self, renderer, plan):
+        """
+        Re-renders the Axes of an incremental draw *plan* (see
+        `_plan_incremental_draw`) over the last frame.
+        """
+        figure = self.figure
+        patch = figure.patch
+        clipbox = patch.clipbox
+        try:
+            for region, axes in plan:
+                with self._clip_region(renderer, region):
+                    # Not using set_clip_box, which would mark the figure stale
+                    patch.clipbox = region
+                    patch.draw(renderer)
+                    for ax in axes:
+                        ax.draw(renderer)
+        finally:
+            patch.clipbox = clipbox
+        figure.stale = False
+        DrawEvent("draw_event", self, renderer)._process()
+
+    def _record_streams(self):
+        """
+        Records the number of points of the `StreamingLine` artists of the
+        figure, and how they are drawn, in the frame that was just drawn, as
+        well as the children of the Axes left stale as they draw nothing.
+        """
+        self._streams = {
+            line: (line._appended, line._get_frame_state())
+            for ax in self.figure.axes
+            for line in ax.lines
+            if isinstance(line, StreamingLine)
+        }
+        self._undrawn = {
+            artist
+            for ax in self.figure.axes
+            for artist in ax.get_children()
+            if artist.stale
+        }
+
+    def _plan_append_draw(self, renderer, frame_key):
+        """
+        Returns the `StreamingLine` artists which appended points can be drawn
+        over the last frame, drawn with the *frame_key*, with the display
+        bboxes of these points. Returns None if the figure has to be redrawn:
+        when something else than appending points changed since the last
+        frame, including the limits of the Axes, when points were dropped from
+        the lines, or when the new points would be drawn over artists drawn
+        after the lines.
+        """
+        figure = self.figure
+        engine = figure.get_layout_engine()
+        if (
+            not self.incremental_draw
+            or not self._streams
+            or self._frame_key != frame_key
+            or not figure.stale
+            or figure.subfigs
+            or not (engine is None or isinstance(engine, PlaceHolderLayoutEngine))
+        ):
+            return None
+        lines = []
+        for ax in figure.get_children():
+            if not ax.stale:
+                continue
+            if not isinstance(ax, Axes) or any(ax._stale_viewlims.values()):
+                return None
+            stale = [
+                artist
+                for artist in ax.get_children()
+                if artist.stale
+                and not (artist in self._undrawn and _draws_nothing(artist))
+            ]
+            if not stale:
+                return None
+            for line in stale:
+                last = self._streams.get(line)
+                if (
+                    last is None
+                    or last[1] is None
+                    or line._get_frame_state() != last[1]
+                ):
+                    return None
+                lines.append(line)
+
+        # The ink extents of the Axes and other artists of the figure, when
+        # recorded by the last full draw
+        extents = {}
+        if self._layout is not None and self._layout[0] == self._get_layout_key():
+            _, axes, others = self._layout
+            extents = {**axes, **dict(others)}
+        order = _get_drawing_order(figure, figure.patch)
+        plan = []
+        for line in lines:
+            bbox = line._get_appended_extent(renderer, self._streams[line][0])
+            if bbox is None:
+                continue
+            ax = line.axes
+            artists = _get_drawing_order(ax, ax.patch)
+            above = [
+                *artists[artists.index(line) + 1 :],
+                *order[order.index(ax) + 1 :],
+            ]
+            for artist in above:
+                if isinstance(artist, Line2D):
+                    if _line_overlaps(artist, bbox, renderer):
+                        return None
+                    continue
+                if artist in extents:
+                    extent = extents[artist]
+                else:
+                    extent = _get_ink_bbox(artist, renderer)
+                if extent is not None and bbox.overlaps(extent):
+                    return None
+            plan.append((line, bbox))
+        return plan
+
+    def _draw_appended(self, renderer, plan):
+        """
+        Draws the points appended to the lines of an append draw *plan* (see
+        `_plan_append_draw`) over the last frame, and returns the display
+        regions drawn.
+        """
+        for line, _ in plan:
+            line._draw_appended(renderer, self._streams[line][0])
+        for ax in self.figure.axes:
+            for line in ax.lines:
+                line.stale = False
+            ax.stale = False
+        self.figure.stale = False
+        DrawEvent("draw_event", self, renderer)._process()
+        return [bbox for _, bbox in plan]
+
+    def _clip_region(self, renderer, region):
+        """
+        Returns a context manager clearing the display *region* of the last
+        frame, drawn by *renderer*, and restricting the drawing to it.
+        """
+        raise NotImplementedError
+
+    def _get_pixel_bounds(self, region, width, height):
+        """
+        Returns the ``(x0, y0, x1, y1)`` pixel bounds of the display *region*,
+        from the upper left corner of a *width* x *height* frame.
+        """
+        x0 = min(max(math.floor(region.x0), 0), width)
+        x1 = min(max(math.ceil(region.x1), 0), width)
+        y0 = min(max(math.floor(height - region.y1), 0), height)
+        y1 = min(max(math.ceil(height - region.y0), 0), height)
+        return x0, y0, x1, y1
+
     def draw_idle(self):
+        # The redraw is queued in the page-level scheduler, which redraws the
+        # figures with the highest priority first, within a per-frame budget
+        if not self.is_visible():
+            self._stale = True
+            return
         if not self._idle_scheduled:
             self._idle_scheduled = True
-            set_timeout(self.draw, 1)
+            scheduler.schedule(self)
+
+    def _idle_draw(self):
+        # Called by the scheduler. The figure may have been drawn directly, or
+        # hidden, since it was queued.
+        if not self._idle_scheduled:
+            return
+        if not self.is_visible():
+            self._idle_scheduled = False
+            self._stale = True
+            self._notify_frame_ready()
+            return
+        # E.g. show() called again on a figure that did not change. The
+        # animated artists of layered figures do not mark the figure stale.
+        if not self.layered and self._is_frame_current(
+            self._get_frame_key(self._get_render_ratio())
+        ):
+            self._idle_scheduled = False
+            if self._profiler is not None:
+                self._profiler.skipped += 1
+            self._notify_frame_ready()
+            return
+        if self.time_sliced_draw and not (
+            self.layered
+            and self._is_frame_current(self._get_frame_key(self._get_render_ratio()))
+        ):
+            self._cancel_sliced_draw()
+            self._idle_scheduled = False
+            self._sliced_draw = asyncio.ensure_future(self._draw_sliced())
+            return
+        self.draw()
+
+    def frame_ready(self):
+        """
+        Returns a future that resolves once the figure is fully rendered: no
+        redraw of it is queued or in progress, and the fonts of its texts have
+        loaded and it was redrawn with them. The redraws of figures that are
+        not visible are deferred, so these resolve with the last frame. If the
+        redraw fails, the future is rejected with its exception.
+        """
+        future = asyncio.get_event_loop().create_future()
+        self._frame_waiters.append(future)
+        self._notify_frame_ready()
+        return future
+
+    async def draw_async(self):
+        """
+        Draws the figure like `draw`, and waits until it is fully rendered (see
+        `frame_ready`), e.g. before exporting it.
+        """
+        self.draw()
+        await self.frame_ready()
+
+    def _is_frame_pending(self):
+        # Whether a redraw of the figure is queued or in progress
+        return (
+            self._idle_scheduled
+            or self._sliced_draw is not None
+            or self._intersection_pending
+        )
+
+    def _notify_frame_ready(self):
+        if self._frame_waiters and not self._is_frame_pending():
+            self._resolve_frame_waiters()
+
+    def _resolve_frame_waiters(self):
+        waiters, self._frame_waiters = self._frame_waiters, []
+        for future in waiters:
+            if not future.done():
+                future.set_result(None)
+
+    def _reject_frame_waiters(self, exc):
+        # The redraw failed with *exc*, the frame waited for will not come
+        waiters, self._frame_waiters = self._frame_waiters, []
+        for future in waiters:
+            if not future.done():
+                future.set_exception(exc)
+
+    def _cancel_sliced_draw(self):
+        # Cancels the time-sliced draw in progress, if any
+        task, self._sliced_draw = self._sliced_draw, None
+        if task is not None and not task.done():
+            task.cancel()
+
+    @contextmanager
+    def _render_dpi(self, ratio):
+        # The figure dpi is only scaled while drawing, not in between slices
+        orig_dpi = self.figure.dpi
+        if ratio != 1:
+            self.figure.dpi *= ratio
+        try:
+            yield
+        finally:
+            self.figure.dpi = orig_dpi
+
+    async def _draw_sliced(self):
+        """
+        Draws the figure in slices of `draw_slice_budget` ms (see
+        `time_sliced_draw`), yielding to the event loop in between.
+        """
+        ratio = self._get_render_ratio()
+        frame_key = self._get_frame_key(ratio)
+        try:
+            with self._render_dpi(ratio):
+                renderer = self._begin_sliced_draw(ratio)
+                if renderer is None:
+                    return
+                steps = self._iter_draw(renderer)
+            try:
+                done = False
+                while not done:
+                    start = time.perf_counter()
+                    with self._render_dpi(ratio):
+                        for _ in steps:
+                            elapsed = (time.perf_counter() - start) * 1000
+                            if elapsed >= self.draw_slice_budget:
+                                break
+                        else:
+                            done = True
+                        self._show_sliced_draw(renderer, ratio, done)
+                    if not done:
+                        await asyncio.sleep(0)
+            finally:
+                steps.close()
+            self._frame_key = frame_key
+            self._layout = None
+        except Exception as exc:
+            # Nothing awaits the task, which would otherwise fail silently.
+            # The figure stays stale, and is drawn again by its next change.
+            _log.exception("Failed to draw the figure of %r", self)
+            self._reject_frame_waiters(exc)
+        finally:
+            self._end_sliced_draw()
+
+    def _end_sliced_draw(self):
+        # Unless the draw was cancelled, i.e. replaced by another draw
+        if self._sliced_draw is asyncio.current_task():
+            self._sliced_draw = None
+            self._notify_frame_ready()
+
+    def _iter_draw(self, renderer):
+        """
+        Draws the figure like `Figure.draw`, one top-level artist at a time,
+        yielding in between.
+        """
+        figure = self.figure
+        if not figure.get_visible():
+            return
+        artists = figure._get_draw_artists(renderer)
+        engine = figure.get_layout_engine()
+        if figure.axes and engine is not None:
+            try:
+                engine.execute(figure)
+            except ValueError:
+                pass
+        figure.patch.draw(renderer)
+        for i, artist in enumerate((*artists, *figure.subfigs)):
+            if i:
+                yield
+            artist.draw(renderer)
+        # What the `_finalize_rasterization` decorator of `Figure.draw` does,
+        # for the mixed mode renderers
+        if getattr(renderer, "_rasterizing", False):
+            renderer.stop_rasterizing()
+            renderer._rasterizing = False
+        figure.stale = False
+        self._record_streams()
+        DrawEvent("draw_event", self, renderer)._process()
+
+    def _begin_sliced_draw(self, ratio):
+        """
+        Returns the renderer of a time-sliced draw, or None if the figure is
+        not shown.
+        """
+        raise NotImplementedError
+
+    def _show_sliced_draw(self, renderer, ratio, done):
+        """
+        Shows the figure drawn so far by a time-sliced draw, or the whole
+        figure once *done*.
+        """
+
+    def is_visible(self):
+        """
+        Whether the figure is in the viewport of a visible page. The idle
+        draws of figures that are not visible are deferred until they are.
+        """
+        return self._in_viewport and self._page_visible
+
+    def _update_visibility(self, in_viewport, page_visible):
+        self._in_viewport = in_viewport
+        self._page_visible = page_visible
+        if self._stale and self.is_visible():
+            # Only the latest state of the figure is rendered
+            self._stale = False
+            self.draw_idle()
+
+    def _on_intersection(self, entries, observer=None):
+        self._intersection_pending = False
+        self._update_visibility(entries[-1].isIntersecting, self._page_visible)
+        self._notify_frame_ready()
+
+    def _on_visibility_change(self, event):
+        self._update_visibility(self._in_viewport, document.visibilityState != "hidden")
+
+    def get_render_priority(self):
+        """
+        The priority of the queued redraws of this figure, lower first: 0 for
+        the figure under the mouse or with the keyboard focus, 1 otherwise.
+        """
+        return 0 if self._hovered or self._focused else 1
 
     def set_message(self, message):
         message_display = self.get_element("message")
@@ -228,39 +1264,57 @@ class FigureCanvasWasm(FigureCanvasBase):
             event.stopPropagation()
         if button == 2:
             button = 3
+        self._last_mouse_xy = (x, y)
         return x, y, button
 
     def onmousemove(self, event):
         x, y, button = self._convert_mouse_event(event)
-        self.motion_notify_event(x, y, guiEvent=event)
+        MouseEvent("motion_notify_event", self, x, y, guiEvent=event)._process()
 
     def onmouseup(self, event):
         x, y, button = self._convert_mouse_event(event)
-        self.button_release_event(x, y, button, guiEvent=event)
+        MouseEvent(
+            "button_release_event", self, x, y, button, guiEvent=event
+        )._process()
 
     def onmousedown(self, event):
         x, y, button = self._convert_mouse_event(event)
-        self.button_press_event(x, y, button, guiEvent=event)
+        MouseEvent("button_press_event", self, x, y, button, guiEvent=event)._process()
+
+    def _onfocus(self, event):
+        self._focused = True
+
+    def _onblur(self, event):
+        self._focused = False
 
     def onmouseenter(self, event):
+        self._hovered = True
         # When the mouse is over the figure, get keyboard focus
         self.get_element("rubberband").focus()
-        self.enter_notify_event(guiEvent=event)
+        x, y, button = self._convert_mouse_event(event)
+        LocationEvent("figure_enter_event", self, x, y, guiEvent=event)._process()
 
     def onmouseleave(self, event):
+        self._hovered = False
         # When the mouse leaves the figure, drop keyboard focus
         self.get_element("rubberband").blur()
-        self.leave_notify_event(guiEvent=event)
+        x, y, button = self._convert_mouse_event(event)
+        LocationEvent("figure_leave_event", self, x, y, guiEvent=event)._process()
 
-    def onscroll(self, event):
+    def onscroll(self, event, step=None):
         x, y, button = self._convert_mouse_event(event)
-        self.scroll_event(x, y, event.deltaX, guiEvent=event)
+        if step is None:
+            step = 1 if event.deltaY < 0 else -1
+        MouseEvent("scroll_event", self, x, y, step=step, guiEvent=event)._process()
 
     _cursor_map = {0: "pointer", 1: "default", 2: "crosshair", 3: "move"}
 
     def set_cursor(self, cursor):
+        # The cursor is set on every mouse move, only touch the style when it
+        # changes
         rubberband = self.get_element("rubberband")
-        if rubberband is not None:
+        if rubberband is not None and cursor != self._cursor:
+            self._cursor = cursor
             rubberband.style.cursor = self._cursor_map.get(cursor, 0)
 
     # http://www.cambiaresearch.com/articles/15/javascript-char-codes-key-codes
@@ -374,11 +1428,15 @@ class FigureCanvasWasm(FigureCanvasBase):
 
     def onkeydown(self, event):
         key = self._convert_key_event(event)
-        self.key_press_event(key, guiEvent=event)
+        KeyEvent(
+            "key_press_event", self, key, *self._last_mouse_xy, guiEvent=event
+        )._process()
 
     def onkeyup(self, event):
         key = self._convert_key_event(event)
-        self.key_release_event(key, guiEvent=event)
+        KeyEvent(
+            "key_release_event", self, key, *self._last_mouse_xy, guiEvent=event
+        )._process()
 
     def get_window_title(self):
         top = self.get_element("top")
@@ -390,16 +1448,11 @@ class FigureCanvasWasm(FigureCanvasBase):
         if top is not None:
             top.textContent = title
 
-    # def resize_event(self):
-    #     # TODO
-    #     pass
-
     # def close_event(self):
     #     # TODO
     #     pass
 
     def draw_rubberband(self, x0, y0, x1, y1):
-        rubberband = self.get_element("rubberband")
         width, height = self.get_width_height()
         y0 = height - y0
         y1 = height - y1
@@ -411,7 +1464,7 @@ class FigureCanvasWasm(FigureCanvasBase):
             x0, x1 = x1, x0
         if y1 < y0:
             y0, y1 = y1, y0
-        context = rubberband.getContext("2d")
+        context = self.get_context("rubberband")
         context.clearRect(0, 0, width * self._ratio, height * self._ratio)
         context.strokeRect(
             x0 * self._ratio,
@@ -421,13 +1474,126 @@ class FigureCanvasWasm(FigureCanvasBase):
         )
 
     def remove_rubberband(self):
-        rubberband = self.get_element("rubberband")
         width, height = self.get_width_height()
-        context = rubberband.getContext("2d")
+        context = self.get_context("rubberband")
         context.clearRect(0, 0, width * self._ratio, height * self._ratio)
 
+    @property
+    def in_bitmap_interaction(self):
+        return self._interaction is not None
+
+    def begin_bitmap_interaction(self, axes):
+        """
+        Takes a snapshot of the last rendered frame, which `transform_bitmap`
+        then moves around within the bounds of *axes*.
+        """
+        canvas = self.get_element("canvas")
+        if canvas is None:
+            return
+        # The figure canvas no longer shows the figure as drawn
+        self._frame_key = None
+        snapshot = document.createElement("canvas")
+        snapshot.width = canvas.width
+        snapshot.height = canvas.height
+        snapshot.getContext("2d").drawImage(canvas, 0, 0)
+
+        width, height = self.get_width_height()
+        regions = []
+        for ax in axes:
+            x, y, w, h = ax.bbox.bounds
+            regions.append(
+                (
+                    x * self._ratio,
+                    (height - y - h) * self._ratio,
+                    w * self._ratio,
+                    h * self._ratio,
+                    to_hex(ax.patch.get_facecolor(), keep_alpha=True),
+                )
+            )
+        self._interaction = (snapshot, regions)
+
+    def transform_bitmap(self, src, dst):
+        """
+        Redraws the interaction regions with the snapshot content found in
+        the *src* display bbox stretched over the *dst* display bbox.
+        """
+        if self._interaction is None:
+            return
+        context = self.get_context("canvas")
+        if context is None:
+            return
+        snapshot, regions = self._interaction
+        width, height = self.get_width_height()
+
+        # Display coordinates have their origin in the lower left corner,
+        # while the canvas ones have it in the upper left corner.
+        sx = dst.width / src.width
+        sy = dst.height / src.height
+        tx = dst.x0 - sx * src.x0
+        ty = dst.y0 - sy * src.y0
+
+        context.save()
+        context.beginPath()
+        for x, y, w, h, _ in regions:
+            context.rect(x, y, w, h)
+        context.clip()
+        for x, y, w, h, color in regions:
+            context.fillStyle = color
+            context.fillRect(x, y, w, h)
+        context.setTransform(
+            sx,
+            0,
+            0,
+            sy,
+            tx * self._ratio,
+            (height * (1 - sy) - ty) * self._ratio,
+        )
+        context.drawImage(snapshot, 0, 0)
+        context.restore()
+
+    def end_bitmap_interaction(self):
+        self._interaction = None
+
+    def start_profiling(self, per_artist=True):
+        """
+        Starts collecting render timings for this figure.
+
+        See `matplotlib_pyodide.profiling` for a description of the collected
+        statistics. Returns the `RenderProfiler`.
+        """
+        self._profiler = RenderProfiler(self._id, per_artist=per_artist)
+        return self._profiler
+
+    def stop_profiling(self):
+        """
+        Stops collecting render timings and returns the collected statistics.
+        """
+        profiler, self._profiler = self._profiler, None
+        return profiler.stats if profiler is not None else None
+
+    def get_render_stats(self):
+        """
+        Returns the statistics collected since `start_profiling`, or None if
+        the figure is not being profiled.
+        """
+        return self._profiler.stats if self._profiler is not None else None
+
+    def _profile(self, phase):
+        if self._profiler is None:
+            return nullcontext()
+        return self._profiler.phase(phase)
+
+    def _profile_draw(self, renderer):
+        if self._profiler is None:
+            return nullcontext()
+        return self._profiler.profile_draw(self.figure, renderer)
+
     def new_timer(self, *args, **kwargs):
-        return TimerWasm(*args, **kwargs)
+        kwargs.setdefault("frame_aligned", self.frame_aligned_timers)
+        timer = TimerWasm(*args, **kwargs)
+        # Stopped when the figure is destroyed
+        self._timers.add(timer)
+        return timer
 
 
 _FONTAWESOME_ICONS = {
@@ -449,8 +1615,15 @@ class NavigationToolbar2Wasm(NavigationToolbar2):
         pass
 
     def get_element(self):
-        # Create the HTML content for the toolbar
+        div, buttons = self._create_element()
+        self._connect_buttons(buttons)
+        return div
+
+    def _create_element(self):
+        # Create the HTML content for the toolbar. Returns the toolbar element
+        # and its buttons, with the name of the method they trigger.
         div = document.createElement("span")
+        buttons = []
 
         def add_spacer():
             span = document.createElement("span")
@@ -467,7 +1640,7 @@ class NavigationToolbar2Wasm(NavigationToolbar2):
                     button.classList.add("fa")
                     button.classList.add(_FONTAWESOME_ICONS[image_file])
                     button.classList.add("matplotlib-toolbar-button")
-                    add_event_listener(button, "click", getattr(self, name_of_method))
+                    buttons.append((button, name_of_method))
                     div.appendChild(button)
 
         for format, _mimetype in sorted(list(FILE_TYPES.items())):
@@ -476,10 +1649,18 @@ class NavigationToolbar2Wasm(NavigationToolbar2):
             button.textContent = format
             button.classList.add("matplotlib-toolbar-button")
             button.id = "text"
-            add_event_listener(button, "click", self.ondownload)
+            buttons.append((button, "ondownload"))
             div.appendChild(button)
 
-        return div
+        return div, buttons
+
+    def _connect_buttons(self, buttons):
+        # The listeners are removed when the figure is destroyed, and the
+        # elements may then be reused by another figure
+        for button, name_of_method in buttons:
+            self.canvas._add_event_listener(
+                button, "click", getattr(self, name_of_method)
+            )
 
     def ondownload(self, event):
         format = event.target.textContent
@@ -500,24 +1681,109 @@ class NavigationToolbar2Wasm(NavigationToolbar2):
     def remove_rubberband(self):
         self.canvas.remove_rubberband()
 
+    def press_pan(self, event):
+        super().press_pan(event)
+        if (
+            self._pan_info is not None
+            and self.canvas.bitmap_interaction
+            and all(ax.name == "rectilinear" for ax in self._pan_info.axes)
+        ):
+            self._last_pan_event = None
+            self.canvas.begin_bitmap_interaction(self._pan_info.axes)
+
+    def drag_pan(self, event):
+        if not self.canvas.in_bitmap_interaction:
+            super().drag_pan(event)
+            return
+        # Only work out where the view would move to, the axes limits are
+        # updated once the mouse button is released.
+        ax = self._pan_info.axes[0]
+        points = ax._get_pan_points(self._pan_info.button, event.key, event.x, event.y)
+        if points is None:
+            return
+        self._last_pan_event = event
+        # Limits that could not be computed are left unchanged
+        points = np.where(np.equal(points, None), ax.viewLim.get_points(), points)
+        view = Bbox(ax.transData.transform(points.astype(float)))
+        self.canvas.transform_bitmap(view, ax.bbox)
+
+    def release_pan(self, event):
+        if self._pan_info is not None and self.canvas.in_bitmap_interaction:
+            self.canvas.end_bitmap_interaction()
+            last = self._last_pan_event
+            self._last_pan_event = None
+            if last is not None:
+                for ax in self._pan_info.axes:
+                    ax.drag_pan(self._pan_info.button, last.key, last.x, last.y)
+        super().release_pan(event)
+
 
 class TimerWasm(TimerBase):
+    """
+    A timer based on the browser timers.
+
+    With *frame_aligned*, repeating timers are driven by requestAnimationFrame
+    instead of setInterval: the callbacks run on the animation frame closest
+    to each deadline. Deadlines are kept on the schedule set when the timer
+    started, so they do not drift, and ticks missed because the callbacks
+    (typically a draw) took longer than the interval are skipped instead of
+    piling up.
+    """
+
+    def __init__(self, *args, frame_aligned=False, **kwargs):
+        self._timer = None
+        self._timer_kind = None
+        self._frame_aligned = frame_aligned and requestAnimationFrame is not None
+        self._frame_proxy = None
+        self._deadline = None
+        self._last_frame = None
+        super().__init__(*args, **kwargs)
+
     def _timer_start(self):
         self._timer_stop()
         if self._single:
-            self._timer: int | None = set_timeout(self._on_timer, self.interval)
+            self._timer = set_timeout(self._on_timer, self.interval)
+            self._timer_kind = "timeout"
+        elif self._frame_aligned:
+            self._deadline = self._last_frame = None
+            self._frame_proxy = create_proxy(self._on_frame)
+            self._timer = requestAnimationFrame(self._frame_proxy)
+            self._timer_kind = "frame"
         else:
             self._timer = set_interval(self._on_timer, self.interval)
+            self._timer_kind = "interval"
 
     def _timer_stop(self):
         if self._timer is None:
             return
-        elif self._single:
+        elif self._timer_kind == "timeout":
             clear_timeout(self._timer)
-            self._timer = None
+        elif self._timer_kind == "frame":
+            cancelAnimationFrame(self._timer)
+            self._frame_proxy.destroy()
+            self._frame_proxy = None
         else:
             clear_interval(self._timer)
-            self._timer = None
+        self._timer = None
+        self._timer_kind = None
+
+    def _on_frame(self, timestamp):
+        interval = max(self.interval, 1)
+        if self._deadline is None:
+            self._deadline = timestamp + interval
+        # Fire on the frame closest to the deadline. A long frame (e.g. a
+        # slow draw) is not representative of the frame period.
+        half_frame = 0
+        if self._last_frame is not None:
+            half_frame = min(timestamp - self._last_frame, interval) / 2
+        self._last_frame = timestamp
+        self._timer = requestAnimationFrame(self._frame_proxy)
+        if timestamp + half_frame < self._deadline:
+            return
+        # Skip the ticks that were missed
+        missed = (timestamp + half_frame - self._deadline) // interval
+        self._deadline += (missed + 1) * interval
+        self._on_timer()
 
     def _timer_set_interval(self):
         # Only stop and restart it if the timer has already been started
@@ -22,11 +22,12 @@
 import base64
 import io
 import math
+from contextlib import contextmanager
 from functools import lru_cache
 
 import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib import __version__, figure, interactive
+from matplotlib import __version__, _api, figure, interactive
 from matplotlib._enums import CapStyle
 from matplotlib.backend_bases import (
     FigureManagerBase,
@@ -46,6 +47,8 @@ from PIL.PngImagePlugin import PngInfo
 
 # Redirect to the WASM backend
 from matplotlib_pyodide.browser_backend import FigureCanvasWasm, NavigationToolbar2Wasm
+from matplotlib_pyodide.image_cache import image_cache
+from matplotlib_pyodide.profiling import CanvasOpCounter
 from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm, FigureManagerAggWasm
 
 try:
@@ -55,6 +58,11 @@ except ImportError as err:
         "html5_canvas_backend is only supported in the browser in the main thread"
     ) from err
 
+try:
+    from js import createImageBitmap
+except ImportError:
+    createImageBitmap = None
+
 from pyodide.ffi import create_proxy
 
 _capstyle_d = {"projecting": "square", "butt": "butt", "round": "round"}
@@ -62,34 +70,173 @@ _capstyle_d = {"projecting": "square", "butt": "butt", "round": "round"}
 # The URLs of fonts that have already been loaded into the browser
 _font_set = set()
 
+# The canvases to redraw once a font that is still loading is ready
+_fonts_loading = {}
+
 _base_fonts_url = "/fonts/"
 
 interactive(True)
 
 
 class FigureCanvasHTMLCanvas(FigureCanvasWasm):
+    manager_class = _api.classproperty(lambda cls: FigureManagerHTMLCanvas)
+
+    # Whether the lines with at least `webgl_threshold` points, and the
+    # markers and scatter plots with at least as many markers, are drawn with
+    # WebGL (see `matplotlib_pyodide.webgl`). The whole figure is drawn on the
+    # 2D canvas when the browser does not support WebGL 2.
+    webgl = False
+    webgl_threshold = 1000
+
+    # Whether the images drawn without interpolation (``interpolation="none"``)
+    # are passed unsampled to the renderer, and scaled and transformed by the
+    # browser, instead of being resampled by matplotlib on every draw. The
+    # scaled images do not match the pixels of the Agg backend exactly.
+    browser_image_scaling = False
+
     def __init__(self, *args, **kwargs):
         FigureCanvasWasm.__init__(self, *args, **kwargs)
+        self._count_canvas_ops = False
+        self._canvas_op_counter = None
+        self._webgl_layer = None
+        self._webgl_unavailable = False
+
+    def count_canvas_ops(self):
+        """
+        Draws the figure once, counting the operations made on the canvas 2D
+        context by the renderer, and returns the report of the
+        `CanvasOpCounter`, or None if the figure is not shown.
+        """
+        self._count_canvas_ops = True
+        try:
+            self.draw()
+        finally:
+            self._count_canvas_ops = False
+        counter, self._canvas_op_counter = self._canvas_op_counter, None
+        return counter.report if counter is not None else None
 
     def draw(self):
         # Render the figure using custom renderer
+        self._cancel_sliced_draw()
         self._idle_scheduled = True
+        frame_key = self._get_frame_key(self._ratio)
         orig_dpi = self.figure.dpi
         if self._ratio != 1:
             self.figure.dpi *= self._ratio
         try:
             width, height = self.get_width_height()
-            canvas = self.get_element("canvas")
-            if canvas is None:
+            ctx = self.get_context("canvas")
+            if ctx is None:
                 return
-            ctx = canvas.getContext("2d")
-            renderer = RendererHTMLCanvas(ctx, width, height, self.figure.dpi, self)
-            self.figure.draw(renderer)
+            counting = self._count_canvas_ops
+            if counting:
+                ctx = self._canvas_op_counter = CanvasOpCounter(ctx)
+            renderer = self._make_renderer(ctx, width, height)
+            with self._profile_draw(renderer):
+                if counting or not (self.layered and self._is_frame_current(frame_key)):
+                    with self._profile("figure.draw"):
+                        appended = self._plan_append_draw(renderer, frame_key)
+                        if appended is not None:
+                            self._draw_appended(renderer, appended)
+                        else:
+                            plan = self._plan_incremental_draw(renderer)
+                            self._draw_figure(renderer, plan)
+                            if plan is None:
+                                self._record_layout(renderer)
+                    self._frame_key = frame_key
+                    self._record_streams()
+                if self.layered and not counting:
+                    self._draw_foreground(width, height)
         except Exception as e:
-            raise RuntimeError("Rendering failed") from e
+            error = RuntimeError("Rendering failed")
+            self._reject_frame_waiters(error)
+            raise error from e
         finally:
             self.figure.dpi = orig_dpi
             self._idle_scheduled = False
+            self._notify_frame_ready()
+
+    def _is_frame_pending(self):
+        # The figure is redrawn once the fonts of its texts have loaded
+        return super()._is_frame_pending() or any(
+            self in canvases for canvases in _fonts_loading.values()
+        )
+
+    def _begin_sliced_draw(self, ratio):
+        ctx = self.get_context("canvas")
+        if ctx is None:
+            return None
+        width, height = self.get_width_height()
+        return self._make_renderer(ctx, width, height)
+
+    def _show_sliced_draw(self, renderer, ratio, done):
+        # The figure is drawn right onto the visible canvas
+        if done and self.layered:
+            self._draw_foreground(*self.get_width_height())
+
+    def _draw_foreground(self, width, height):
+        ctx = self._get_foreground_context()
+        if ctx is None:
+            return
+        ctx.clearRect(0, 0, width, height)
+        artists = self._get_animated_artists()
+        if artists:
+            renderer = self._make_renderer(ctx, width, height)
+            with self._profile("foreground.draw"):
+                for artist in artists:
+                    artist.draw(renderer)
+
+    def _make_renderer(self, ctx, width, height):
+        layer = self._get_webgl_layer()
+        if layer is None:
+            return RendererHTMLCanvas(ctx, width, height, self.figure.dpi, self)
+        from matplotlib_pyodide.webgl import RendererWebGL
+
+        return RendererWebGL(
+            ctx, width, height, self.figure.dpi, self, layer, self.webgl_threshold
+        )
+
+    def _get_webgl_layer(self):
+        """
+        Returns the WebGL layer of the figure, creating it on first use, or
+        None if WebGL is disabled or not available.
+        """
+        if not self.webgl or self._webgl_unavailable:
+            return None
+        if self._webgl_layer is None:
+            from matplotlib_pyodide.webgl import WebGLLayer
+
+            self._webgl_layer = WebGLLayer.create()
+            self._webgl_unavailable = self._webgl_layer is None
+        return self._webgl_layer
+
+    def _draw_figure(self, renderer, plan=None):
+        # Draws the whole figure, or only its stale Axes following an
+        # incremental draw *plan*
+        if plan is None:
+            self.figure.draw(renderer)
+        else:
+            self._draw_stale_axes(renderer, plan)
+
+    @contextmanager
+    def _clip_region(self, renderer, region):
+        x0, y0, x1, y1 = self._get_pixel_bounds(region, renderer.width, renderer.height)
+        ctx = renderer.ctx
+        ctx.save()
+        ctx.beginPath()
+        ctx.rect(x0, y0, x1 - x0, y1 - y0)
+        ctx.clip()
+        ctx.clearRect(x0, y0, x1 - x0, y1 - y0)
+        try:
+            yield
+        finally:
+            ctx.restore()
+
+    def destroy(self, *args, **kwargs):
+        super().destroy(*args, **kwargs)
+        if self._webgl_layer is not None:
+            self._webgl_layer.destroy()
+            self._webgl_layer = None
 
     def get_pixel_data(self):
         """
@@ -461,24 +608,98 @@ class RendererHTMLCanvas(RendererBase):
     def draw_markers(self, gc, marker_path, marker_trans, path, trans, rgbFace=None):
         super().draw_markers(gc, marker_path, marker_trans, path, trans, rgbFace)
 
+    def option_scale_image(self):
+        # See `FigureCanvasHTMLCanvas.browser_image_scaling`
+        return self.fig.browser_image_scaling
+
+    def option_image_nocomposite(self):
+        # Compositing the images of an Axes into one resamples them
+        return self.option_scale_image()
+
     def draw_image(self, gc, x, y, im, transform=None):
+        h, w, _ = im.shape
+        if transform is None:
+            # Resampled images change with the view, and are not cached
+            image = self._convert_image(im)
+            self.ctx.save()
+            self.ctx.drawImage(image, x, self.ctx.height - y - h, w, h)
+            self.ctx.restore()
+            return
+
+        # The row i of an unsampled image is at i / h in the unit square
+        # mapped by *transform*, from the bottom for ``origin="lower"``
+        image, (row, col) = self._get_image(im)
+        transform = (
+            Affine2D().scale(1 / w, 1 / h)
+            + transform
+            + Affine2D().translate(x, y).scale(1, -1).translate(0, self.ctx.height)
+        )
+        a, c, e, b, d, f = transform.get_matrix()[:2].ravel()
+        self.ctx.save()
+        self.ctx.transform(a, b, c, d, e, f)
+        # The pixels of images drawn with ``interpolation="none"`` stay sharp
+        self.ctx.imageSmoothingEnabled = False
+        self.ctx.globalAlpha = gc.get_alpha()
+        self.ctx.drawImage(image, col, row, w, h, 0, 0, w, h)
+        self.ctx.restore()
+
+    def _get_image(self, im):
+        """
+        Returns the converted source image of the unsampled image *im*, with
+        its rows from the bottom, and the ``(row, column)`` of *im* in it (see
+        `ImageCache.get_key`). Unchanged images, e.g. while panning, are not
+        converted again.
+        """
+        found = image_cache.get_key(im, self.fig.figure)
+        if found is None:
+            return self._convert_image(im[::-1]), (0, 0)
+        key, position = found
+        image = image_cache.get(key)
+        if image is None:
+            source = key[0].obj
+            # The converted image, and the source array kept alive by the key
+            nbytes = 2 * source.nbytes
+            if nbytes > image_cache.max_bytes:
+                # Only the part in view of images too large to be cached is
+                # converted
+                return self._convert_image(im[::-1]), (0, 0)
+            image = self._convert_image(source[::-1])
+            image_cache.put(key, image, nbytes)
+            self._create_image_bitmap(key, image)
+        return image, position
+
+    def _convert_image(self, im):
+        # Copies the RGBA array *im* into an in-memory canvas
         im = np.flipud(im)
         h, w, d = im.shape
-        y = self.ctx.height - y - h
         im = np.ravel(np.uint8(np.reshape(im, (h * w * d, -1)))).tobytes()
         pixels_proxy = create_proxy(im)
         pixels_buf = pixels_proxy.getBuffer("u8clamped")
         img_data = ImageData.new(pixels_buf.data, w, h)
-        self.ctx.save()
         in_memory_canvas = document.createElement("canvas")
         in_memory_canvas.width = w
         in_memory_canvas.height = h
         in_memory_canvas_context = in_memory_canvas.getContext("2d")
         in_memory_canvas_context.putImageData(img_data, 0, 0)
-        self.ctx.drawImage(in_memory_canvas, x, y, w, h)
-        self.ctx.restore()
         pixels_proxy.destroy()
         pixels_buf.release()
+        return in_memory_canvas
+
+    def _create_image_bitmap(self, key, canvas):
+        # The cached canvas is replaced with an ImageBitmap, which the browser
+        # can keep on the GPU, once created
+        if createImageBitmap is None:
+            return
+
+        def on_created(result):
+            try:
+                bitmap = result.result()
+            except Exception:
+                # Keep drawing the canvas
+                return
+            image_cache.replace(key, canvas, bitmap)
+
+        createImageBitmap(canvas).add_done_callback(on_created)
 
     def _get_font_helper(self, prop):
         """Cached font lookup
@@ -545,10 +766,16 @@ class RendererHTMLCanvas(RendererBase):
             f = FontFace.new(*font_face_arguments)
 
             font_url = font_face_arguments[1]
-            self.fonts_loading[font_url] = f
+            self.fonts_loading[font_url] = font_face_arguments
             f.load().add_done_callback(
                 lambda result: self.load_font_into_web(result, font_url)
             )
+            _fonts_loading[font_face_arguments] = []
+        if font_face_arguments in _fonts_loading:
+            # Also redraw the figures drawn while another one loads the font
+            canvases = _fonts_loading[font_face_arguments]
+            if self.fig not in canvases:
+                canvases.append(self.fig)
 
         font_property_string = "{} {} {:.3g}px {}, {}".format(
             prop.get_style(),
@@ -572,12 +799,23 @@ class RendererHTMLCanvas(RendererBase):
             self.ctx.restore()
 
     def load_font_into_web(self, loaded_face, font_url):
-        fontface = loaded_face.result()
+        font_face_arguments = self.fonts_loading.pop(font_url, None)
+        canvases = _fonts_loading.pop(font_face_arguments, [self.fig])
+        try:
+            fontface = loaded_face.result()
+        except Exception:
+            # Let a later draw try again
+            _font_set.discard(font_face_arguments)
+            # The figures keep their fallback font
+            for canvas in canvases:
+                canvas._notify_frame_ready()
+            raise
         document.fonts.add(fontface)
-        self.fonts_loading.pop(font_url, None)
 
-        # Redraw figure after font has loaded
-        self.fig.draw()
+        # Redraw the figures after font has loaded, unless closed meanwhile
+        for canvas in canvases:
+            if not canvas._destroyed:
+                canvas.draw()
         return fontface
 
 
@@ -594,7 +832,7 @@ class FigureManagerHTMLCanvas(FigureManagerBase):
         self.canvas.destroy(*args, **kwargs)
 
     def resize(self, w, h):
-        pass
+        self.canvas.set_canvas_size(w, h)
 
     def set_window_title(self, title):
         self.canvas.set_window_title(title)
@@ -0,0 +1,152 @@
+"""
+A matplotlib backend that combines the Agg and the HTML5 canvas renderers.
+
+The HTML5 canvas renderer draws text and lines natively, so they stay crisp
+at any pixel ratio, but it issues canvas calls for every path, which is slow
+for dense artists. The Agg renderer is fast for dense artists, but its text
+and lines are only as sharp as its buffer.
+
+This backend draws the figure with the HTML5 canvas renderer, and routes the
+dense artists through Agg: images and meshes, collections with more than
+`FigureCanvasHybrid.collection_threshold` elements, and lines with more than
+`FigureCanvasHybrid.line_threshold` points. The routed artists are rasterized
+with matplotlib's mixed mode rendering (the one used by the vector backends
+for ``rasterized=True`` artists), and their bitmaps are composited onto the
+canvas in drawing order.
+
+When `FigureCanvasHTMLCanvas.webgl` is set and WebGL is available, the dense
+lines and scatter plots are drawn with WebGL instead of Agg.
+"""
+
+from matplotlib.backend_bases import _Backend
+from matplotlib.backends.backend_agg import RendererAgg
+from matplotlib.backends.backend_mixed import MixedModeRenderer
+from matplotlib.collections import Collection, PathCollection, QuadMesh, TriMesh
+from matplotlib.image import _ImageBase
+from matplotlib.lines import Line2D
+
+from matplotlib_pyodide.html5_canvas_backend import (
+    FigureCanvasHTMLCanvas,
+    FigureManagerHTMLCanvas,
+)
+from matplotlib_pyodide.pool import pool
+
+
+class FigureCanvasHybrid(FigureCanvasHTMLCanvas):
+    # Collections with more paths or offsets, and lines with more points, are
+    # rasterized with Agg. Images and meshes always are.
+    collection_threshold = 1000
+    line_threshold = 5000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._raster_renderer = None
+        self._raster_key = None
+
+    def should_rasterize(self, artist):
+        """
+        Whether *artist* is drawn with Agg, as a bitmap composited onto the
+        canvas. Artists set as ``rasterized`` by the user always are.
+        """
+        if isinstance(artist, (_ImageBase, QuadMesh, TriMesh)):
+            return True
+        if (
+            isinstance(artist, (Line2D, PathCollection))
+            and self._webgl_layer is not None
+        ):
+            return False
+        if isinstance(artist, Collection):
+            size = max(len(artist.get_paths()), len(artist.get_offsets()))
+            return size > self.collection_threshold
+        if isinstance(artist, Line2D):
+            return len(artist.get_path().vertices) > self.line_threshold
+        return False
+
+    def _route_artists(self):
+        routed = []
+        for artist in self.figure.images:
+            if not artist.get_rasterized() and self.should_rasterize(artist):
+                routed.append(artist)
+        for ax in self.figure.axes:
+            for artist in (*ax.images, *ax.collections, *ax.lines):
+                if not artist.get_rasterized() and self.should_rasterize(artist):
+                    routed.append(artist)
+        for artist in routed:
+            artist.set_rasterized(True)
+        return routed
+
+    def _get_raster_renderer(self, width, height, dpi):
+        # Called by the mixed mode renderer for each group of consecutive
+        # rasterized artists. A single Agg renderer is reused for all of them.
+        key = (width, height, dpi)
+        renderer = self._raster_renderer
+        if renderer is None or self._raster_key != key:
+            if renderer is not None:
+                pool.put_renderer(self._raster_key, renderer)
+            renderer = pool.take_renderer(key)
+            if renderer is None:
+                renderer = RendererAgg(width, height, dpi)
+            self._raster_renderer = renderer
+            self._raster_key = key
+        renderer.clear()
+        return renderer
+
+    def _make_mixed_renderer(self, renderer):
+        width, height = self.figure.get_size_inches()
+        return MixedModeRenderer(
+            self.figure,
+            width,
+            height,
+            self.figure.dpi,
+            renderer,
+            raster_renderer_class=self._get_raster_renderer,
+        )
+
+    def _draw_figure(self, renderer, plan=None):
+        mixed_renderer = self._make_mixed_renderer(renderer)
+        routed = self._route_artists()
+        try:
+            super()._draw_figure(mixed_renderer, plan)
+        finally:
+            for artist in routed:
+                artist.set_rasterized(False)
+
+    def _begin_sliced_draw(self, ratio):
+        renderer = super()._begin_sliced_draw(ratio)
+        if renderer is None:
+            return None
+        return self._make_mixed_renderer(renderer)
+
+    def _iter_draw(self, renderer):
+        # The routed artists stay flagged as rasterized for the duration of
+        # the time-sliced draw
+        routed = self._route_artists()
+        try:
+            yield from super()._iter_draw(renderer)
+        finally:
+            for artist in routed:
+                artist.set_rasterized(False)
+
+    def destroy(self, *args, **kwargs):
+        super().destroy(*args, **kwargs)
+        if self._raster_renderer is not None:
+            pool.put_renderer(self._raster_key, self._raster_renderer)
+            self._raster_renderer = self._raster_key = None
+
+
+@_Backend.export
+class _BackendHybrid(_Backend):
+    FigureCanvas = FigureCanvasHybrid
+    FigureManager = FigureManagerHTMLCanvas
+
+    @staticmethod
+    def show(*args, **kwargs):
+        from matplotlib import pyplot as plt
+
+        plt.gcf().canvas.show(*args, **kwargs)
+
+    @staticmethod
+    def destroy(*args, **kwargs):
+        from matplotlib import pyplot as plt
+
+        plt.gcf().canvas.destroy(*args, **kwargs)
@@ -0,0 +1,177 @@
+"""
+Page-wide cache of the images drawn by the HTML5 canvas renderer.
+
+`RendererHTMLCanvas.draw_image` copies the RGBA array of an image into an
+in-memory canvas, turned into an ``ImageBitmap`` where the browser supports
+it, and draws that onto the figure canvas. The images passed unsampled to the
+renderer (see ``FigureCanvasHTMLCanvas.browser_image_scaling``) are the same
+on every redraw, including pans and zooms: these are converted whole and kept
+in the `ImageCache`, keyed by the array their artist caches its colormapped
+data into, so that drawing them again is a single ``drawImage`` call. The
+images resampled by matplotlib change with the view, and are not cached.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ImageCache:
+    """
+    A bounded cache of converted images, dropping the least recently drawn
+    ones first.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The maximum total size of the cached images, at 4 bytes per pixel.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._nbytes = 0
+
+    @staticmethod
+    def get_key(im, figure):
+        """
+        Returns the cache key of the source array of the image array *im*
+        drawn for *figure*, and the ``(row, column)`` of *im* in it, or None
+        if *im* is not a part of the colormapped data of an `AxesImage` of
+        *figure*.
+
+        An unsampled `AxesImage` passes the part of its colormapped data in
+        the view to the renderer, and only colormaps its data again when its
+        data, colormap or norm change. The key is the identity of the source
+        array, which it keeps alive so that no other array gets the same key,
+        and the number of times the image `changed()`: the colormapped data of
+        uint8 RGBA images is their data array, which may be modified in place.
+        """
+        # The colormapped data of RGBA images is their masked data array
+        im = np.asarray(im)
+        source = im.base
+        if (
+            not isinstance(source, np.ndarray)
+            or source.shape[2:] != (4,)
+            or source.dtype != im.dtype
+            or source.strides != im.strides
+            or not source.flags.c_contiguous
+        ):
+            return None
+        image = _find_image(figure, source)
+        if image is None:
+            return None
+        offset = im.ctypes.data - source.ctypes.data
+        row, offset = divmod(offset, source.strides[0])
+        key = _Identity(source), _get_version(image)
+        return key, (row, offset // source.strides[1])
+
+    @property
+    def nbytes(self):
+        """The total size of the cached images."""
+        return self._nbytes
+
+    def get(self, key):
+        """
+        Returns the converted image cached for *key*, or None.
+        """
+        entry = self._images.get(key)
+        if entry is None:
+            return None
+        self._images.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, image, nbytes):
+        """
+        Caches the converted *image* of *nbytes* for *key*, dropping the least
+        recently drawn images beyond `max_bytes`. Returns whether the image
+        was cached, which it is not when larger than `max_bytes` by itself.
+        """
+        if nbytes > self.max_bytes:
+            return False
+        self.discard(key)
+        self._images[key] = (image, nbytes)
+        self._nbytes += nbytes
+        while self._nbytes > self.max_bytes:
+            _, (old, old_nbytes) = self._images.popitem(last=False)
+            self._nbytes -= old_nbytes
+            _close(old)
+        return True
+
+    def replace(self, key, old, new):
+        """
+        Replaces the converted image *old* of *key* with *new*, e.g. with the
+        ``ImageBitmap`` created from it. If *old* was dropped meanwhile, *new*
+        is released instead.
+        """
+        entry = self._images.get(key)
+        if entry is None or entry[0] is not old:
+            _close(new)
+            return
+        self._images[key] = (new, entry[1])
+
+    def discard(self, key):
+        """
+        Drops the image cached for *key*, if any.
+        """
+        entry = self._images.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry[1]
+            _close(entry[0])
+
+    def clear(self):
+        """
+        Drops all the cached images.
+        """
+        for key in list(self._images):
+            self.discard(key)
+
+
+def _find_image(figure, source):
+    # The image of *figure* whose colormapped data is the array *source*
+    for ax in figure.axes:
+        for image in ax.images:
+            data = image._imcache
+            if data is None:
+                continue
+            data = np.asarray(data)
+            if (data if data.base is None else data.base) is source:
+                return image
+    return None
+
+
+def _get_version(image):
+    # The number of times *image* changed since it was first cached
+    if "_cache_version" not in vars(image):
+        image._cache_version = 0
+        image.callbacks.connect("changed", _count_change)
+    return image._cache_version
+
+
+def _count_change(image):
+    image._cache_version += 1
+
+
+class _Identity:
+    # Compares and hashes an object, e.g. an unhashable array, by identity
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __eq__(self, other):
+        return isinstance(other, _Identity) and other.obj is self.obj
+
+    def __hash__(self):
+        return id(self.obj)
+
+
+def _close(image):
+    # Releases the memory of ImageBitmaps right away, canvases are collected
+    close = getattr(image, "close", None)
+    if close is not None:
+        close()
+
+
+# The cache shared by all the figures of the page
+image_cache = ImageCache()
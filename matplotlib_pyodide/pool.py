@@ -0,0 +1,93 @@
+"""
+Recycling of the resources of destroyed figures.
+
+Closing a figure and plotting a new one of the same size is a common pattern
+(e.g. re-running a notebook cell). Instead of dropping the DOM elements of a
+destroyed figure and building new ones, `FigureCanvasWasm` returns them to
+the page-wide `ResourcePool`, and takes them back for the next figure shown.
+Likewise, `FigureCanvasAggWasm` returns its Agg renderers, whose buffers are
+the largest allocations of a figure, and reuses a pooled renderer of the same
+size and dpi when there is one.
+"""
+
+from collections import OrderedDict
+
+
+class ResourcePool:
+    """
+    A bounded pool of figure DOM elements and Agg renderers.
+
+    Parameters
+    ----------
+    max_elements : int
+        The maximum number of pooled figure DOM subtrees.
+    max_renderers : int
+        The maximum number of pooled Agg renderers. Each of them holds a
+        width x height x 4 bytes buffer.
+    """
+
+    def __init__(self, max_elements=8, max_renderers=2):
+        self.max_elements = max_elements
+        self.max_renderers = max_renderers
+        self._elements = []
+        self._renderers = OrderedDict()
+
+    def clear(self):
+        """
+        Drops all the pooled resources.
+        """
+        self._elements.clear()
+        self._renderers.clear()
+
+    def put_elements(self, kind, size, elements):
+        """
+        Pools the DOM *elements* of a destroyed figure. *kind* identifies
+        the structure of the elements (e.g. the toolbar class), and *size*
+        is the size of the canvases, in physical pixels.
+
+        Returns whether the elements were pooled.
+        """
+        if len(self._elements) >= self.max_elements:
+            return False
+        self._elements.append((kind, size, elements))
+        return True
+
+    def take_elements(self, kind, size):
+        """
+        Takes pooled DOM elements of the given *kind*, preferably with
+        canvases of the given *size*. Returns None if there are none.
+        """
+        candidates = [
+            i
+            for i, (elements_kind, _, _) in enumerate(self._elements)
+            if elements_kind == kind
+        ]
+        if not candidates:
+            return None
+        # Resizing a canvas reallocates its buffer, prefer a matching size
+        index = next(
+            (i for i in candidates if self._elements[i][1] == size), candidates[-1]
+        )
+        return self._elements.pop(index)[2]
+
+    def put_renderer(self, key, renderer):
+        """
+        Pools an Agg *renderer*. *key* is the ``(width, height, dpi)`` it was
+        created for. The least recently pooled renderers are dropped first.
+        """
+        if self.max_renderers <= 0:
+            return
+        self._renderers[key] = renderer
+        self._renderers.move_to_end(key)
+        while len(self._renderers) > self.max_renderers:
+            self._renderers.popitem(last=False)
+
+    def take_renderer(self, key):
+        """
+        Takes the pooled renderer created for *key*, or returns None.
+        """
+        return self._renderers.pop(key, None)
+
+
+# The pool shared by all the figures of the page
+pool = ResourcePool()
@@ -0,0 +1,277 @@
+"""
+Opt-in instrumentation of the draws of the Pyodide backends.
+
+Profiling is enabled per figure with `FigureCanvasWasm.start_profiling`.
+Every draw is then split into phases:
+
+ - ``figure.draw``: walking the artist tree, excluding the time spent in the
+   renderer drawing methods,
+ - ``rasterize``: the time spent in the renderer drawing methods (rasterizing
+   into the Agg buffer, or issuing canvas calls for the HTML5 canvas renderer),
+ - ``transfer``: copying the Agg buffer into an ``ImageData`` (Agg only),
+ - ``putImageData``: uploading the ``ImageData`` to the canvas (Agg only),
+ - ``foreground.draw``: drawing the animated artists of layered figures (see
+   `FigureCanvasWasm.layered`).
+
+Each phase is also emitted as a ``performance.measure`` entry, so that it
+shows up in the timings of the browser devtools.
+
+`CanvasOpCounter` counts the calls made to a canvas 2D context, which is
+the main cost of the HTML5 canvas renderer, see
+`FigureCanvasHTMLCanvas.count_canvas_ops`.
+"""
+
+import functools
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+try:
+    from js import performance
+except ImportError:
+    performance = None
+
+# The renderer methods that are counted while profiling. The time spent in
+# them is accounted to the ``rasterize`` phase.
+RENDERER_METHODS = (
+    "draw_path",
+    "draw_markers",
+    "draw_path_collection",
+    "draw_quad_mesh",
+    "draw_gouraud_triangles",
+    "draw_image",
+    "draw_text",
+    "draw_tex",
+)
+
+
+def _artist_name(artist):
+    name = type(artist).__name__
+    # Axis.get_label returns the axis label Text artist
+    label = artist.get_label()
+    if isinstance(label, str) and label and not label.startswith("_"):
+        name = f"{name} {label!r}"
+    return name
+
+
+class RenderProfiler:
+    """
+    Collects the render timings of a figure.
+
+    Parameters
+    ----------
+    name : str
+        Prefix of the ``performance`` entries.
+    per_artist : bool
+        Whether to time the draw of each artist. This patches every artist of
+        the figure for the duration of each draw, so it adds some overhead.
+    """
+
+    def __init__(self, name, per_artist=True):
+        self.name = name
+        self.per_artist = per_artist
+        self.reset()
+
+    def reset(self):
+        self.draws = 0
+        self.skipped = 0
+        self.last = {}
+        self.total = defaultdict(float)
+        self.artists = defaultdict(float)
+        self.renderer_calls = Counter()
+        self._renderer_depth = 0
+        self._artist_stack = []
+
+    def _mark(self, name):
+        if performance is not None:
+            performance.mark(name)
+
+    def _measure(self, name):
+        if performance is not None:
+            performance.measure(name, name + ":start", name + ":end")
+            performance.clearMarks(name + ":start")
+            performance.clearMarks(name + ":end")
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the enclosed code as part of the *name* phase of the current
+        draw.
+        """
+        entry = f"{self.name}:{name}"
+        self._mark(entry + ":start")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self._mark(entry + ":end")
+            self._measure(entry)
+            self.last[name] = self.last.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def profile_draw(self, figure, renderer):
+        """
+        Profiles one draw of *figure* with *renderer*.
+        """
+        self.last = {}
+        self.artists = defaultdict(float)
+        self.renderer_calls = Counter()
+        restore = [self._instrument_renderer(renderer)]
+        if self.per_artist:
+            restore.append(self._instrument_artists(figure))
+        try:
+            with self.phase("total"):
+                yield
+        finally:
+            for undo in reversed(restore):
+                undo()
+            if "figure.draw" in self.last:
+                self.last["figure.draw"] -= self.last.get("rasterize", 0.0)
+            self.draws += 1
+            for name, elapsed in self.last.items():
+                self.total[name] += elapsed
+
+    def _instrument_renderer(self, renderer):
+        originals = {}
+        for name in RENDERER_METHODS:
+            if not hasattr(renderer, name):
+                continue
+            originals[name] = renderer.__dict__.get(name)
+            setattr(renderer, name, self._wrap_renderer_method(name, renderer))
+
+        def undo():
+            for name, original in originals.items():
+                if original is None:
+                    delattr(renderer, name)
+                else:
+                    setattr(renderer, name, original)
+
+        return undo
+
+    def _wrap_renderer_method(self, name, renderer):
+        method = getattr(renderer, name)
+
+        def wrapper(*args, **kwargs):
+            self.renderer_calls[name] += 1
+            # Some methods fall back to others (e.g. draw_markers calling
+            # draw_path), only time the outermost call.
+            if self._renderer_depth:
+                return method(*args, **kwargs)
+            self._renderer_depth += 1
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._renderer_depth -= 1
+                elapsed = (time.perf_counter() - start) * 1000
+                self.last["rasterize"] = self.last.get("rasterize", 0.0) + elapsed
+
+        return wrapper
+
+    def _instrument_artists(self, figure):
+        artists = [a for a in figure.findobj() if a is not figure]
+        for artist in artists:
+            artist.draw = self._wrap_artist_draw(artist)
+
+        def undo():
+            for artist in artists:
+                artist.__dict__.pop("draw", None)
+
+        return undo
+
+    def _wrap_artist_draw(self, artist):
+        draw = artist.draw
+        name = _artist_name(artist)
+
+        # Keeping the attributes of the draw method, such as the
+        # `_supports_rasterization` flag of `allow_rasterization`
+        @functools.wraps(draw)
+        def wrapper(*args, **kwargs):
+            # Only the time not spent drawing children is accounted to the
+            # artist itself.
+            self._artist_stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return draw(*args, **kwargs)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                children = self._artist_stack.pop()
+                self.artists[name] += elapsed - children
+                if self._artist_stack:
+                    self._artist_stack[-1] += elapsed
+
+        return wrapper
+
+    @property
+    def stats(self):
+        """
+        The collected statistics, as a dict with the keys
+
+         - ``draws``: the number of profiled draws,
+         - ``skipped``: the number of redraw requests skipped, as the figure
+           canvas already showed the current state of the figure,
+         - ``last``: the per-phase times of the last draw, in ms,
+         - ``mean``: the mean per-phase times over all draws, in ms,
+         - ``artists``: the self time of each artist in the last draw, in ms,
+           from the slowest to the fastest,
+         - ``renderer_calls``: the number of calls to each renderer method in
+           the last draw.
+        """
+        return {
+            "draws": self.draws,
+            "skipped": self.skipped,
+            "last": dict(self.last),
+            "mean": {
+                name: elapsed / self.draws for name, elapsed in self.total.items()
+            },
+            "artists": dict(
+                sorted(self.artists.items(), key=lambda item: item[1], reverse=True)
+            ),
+            "renderer_calls": dict(self.renderer_calls),
+        }
+
+
+class CanvasOpCounter:
+    """
+    Wraps a canvas 2D context and tallies, by name, the method calls,
+    property sets and property gets made through it. Each of these is a
+    Python to JavaScript call.
+    """
+
+    def __init__(self, ctx):
+        object.__setattr__(self, "_ctx", ctx)
+        object.__setattr__(self, "calls", Counter())
+        object.__setattr__(self, "sets", Counter())
+        object.__setattr__(self, "gets", Counter())
+
+    def __getattr__(self, name):
+        value = getattr(self._ctx, name)
+        if not callable(value):
+            self.gets[name] += 1
+            return value
+
+        def method(*args):
+            self.calls[name] += 1
+            return value(*args)
+
+        return method
+
+    def __setattr__(self, name, value):
+        self.sets[name] += 1
+        setattr(self._ctx, name, value)
+
+    @property
+    def report(self):
+        """
+        The counts as a dict with the ``calls``, ``sets`` and ``gets`` per
+        name, and the ``total`` number of operations.
+        """
+        return {
+            "calls": dict(self.calls),
+            "sets": dict(self.sets),
+            "gets": dict(self.gets),
+            "total": sum(self.calls.values())
+            + sum(self.sets.values())
+            + sum(self.gets.values()),
+        }
@@ -0,0 +1,119 @@
+"""
+Page-level scheduling of the figure redraws.
+
+`FigureCanvasWasm.draw_idle` does not redraw the figure itself, but queues it
+in the page-wide `RenderScheduler`. On each animation frame, the scheduler
+redraws the queued figures in priority order -- the figure under the mouse or
+with the keyboard focus first, then in the order they were queued -- until
+the frame budget is spent. The remaining figures are redrawn on the following
+frames, so that a burst of updates on a page with many figures does not block
+the page for the time of all the redraws.
+"""
+
+import logging
+import time
+
+from pyodide.ffi import create_proxy
+from pyodide.ffi.wrappers import set_timeout
+
+try:
+    from js import requestAnimationFrame
+except ImportError:
+    requestAnimationFrame = None
+
+_log = logging.getLogger(__name__)
+
+
+class RenderScheduler:
+    """
+    Redraws the queued figure canvases within a per-frame time budget.
+
+    Parameters
+    ----------
+    frame_budget : float
+        The time (in ms) that can be spent redrawing figures in each frame.
+        At least one figure is redrawn per frame, however long it takes.
+    """
+
+    def __init__(self, frame_budget=12):
+        self.frame_budget = frame_budget
+        self._queue = {}
+        self._counter = 0
+        self._frame = None
+        self._frame_proxy = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __contains__(self, canvas):
+        return canvas in self._queue
+
+    def schedule(self, canvas):
+        """
+        Queues a redraw of *canvas*, unless it is already queued.
+        """
+        if canvas not in self._queue:
+            self._counter += 1
+            self._queue[canvas] = self._counter
+        self._request_frame()
+
+    def cancel(self, canvas):
+        """
+        Removes *canvas* from the queue.
+        """
+        self._queue.pop(canvas, None)
+
+    def _request_frame(self):
+        if self._frame is not None:
+            return
+        if requestAnimationFrame is None:
+            self._frame = set_timeout(lambda: self._on_frame(None), 1)
+            return
+        if self._frame_proxy is None:
+            self._frame_proxy = create_proxy(self._on_frame)
+        self._frame = requestAnimationFrame(self._frame_proxy)
+
+    def _on_frame(self, timestamp):
+        self._frame = None
+        try:
+            self.run(self.frame_budget)
+        finally:
+            if self._queue:
+                self._request_frame()
+
+    def run(self, budget=None):
+        """
+        Redraws the queued figures in priority order, until *budget* ms are
+        spent, or all of them if *budget* is None. Returns the number of
+        figures redrawn. A figure failing to redraw is reported, and does not
+        prevent the others from being redrawn.
+        """
+        start = time.perf_counter()
+        drawn = 0
+        while self._queue:
+            if (
+                drawn
+                and budget is not None
+                and (time.perf_counter() - start) * 1000 >= budget
+            ):
+                break
+            canvas = min(
+                self._queue,
+                key=lambda canvas: (canvas.get_render_priority(), self._queue[canvas]),
+            )
+            del self._queue[canvas]
+            try:
+                canvas._idle_draw()
+            except Exception:
+                _log.exception("Failed to redraw the figure of %r", canvas)
+            finally:
+                # Unless it was queued again, e.g. by a failed draw, the next
+                # draw_idle() queues the figure
+                if canvas not in self._queue:
+                    canvas._idle_scheduled = False
+            drawn += 1
+        return drawn
+
+
+# The scheduler shared by all the figures of the page
+scheduler = RenderScheduler()
@@ -0,0 +1,190 @@
+"""
+A line artist for live plots, which points are appended to.
+
+`StreamingLine` keeps the last *capacity* points appended to it. When only
+points were appended to the lines of a figure since its last frame, and the
+limits of their Axes did not change, the canvases of the Pyodide backends
+draw the new segments over the last frame instead of redrawing the figure
+(see `FigureCanvasWasm.draw`)::
+
+    line = StreamingLine(10_000)
+    ax.add_line(line)
+    ...
+    line.append(t, value)
+    fig.canvas.draw_idle()
+"""
+
+import numpy as np
+from matplotlib.lines import Line2D
+from matplotlib.transforms import Bbox
+
+
+class StreamingLine(Line2D):
+    """
+    A `.Line2D` keeping the last *capacity* points appended to it with
+    `append` in a fixed-size buffer, dropping the oldest ones.
+
+    `set_data` replaces all the points of the line, and the other keyword
+    arguments are those of `.Line2D`. `get_xdata` and `get_ydata` return
+    views of the buffer, which are overwritten by the next appends.
+    """
+
+    # Whether the line is marked stale by `append`
+    _appending = False
+
+    def __init__(self, capacity, xdata=(), ydata=(), **kwargs):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, not {capacity}")
+        self._capacity = int(capacity)
+        # The points are kept contiguous in buffers of twice the capacity,
+        # and moved back to their start when their end is reached
+        self._xbuf = self._ybuf = None
+        self._start = self._stop = 0
+        # The number of points ever appended and dropped
+        self._appended = 0
+        self._dropped = 0
+        # Bumped by every change of the line but appending points
+        self._version = 0
+        super().__init__(xdata, ydata, **kwargs)
+
+    @property
+    def capacity(self):
+        """The maximum number of points of the line."""
+        return self._capacity
+
+    @Line2D.stale.setter
+    def stale(self, val):
+        if val and not self._appending:
+            self._version += 1
+        Line2D.stale.fset(self, val)
+
+    def set_data(self, *args):
+        # docstring inherited
+        (x, y) = args[0] if len(args) == 1 else args
+        self._xbuf = self._ybuf = None
+        self._start = self._stop = 0
+        self._push(x, y)
+        self.stale = True
+
+    def append(self, x, y):
+        """
+        Appends the points *x*, *y* (scalars or 1D arrays) to the line,
+        dropping the oldest points beyond its capacity.
+        """
+        self._push(x, y)
+        self._appending = True
+        try:
+            self.stale = True
+        finally:
+            self._appending = False
+
+    def _push(self, x, y):
+        x = np.atleast_1d(np.asarray(x))
+        y = np.atleast_1d(np.asarray(y))
+        if x.ndim != 1 or x.shape != y.shape:
+            raise ValueError("x and y must be 1D and have the same length")
+        n = len(x)
+        capacity = self._capacity
+        if n:
+            self._appended += n
+            if n > capacity:
+                self._dropped += n - capacity
+                x, y = x[-capacity:], y[-capacity:]
+                n = capacity
+            if self._xbuf is None:
+                self._xbuf = np.empty(2 * capacity, x.dtype)
+                self._ybuf = np.empty(2 * capacity, y.dtype)
+            drop = max(self._stop - self._start + n - capacity, 0)
+            self._start += drop
+            self._dropped += drop
+            if self._stop + n > 2 * capacity:
+                size = self._stop - self._start
+                for buf in (self._xbuf, self._ybuf):
+                    buf[:size] = buf[self._start : self._stop]
+                self._start, self._stop = 0, size
+            self._xbuf[self._stop : self._stop + n] = x
+            self._ybuf[self._stop : self._stop + n] = y
+            self._stop += n
+        if self._xbuf is None:
+            self._xorig, self._yorig = x, y
+        else:
+            self._xorig = self._xbuf[self._start : self._stop]
+            self._yorig = self._ybuf[self._start : self._stop]
+        self._invalidx = self._invalidy = True
+
+    def _get_frame_state(self):
+        """
+        Returns what a frame shows of the line besides its points, or None if
+        the appended points cannot be drawn over a frame.
+        """
+        transform = self.get_transform()
+        if (
+            not transform.is_affine
+            or self.is_dashed()
+            or self.get_markevery() is not None
+        ):
+            return None
+        clipbox = self.clipbox if self.get_clip_on() else None
+        return (
+            self._version,
+            self._dropped,
+            transform.get_matrix().tobytes(),
+            None if clipbox is None else tuple(clipbox.bounds),
+        )
+
+    def _get_tail(self, count):
+        # The points appended since *count* points were, and the last one
+        # before them, to join the new segments to the drawn ones
+        new = self._appended - count
+        if new <= 0:
+            return None
+        first = max(len(self._xorig) - new, 0)
+        return first, self._xorig[max(first - 1, 0) :], self._yorig[max(first - 1, 0) :]
+
+    def _get_appended_extent(self, renderer, count):
+        """
+        Returns the display bbox of the segments and markers of the points
+        appended since *count* points were, or None if none are visible.
+        """
+        tail = self._get_tail(count)
+        if tail is None or not self.get_visible():
+            return None
+        _, x, y = tail
+        xy = np.column_stack([self.convert_xunits(x), self.convert_yunits(y)]).astype(
+            float
+        )
+        xy = self.get_transform().transform(xy)
+        xy = xy[np.isfinite(xy).all(axis=1)]
+        if not len(xy):
+            return None
+        pad = renderer.points_to_pixels(
+            max(self.get_linewidth(), self.get_markersize()) / 2
+            + self.get_markeredgewidth()
+            + 1
+        )
+        bbox = Bbox([xy.min(axis=0) - pad, xy.max(axis=0) + pad])
+        if self.get_clip_on() and self.clipbox is not None:
+            bbox = Bbox.intersection(bbox, self.clipbox)
+        return bbox
+
+    def _draw_appended(self, renderer, count):
+        """
+        Draws the points appended since *count* points were, joining them to
+        the ones drawn before.
+        """
+        tail = self._get_tail(count)
+        if tail is None:
+            return
+        first, x, y = tail
+        self._make_tail(x, y, marker="None").draw(renderer)
+        # The marker of the last point drawn before is not drawn again
+        self._make_tail(x[first > 0 :], y[first > 0 :], linestyle="None").draw(renderer)
+
+    def _make_tail(self, x, y, **kwargs):
+        # A line drawn like this one, with the points *x*, *y*
+        tail = Line2D(x, y, antialiased=self.get_antialiased(), snap=self.get_snap())
+        tail.update_from(self)
+        tail.set(**kwargs)
+        # For the unit conversions, once nothing marks the line stale anymore
+        tail.axes = self.axes
+        return tail
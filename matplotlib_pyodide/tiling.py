@@ -0,0 +1,151 @@
+"""
+Rendering of a figure one tile at a time.
+
+`FigureCanvasAggWasm` can show a figure as a grid of canvas tiles instead of
+a single canvas (see ``FigureCanvasAggWasm.tiled``), for figures larger than
+the browser canvas size limits. The tiles are drawn with a `RendererAggTile`:
+an Agg renderer the size of a tile, which draws the part of the figure under
+the tile by shifting everything drawn by the tile offset.
+"""
+
+from matplotlib.backends.backend_agg import RendererAgg
+from matplotlib.transforms import Affine2D, Bbox, TransformedPath
+
+
+class RendererAggTile(RendererAgg):
+    """
+    An Agg renderer drawing the *width* x *height* pixels of a larger figure
+    whose lower left corner is at the display coordinates set with
+    `set_offset`.
+    """
+
+    def __init__(self, width, height, dpi):
+        self.set_offset(0, 0)
+        super().__init__(width, height, dpi)
+
+    def set_offset(self, x, y):
+        """
+        Sets the display coordinates of the lower left corner of the tile.
+        They should be integers, for the tiles to match pixel for pixel.
+        """
+        self._offset = (x, y)
+        self._shift = Affine2D().translate(-x, -y)
+
+    def _update_methods(self):
+        # RendererAgg binds its drawing methods to the C++ renderer, while
+        # these are shifted by the methods below
+        self.copy_from_bbox = self._renderer.copy_from_bbox
+
+    def _shift_gc(self, gc):
+        # The clip rectangle and path of the graphics context are in display
+        # coordinates too
+        rect = gc.get_clip_rectangle()
+        path, affine = gc.get_clip_path()
+        if rect is None and path is None:
+            return gc
+        shifted = self.new_gc()
+        shifted.copy_properties(gc)
+        if rect is not None:
+            shifted.set_clip_rectangle(Bbox(rect.get_points() - self._offset))
+        if path is not None:
+            shifted.set_clip_path(TransformedPath(path, affine + self._shift))
+        return shifted
+
+    def draw_path(self, gc, path, transform, rgbFace=None):
+        # docstring inherited
+        super().draw_path(self._shift_gc(gc), path, transform + self._shift, rgbFace)
+
+    def draw_markers(self, gc, marker_path, marker_trans, path, trans, rgbFace=None):
+        # docstring inherited
+        self._renderer.draw_markers(
+            self._shift_gc(gc),
+            marker_path,
+            marker_trans,
+            path,
+            trans + self._shift,
+            rgbFace,
+        )
+
+    def draw_path_collection(
+        self,
+        gc,
+        master_transform,
+        paths,
+        all_transforms,
+        offsets,
+        offset_trans,
+        *args,
+    ):
+        # docstring inherited
+        # The paths are translated by their offsets last, if they have some
+        if len(offsets):
+            offset_trans = offset_trans + self._shift
+        else:
+            master_transform = master_transform + self._shift
+        self._renderer.draw_path_collection(
+            self._shift_gc(gc),
+            master_transform,
+            paths,
+            all_transforms,
+            offsets,
+            offset_trans,
+            *args,
+        )
+
+    def draw_quad_mesh(
+        self,
+        gc,
+        master_transform,
+        mesh_width,
+        mesh_height,
+        coordinates,
+        offsets,
+        offset_trans,
+        *args,
+    ):
+        # docstring inherited
+        if len(offsets):
+            offset_trans = offset_trans + self._shift
+        else:
+            master_transform = master_transform + self._shift
+        self._renderer.draw_quad_mesh(
+            self._shift_gc(gc),
+            master_transform,
+            mesh_width,
+            mesh_height,
+            coordinates,
+            offsets,
+            offset_trans,
+            *args,
+        )
+
+    def draw_gouraud_triangles(self, gc, triangles_array, colors_array, transform):
+        # docstring inherited
+        self._renderer.draw_gouraud_triangles(
+            self._shift_gc(gc), triangles_array, colors_array, transform + self._shift
+        )
+
+    def draw_image(self, gc, x, y, im):
+        # docstring inherited
+        x0, y0 = self._offset
+        self._renderer.draw_image(self._shift_gc(gc), x - x0, y - y0, im)
+
+    # The texts are drawn at positions flipped with the height of the tile,
+    # with the y-axis pointing down
+
+    def draw_text(self, gc, x, y, s, prop, angle, ismath=False, mtext=None):
+        # docstring inherited
+        if ismath:
+            return self.draw_mathtext(gc, x, y, s, prop, angle)
+        x0, y0 = self._offset
+        super().draw_text(self._shift_gc(gc), x - x0, y + y0, s, prop, angle)
+
+    def draw_mathtext(self, gc, x, y, s, prop, angle):
+        # docstring inherited
+        x0, y0 = self._offset
+        super().draw_mathtext(self._shift_gc(gc), x - x0, y + y0, s, prop, angle)
+
+    def draw_tex(self, gc, x, y, s, prop, angle, *, mtext=None):
+        # docstring inherited
+        x0, y0 = self._offset
+        super().draw_tex(self._shift_gc(gc), x - x0, y + y0, s, prop, angle)
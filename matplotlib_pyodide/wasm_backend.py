@@ -10,57 +10,618 @@ See matplotlib.backend_bases for documentation for most of the methods, since
 this primarily is just overriding methods in the base class.
 """
 
-# TODO: Figure resizing support
-
 import base64
 import io
+import math
+import time
+from contextlib import contextmanager
 
-from js import ImageData, document
-from matplotlib import interactive
-from matplotlib.backend_bases import FigureManagerBase, _Backend
+import numpy as np
+from js import ImageData, Object, document
+from matplotlib import _api, interactive
+from matplotlib.backend_bases import DrawEvent, FigureManagerBase, _Backend
 from matplotlib.backends import backend_agg
+from matplotlib.transforms import Bbox
+
+from matplotlib_pyodide.browser_backend import (
+    FigureCanvasWasm,
+    NavigationToolbar2Wasm,
+    _get_ink_bbox,
+)
+from matplotlib_pyodide.pool import pool
+from matplotlib_pyodide.tiling import RendererAggTile
+from pyodide.ffi import create_proxy, to_js
+from pyodide.ffi.wrappers import clear_timeout, set_timeout
 
-from matplotlib_pyodide.browser_backend import FigureCanvasWasm, NavigationToolbar2Wasm
+try:
+    from js import IntersectionObserver
+except ImportError:
+    IntersectionObserver = None
 
 interactive(True)
 
 
 class FigureCanvasAggWasm(backend_agg.FigureCanvasAgg, FigureCanvasWasm):
+    manager_class = _api.classproperty(lambda cls: FigureManagerAggWasm)
+
+    # Adaptive quality: while the figure is redrawn continuously (animations,
+    # drags), render at a reduced pixel ratio picked from the measured frame
+    # times so as to reach `target_fps`, and render again at the full ratio
+    # once no draw happened for `adaptive_idle_delay` ms.
+    adaptive_quality = False
+    target_fps = 30
+    min_render_ratio = 1.0
+    adaptive_idle_delay = 250
+
+    # Tiled mode: whether the figure is shown as a grid of `tile_size` x
+    # `tile_size` canvases (in logical pixels) instead of a single canvas, for
+    # figures larger than the browser canvas size limits, such as a hundred
+    # stacked subplots. Only the tiles within `tile_margin` logical pixels of
+    # the viewport are rendered, the others when they are scrolled to, and
+    # the tiles scrolled away are released. Set it before showing the
+    # figure. Tiled figures are always rendered at the full ratio, and are
+    # not layered nor drawn incrementally.
+    tiled = False
+    tile_size = 512
+    tile_margin = 256
+
     def __init__(self, *args, **kwargs):
         backend_agg.FigureCanvasAgg.__init__(self, *args, **kwargs)
         FigureCanvasWasm.__init__(self, *args, **kwargs)
+        self._render_ratio = None
+        self._last_draw_time = None
+        self._idle_timer = None
+        self._scaling_canvas = None
+        self._foreground_renderer = None
+        self._foreground_key = None
+        self._foreground_bounds = None
+        self._tile_renderer = None
+        self._tile_renderer_key = None
+        self._tile_grid = None
+        self._visible_tiles = set()
+        self._drawn_tiles = set()
+        self._tiles_pending = False
+        self._tile_observer = None
+        self._tile_proxy = None
 
-    def draw(self):
-        from pyodide.ffi import create_proxy
+    def _get_render_ratio(self):
+        # The foreground of layered figures is drawn at the full ratio
+        if not self.adaptive_quality or self.layered or self._render_ratio is None:
+            return self._ratio
+        interacting = self.in_bitmap_interaction or (
+            self._last_draw_time is not None
+            and (time.perf_counter() - self._last_draw_time) * 1000
+            < self.adaptive_idle_delay
+        )
+        return min(self._render_ratio, self._ratio) if interacting else self._ratio
+
+    def _update_render_ratio(self, ratio, frame_time):
+        # The rendering cost is roughly proportional to the number of pixels,
+        # i.e. to the square of the ratio.
+        budget = 1000 / self.target_fps
+        ideal = ratio * math.sqrt(budget / max(frame_time, 1e-3))
+        # Snap to quarter steps, so that the Agg buffer is not reallocated on
+        # every frame.
+        ideal = math.floor(ideal * 4) / 4
+        self._render_ratio = max(self.min_render_ratio, min(self._ratio, ideal))
+        self._last_draw_time = time.perf_counter()
+
+        if self._idle_timer is not None:
+            clear_timeout(self._idle_timer)
+            self._idle_timer = None
+        if ratio != self._ratio:
+            self._idle_timer = set_timeout(
+                self._on_adaptive_idle, self.adaptive_idle_delay
+            )
+
+    def _on_adaptive_idle(self):
+        # Nothing was drawn for a while, render the last frame at full ratio
+        self._idle_timer = None
+        self._last_draw_time = None
+        self.draw()
+
+    def _put_scaled_image_data(self, ctx, image_data, canvas):
+        # Upload the reduced size frame to an offscreen canvas, and let the
+        # browser scale it up onto the visible one.
+        scaling_canvas = self._scaling_canvas
+        if scaling_canvas is None:
+            scaling_canvas = self._scaling_canvas = document.createElement("canvas")
+        if (
+            scaling_canvas.width != image_data.width
+            or scaling_canvas.height != image_data.height
+        ):
+            scaling_canvas.width = image_data.width
+            scaling_canvas.height = image_data.height
+        scaling_canvas.getContext("2d").putImageData(image_data, 0, 0)
+        ctx.drawImage(
+            scaling_canvas,
+            0,
+            0,
+            image_data.width,
+            image_data.height,
+            0,
+            0,
+            canvas.width,
+            canvas.height,
+        )
+
+    def destroy(self, *args, **kwargs):
+        if self._idle_timer is not None:
+            clear_timeout(self._idle_timer)
+            self._idle_timer = None
+        if self._tile_observer is not None:
+            self._tile_observer.disconnect()
+            self._tile_observer = None
+        if self._tile_proxy is not None:
+            self._tile_proxy.destroy()
+            self._tile_proxy = None
+        self._tile_renderer = self._tile_renderer_key = self._tile_grid = None
+        self._visible_tiles = set()
+        self._drawn_tiles = set()
+        self._tiles_pending = False
+        super().destroy(*args, **kwargs)
+        # Hand the Agg buffer over to the next figure of the same size
+        renderer = self.__dict__.pop("renderer", None)
+        if renderer is not None:
+            pool.put_renderer(self._lastKey, renderer)
+        self._lastKey = None
+        self._scaling_canvas = None
+        self._foreground_renderer = self._foreground_key = None
+        self._foreground_bounds = None
+
+    @contextmanager
+    def _clip_region(self, renderer, region):
+        # Agg has no clipping of its own: the pixels drawn around the region
+        # are put back afterwards.
+        width, height = renderer.width, renderer.height
+        x0, y0, x1, y1 = self._get_pixel_bounds(region, width, height)
+        buffer = np.asarray(renderer.buffer_rgba())
+        saved = buffer.copy()
+        buffer[y0:y1, x0:x1] = 0
+        drawn = None
+        try:
+            yield
+            drawn = buffer[y0:y1, x0:x1].copy()
+        finally:
+            # The last frame is left whole if the drawing failed
+            buffer[...] = saved
+            if drawn is not None:
+                buffer[y0:y1, x0:x1] = drawn
+
+    def get_live_proxies(self):
+        # docstring inherited
+        live = super().get_live_proxies()
+        if self._tile_proxy is not None:
+            live["tile_observer"] = 1
+        return live
+
+    def get_renderer(self):
+        # Tiled figures are drawn, and their texts measured, with a renderer
+        # the size of a tile. They are only rendered whole when saved.
+        if self._is_tiled() and not self._is_saving:
+            return self._get_tile_renderer()
+        w, h = self.figure.bbox.size
+        key = w, h, self.figure.dpi
+        if self._lastKey != key:
+            # Keep the renderer of the previous size around, e.g. for
+            # `adaptive_quality` switching back and forth between two ratios
+            renderer = self.__dict__.get("renderer")
+            if renderer is not None:
+                pool.put_renderer(self._lastKey, renderer)
+            self.renderer = pool.take_renderer(key)
+            if self.renderer is None:
+                self.renderer = backend_agg.RendererAgg(w, h, self.figure.dpi)
+            self._lastKey = key
+        return self.renderer
 
+    def draw(self):
+        if self._is_tiled():
+            self._draw_tiles()
+            return
         # Render the figure using Agg
+        self._cancel_sliced_draw()
         self._idle_scheduled = True
+        start = time.perf_counter()
+        ratio = self._get_render_ratio()
+        frame_key = self._get_frame_key(ratio)
         orig_dpi = self.figure.dpi
-        if self._ratio != 1:
-            self.figure.dpi *= self._ratio
-        pixels_proxy = None
-        pixels_buf = None
+        if ratio != 1:
+            self.figure.dpi *= ratio
         try:
-            super().draw()
-            # Copy the image buffer to the canvas
-            width, height = self.get_width_height()
-            canvas = self.get_element("canvas")
-            if canvas is None:
-                return
-            pixels = self.buffer_rgba().tobytes()
-            pixels_proxy = create_proxy(pixels)
-            pixels_buf = pixels_proxy.getBuffer("u8clamped")
-            image_data = ImageData.new(pixels_buf.data, width, height)
-            ctx = canvas.getContext("2d")
-            ctx.putImageData(image_data, 0, 0)
+            renderer = self.get_renderer()
+            with self._profile_draw(renderer):
+                if not (self.layered and self._is_frame_current(frame_key)):
+                    self._draw_background(renderer, ratio, frame_key)
+                    self._frame_key = frame_key
+                    self._record_streams()
+                if self.layered:
+                    self._draw_foreground()
+            if self.adaptive_quality:
+                self._update_render_ratio(ratio, (time.perf_counter() - start) * 1000)
+        except Exception as exc:
+            self._reject_frame_waiters(exc)
+            raise
         finally:
             self.figure.dpi = orig_dpi
             self._idle_scheduled = False
+            self._notify_frame_ready()
+
+    def _draw_background(self, renderer, ratio, frame_key):
+        with self._profile("figure.draw"):
+            appended = plan = regions = None
+            if ratio == self._ratio:
+                appended = self._plan_append_draw(renderer, frame_key)
+                if appended is None:
+                    plan = self._plan_incremental_draw(renderer)
+            if appended is not None:
+                regions = self._draw_appended(renderer, appended)
+            elif plan is None:
+                super().draw()
+                self._record_layout(renderer)
+            else:
+                self._draw_stale_axes(renderer, plan)
+                regions = [region for region, _ in plan]
+        # Copy the image buffer, or only its redrawn part, to the canvas
+        width, height = self.get_width_height()
+        bounds = (0, 0, width, height)
+        if regions is not None:
+            bounds = _union_bounds(
+                [self._get_pixel_bounds(region, width, height) for region in regions]
+            )
+        self._put_pixels("canvas", self.buffer_rgba(), bounds, ratio != self._ratio)
+
+    def _begin_sliced_draw(self, ratio):
+        if self.get_element("canvas") is None:
+            return None
+        renderer = self.get_renderer()
+        renderer.clear()
+        return renderer
+
+    def _show_sliced_draw(self, renderer, ratio, done):
+        width, height = self.get_width_height()
+        self._put_pixels(
+            "canvas",
+            renderer.buffer_rgba(),
+            (0, 0, width, height),
+            ratio != self._ratio,
+        )
+        if done and self.layered:
+            self._draw_foreground()
+
+    def _draw_foreground(self):
+        # Draw the animated artists on their own transparent buffer, and only
+        # upload the part covering them now or in the last frame
+        ctx = self._get_foreground_context()
+        if ctx is None:
+            return
+        w, h = self.figure.bbox.size
+        key = w, h, self.figure.dpi
+        if self._foreground_key != key:
+            self._foreground_renderer = backend_agg.RendererAgg(w, h, key[2])
+            self._foreground_key = key
+            self._foreground_bounds = None
+        renderer = self._foreground_renderer
+        renderer.clear()
+        width, height = self.get_width_height()
+        bounds = []
+        with self._profile("foreground.draw"):
+            for artist in self._get_animated_artists():
+                artist.draw(renderer)
+                bbox = _get_ink_bbox(artist, renderer)
+                if bbox is not None:
+                    bounds.append(self._get_pixel_bounds(bbox, width, height))
+        last, self._foreground_bounds = self._foreground_bounds, _union_bounds(bounds)
+        if last is not None:
+            bounds.append(last)
+        self._put_pixels("foreground", renderer.buffer_rgba(), _union_bounds(bounds))
+
+    def _put_pixels(self, name, buffer, bounds, scaled=False):
+        """
+        Copies the *bounds* part of the RGBA *buffer* to the canvas *name*,
+        stretching it over the whole canvas if *scaled*.
+        """
+        canvas = self.get_element(name)
+        if canvas is None or bounds is None:
+            return
+        x0, y0, x1, y1 = bounds
+        if x1 <= x0 or y1 <= y0:
+            return
+        pixels_proxy = None
+        pixels_buf = None
+        try:
+            with self._profile("transfer"):
+                pixels = np.asarray(buffer)[y0:y1, x0:x1].tobytes()
+                pixels_proxy = create_proxy(pixels)
+                pixels_buf = pixels_proxy.getBuffer("u8clamped")
+                image_data = ImageData.new(pixels_buf.data, x1 - x0, y1 - y0)
+            with self._profile("putImageData"):
+                ctx = self.get_context(name)
+                if scaled:
+                    self._put_scaled_image_data(ctx, image_data, canvas)
+                else:
+                    ctx.putImageData(image_data, x0, y0)
+        finally:
             if pixels_proxy:
                 pixels_proxy.destroy()
             if pixels_buf:
                 pixels_buf.release()
 
+    def _is_tiled(self):
+        # Whether the figure is shown as tiles (see `tiled`)
+        return self.get_element("tiles") is not None
+
+    def _pool_kind(self):
+        # Tiled figures have no figure canvas to pool (see `destroy`), and do
+        # not take the pooled elements of the other figures
+        if self.tiled:
+            return "tiled", super()._pool_kind()
+        return super()._pool_kind()
+
+    def _create_canvases(self, container, canvas, width, height):
+        if not self.tiled:
+            return super()._create_canvases(container, canvas, width, height)
+        # The tile canvases are added to this div by `_update_tiles`
+        tiles = document.createElement("div")
+        tiles.id = self._id + "tiles"
+        tiles.setAttribute("style", "position: absolute; left: 0; top: 0; z-index: 0")
+        container.appendChild(tiles)
+
+        # A div receiving the events, over the tiles, with the rubberband
+        # drawn as a box within it
+        rubberband = document.createElement("div")
+        rubberband.id = self._id + "rubberband"
+        rubberband.setAttribute(
+            "style",
+            "position: absolute; left: 0; top: 0; z-index: 0; outline: 0; "
+            + f"width: {width / self._ratio}px; height: {height / self._ratio}px",
+        )
+        rubberband.setAttribute("tabindex", "0")
+        box = document.createElement("div")
+        box.setAttribute(
+            "style",
+            "position: absolute; display: none; pointer-events: none; "
+            + "border: 1px dashed #000000",
+        )
+        rubberband.appendChild(box)
+        container.appendChild(rubberband)
+        return {"tiles": tiles, "rubberband": rubberband, "rubberband_box": box}
+
+    def _init_rubberband_context(self):
+        if not self._is_tiled():
+            super()._init_rubberband_context()
+
+    def draw_rubberband(self, x0, y0, x1, y1):
+        box = self.get_element("rubberband_box")
+        if box is None:
+            super().draw_rubberband(x0, y0, x1, y1)
+            return
+        height = self.get_width_height()[1]
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((height - y0, height - y1))
+        box.style.left = f"{x0}px"
+        box.style.top = f"{y0}px"
+        box.style.width = f"{x1 - x0}px"
+        box.style.height = f"{y1 - y0}px"
+        box.style.display = "block"
+
+    def remove_rubberband(self):
+        box = self.get_element("rubberband_box")
+        if box is None:
+            super().remove_rubberband()
+            return
+        box.style.display = "none"
+
+    def _is_frame_current(self, key):
+        # The visible tiles of tiled figures may not be drawn yet
+        return (
+            super()._is_frame_current(key) and self._visible_tiles <= self._drawn_tiles
+        )
+
+    def _is_frame_pending(self):
+        # Until the tiles in the viewport are known
+        return super()._is_frame_pending() or self._tiles_pending
+
+    def _idle_draw(self):
+        # Tiled figures only draw their visible tiles, without time slicing
+        if (
+            self.time_sliced_draw
+            and self._is_tiled()
+            and self._idle_scheduled
+            and self.is_visible()
+        ):
+            self.draw()
+            return
+        super()._idle_draw()
+
+    def _get_tile_renderer(self):
+        size = round(self.tile_size * self._ratio)
+        key = size, self.figure.dpi
+        if self._tile_renderer_key != key:
+            self._tile_renderer = RendererAggTile(size, size, self.figure.dpi)
+            self._tile_renderer_key = key
+        return self._tile_renderer
+
+    def _update_tiles(self):
+        """
+        Lays out the tile canvases for the current size of the figure, and
+        observes which ones are within `tile_margin` of the viewport. Called
+        with the figure dpi scaled by the ratio.
+        """
+        size = round(self.tile_size * self._ratio)
+        width, height = (int(value) for value in self.figure.bbox.size)
+        grid = width, height, size
+        if grid == self._tile_grid:
+            return
+        self._tile_grid = grid
+        container = self.get_element("tiles")
+        for name in [name for name in self._elements if name.startswith("tile:")]:
+            tile = self._elements.pop(name)
+            self._contexts.pop(name, None)
+            if self._tile_observer is not None:
+                self._tile_observer.unobserve(tile)
+            container.removeChild(tile)
+        if self._tile_observer is None and IntersectionObserver is not None:
+            self._tile_proxy = create_proxy(self._on_tile_intersection)
+            self._tile_observer = IntersectionObserver.new(
+                self._tile_proxy,
+                to_js(
+                    {"rootMargin": f"{self.tile_margin}px"},
+                    dict_converter=Object.fromEntries,
+                ),
+            )
+
+        tiles = [
+            (col, row)
+            for row in range(math.ceil(height / size))
+            for col in range(math.ceil(width / size))
+        ]
+        self._drawn_tiles = set()
+        # Without IntersectionObserver, all the tiles are drawn
+        self._visible_tiles = set() if self._tile_observer is not None else set(tiles)
+        for col, row in tiles:
+            name = f"tile:{col}:{row}"
+            tile = document.createElement("canvas")
+            tile.id = self._id + name
+            tile.setAttribute("data-tile", f"{col}:{row}")
+            # The canvas buffer is only allocated when the tile is drawn
+            tile.setAttribute("width", 0)
+            tile.setAttribute("height", 0)
+            tile.setAttribute(
+                "style",
+                "position: absolute; "
+                + f"left: {col * size / self._ratio}px; "
+                + f"top: {row * size / self._ratio}px; "
+                + f"width: {min(size, width - col * size) / self._ratio}px; "
+                + f"height: {min(size, height - row * size) / self._ratio}px",
+            )
+            container.appendChild(tile)
+            self._elements[name] = tile
+            if self._tile_observer is not None:
+                self._tile_observer.observe(tile)
+                self._tiles_pending = True
+
+    def _on_tile_intersection(self, entries, observer=None):
+        self._tiles_pending = False
+        for entry in entries:
+            col, row = (
+                int(i) for i in entry.target.getAttribute("data-tile").split(":")
+            )
+            if entry.isIntersecting:
+                self._visible_tiles.add((col, row))
+            else:
+                # Release the pixels of the tiles scrolled away
+                self._visible_tiles.discard((col, row))
+                self._drawn_tiles.discard((col, row))
+                entry.target.setAttribute("width", 0)
+                entry.target.setAttribute("height", 0)
+        if not self._visible_tiles <= self._drawn_tiles:
+            self.draw_idle()
+        self._notify_frame_ready()
+
+    def _draw_tiles(self):
+        """
+        Draws the visible tiles of a tiled figure that do not show its current
+        state, one at a time, with the figure shifted under the tile renderer.
+        The figure is laid out once, and each tile only draws the Axes over it.
+        """
+        self._cancel_sliced_draw()
+        self._idle_scheduled = True
+        frame_key = self._get_frame_key(self._ratio)
+        try:
+            with self._render_dpi(self._ratio):
+                self._update_tiles()
+                if self.figure.stale or self._frame_key != frame_key:
+                    self._drawn_tiles.clear()
+                self._frame_key = frame_key
+                tiles = sorted(
+                    self._visible_tiles - self._drawn_tiles,
+                    key=lambda tile: tile[::-1],
+                )
+                if not tiles:
+                    return
+                renderer = self._get_tile_renderer()
+                width, height, size = self._tile_grid
+                with self._profile_draw(renderer):
+                    with self._profile("figure.draw"):
+                        artists = self._get_tile_artists(renderer)
+                    for col, row in tiles:
+                        x0, y0 = col * size, height - (row + 1) * size
+                        renderer.set_offset(x0, y0)
+                        renderer.clear()
+                        with self._profile("figure.draw"):
+                            self._draw_tile(
+                                renderer, artists, Bbox.from_bounds(x0, y0, size, size)
+                            )
+                        name = f"tile:{col}:{row}"
+                        tile = self.get_element(name)
+                        w = min(size, width - col * size)
+                        h = min(size, height - row * size)
+                        if tile.width != w or tile.height != h:
+                            tile.setAttribute("width", w)
+                            tile.setAttribute("height", h)
+                        self._put_pixels(name, renderer.buffer_rgba(), (0, 0, w, h))
+                        self._drawn_tiles.add((col, row))
+                    self.figure.stale = False
+                DrawEvent("draw_event", self, renderer)._process()
+        except Exception as exc:
+            self._reject_frame_waiters(exc)
+            raise
+        finally:
+            self._idle_scheduled = False
+            self._notify_frame_ready()
+
+    def _get_tile_artists(self, renderer):
+        """
+        Lays out the figure like `Figure.draw`, and returns its top-level
+        artists in drawing order, with the display region each Axes draws on,
+        or None for the artists drawn on every tile: the other artists, which
+        are cheap to draw. Returns None if the figure is not visible.
+        """
+        figure = self.figure
+        if not figure.get_visible():
+            return None
+        artists = figure._get_draw_artists(renderer)
+        engine = figure.get_layout_engine()
+        if figure.axes and engine is not None:
+            try:
+                engine.execute(figure)
+            except ValueError:
+                pass
+        # Computing the tight bboxes marks the Axes stale, although they did
+        # not change
+        stale = {ax: ax.stale for ax in figure.axes}
+        artists = [
+            (artist, _get_ink_bbox(artist, renderer) if artist in stale else None)
+            for artist in artists
+        ]
+        for ax, value in stale.items():
+            if not value:
+                ax.stale = False
+        return artists
+
+    def _draw_tile(self, renderer, artists, tile):
+        """
+        Draws the *artists* of the figure (see `_get_tile_artists`) whose
+        region overlaps the display region of the *tile*.
+        """
+        if artists is None:
+            return
+        figure = self.figure
+        figure.patch.draw(renderer)
+        for artist, region in artists:
+            if region is None or region.overlaps(tile):
+                artist.draw(renderer)
+        for subfig in figure.subfigs:
+            subfig.draw(renderer)
+
+
+def _union_bounds(bounds):
+    # The smallest pixel bounds containing all the *bounds*, or None
+    if not bounds:
+        return None
+    x0s, y0s, x1s, y1s = zip(*bounds, strict=True)
+    return min(x0s), min(y0s), max(x1s), max(y1s)
+
 
 class NavigationToolbar2AggWasm(NavigationToolbar2Wasm):
     def download(self, format, mimetype):
@@ -99,7 +660,7 @@ class FigureManagerAggWasm(FigureManagerBase):
         self.canvas.destroy(*args, **kwargs)
 
     def resize(self, w, h):
-        pass
+        self.canvas.set_canvas_size(w, h)
 
     def set_window_title(self, title):
         self.canvas.set_window_title(title)
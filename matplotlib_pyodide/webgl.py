@@ -0,0 +1,493 @@
+"""
+WebGL drawing of dense lines, markers and marker collections for the HTML5
+canvas renderer.
+
+Stroking millions of segments with the canvas 2D API is slow, as every
+segment is a Python to JavaScript call. When `FigureCanvasHTMLCanvas.webgl`
+is set, `RendererWebGL` instead uploads the vertices of large paths, markers
+and path collections as typed arrays, and draws them with instanced quads:
+
+ - lines are drawn as one quad per segment,
+ - markers are rasterized once into a sprite, with the fill coverage in the
+   red channel and the edge coverage in the green channel, and drawn as one
+   textured quad per marker, tinted with its face and edge colors.
+
+The result is drawn on an offscreen WebGL 2 canvas, which is then composited
+onto the 2D canvas with a single ``drawImage`` call, under the clipping of the
+artist. Everything else, and the cases the WebGL path does not handle
+(curves, dashes, hatches, per-item line widths...), goes through the canvas
+2D renderer.
+
+Only WebGL 2 is used, which the software rasterizers (e.g. SwiftShader in
+headless Chrome) support as well. Without it, figures are drawn on the 2D
+canvas only.
+"""
+
+import numpy as np
+from js import Object, document
+from matplotlib.path import Path
+from matplotlib.transforms import Affine2D
+
+from matplotlib_pyodide.html5_canvas_backend import RendererHTMLCanvas
+from pyodide.ffi import create_proxy, to_js
+
+_SEGMENT_VERTEX_SHADER = """#version 300 es
+in vec2 a_corner;
+in vec2 a_start;
+in vec2 a_end;
+uniform vec2 u_resolution;
+uniform float u_width;
+uniform float u_extend;
+void main() {
+    vec2 direction = a_end - a_start;
+    float len = length(direction);
+    vec2 tangent = len > 0.0 ? direction / len : vec2(1.0, 0.0);
+    vec2 normal = vec2(-tangent.y, tangent.x);
+    // Extend the segments by half the line width for projecting caps, which
+    // also fills the gaps at the joins.
+    vec2 start = a_start - tangent * u_extend;
+    vec2 end = a_end + tangent * u_extend;
+    vec2 position = mix(start, end, a_corner.x) + normal * a_corner.y * u_width;
+    vec2 clip = position / u_resolution * 2.0 - 1.0;
+    gl_Position = vec4(clip.x, -clip.y, 0.0, 1.0);
+}
+"""
+
+_SEGMENT_FRAGMENT_SHADER = """#version 300 es
+precision mediump float;
+uniform vec4 u_color;
+out vec4 color;
+void main() {
+    color = u_color;
+}
+"""
+
+_SPRITE_VERTEX_SHADER = """#version 300 es
+in vec2 a_corner;
+in vec2 a_offset;
+in float a_scale;
+in vec4 a_face;
+in vec4 a_edge;
+uniform vec2 u_resolution;
+uniform vec2 u_size;
+uniform vec2 u_origin;
+out vec2 v_uv;
+out vec4 v_face;
+out vec4 v_edge;
+void main() {
+    vec2 position = a_offset + (a_corner * u_size - u_origin) * a_scale;
+    vec2 clip = position / u_resolution * 2.0 - 1.0;
+    gl_Position = vec4(clip.x, -clip.y, 0.0, 1.0);
+    v_uv = a_corner;
+    v_face = a_face;
+    v_edge = a_edge;
+}
+"""
+
+_SPRITE_FRAGMENT_SHADER = """#version 300 es
+precision mediump float;
+uniform sampler2D u_sprite;
+in vec2 v_uv;
+in vec4 v_face;
+in vec4 v_edge;
+out vec4 color;
+void main() {
+    vec4 coverage = texture(u_sprite, v_uv);
+    vec4 edge = v_edge * coverage.g;
+    color = edge + v_face * coverage.r * (1.0 - edge.a);
+}
+"""
+
+# Premultiplied RGBA of the markers with no face or edge
+_TRANSPARENT = np.zeros((1, 4), dtype=np.float32)
+
+
+def line_segments(vertices, codes):
+    """
+    Returns the segments of a path made of straight lines, as an (N, 4)
+    float32 array of start and end points, leaving out the segments with
+    non-finite ends. Returns None if the path has curves.
+    """
+    vertices = np.array(vertices, dtype=np.float64)
+    if codes is None:
+        codes = np.full(len(vertices), Path.LINETO, dtype=Path.code_type)
+        if len(codes):
+            codes[0] = Path.MOVETO
+    else:
+        codes = np.asarray(codes)
+        if np.isin(codes, (Path.CURVE3, Path.CURVE4)).any():
+            return None
+        # Close the subpaths by going back to their first vertex
+        closes = codes == Path.CLOSEPOLY
+        if closes.any():
+            moves = np.flatnonzero(codes == Path.MOVETO)
+            if not len(moves) or moves[0] != 0:
+                moves = np.concatenate([[0], moves])
+            subpath = np.searchsorted(moves, np.arange(len(codes)), side="right") - 1
+            vertices[closes] = vertices[moves[subpath[closes]]]
+    finite = np.isfinite(vertices).all(axis=1)
+    keep = finite[:-1] & finite[1:] & (codes[1:] != Path.MOVETO)
+    return np.hstack([vertices[:-1][keep], vertices[1:][keep]]).astype(np.float32)
+
+
+def _premultiplied(colors, alpha=None):
+    colors = np.array(colors, dtype=np.float32).reshape(-1, 4)
+    if alpha is not None:
+        colors[:, 3] = alpha
+    colors[:, :3] *= colors[:, 3:]
+    return colors
+
+
+class WebGLLayer:
+    """
+    An offscreen WebGL 2 canvas with the programs drawing line segments and
+    marker sprites. Use `WebGLLayer.create`, which returns None when WebGL 2
+    is not available.
+    """
+
+    def __init__(self, canvas, gl):
+        self.canvas = canvas
+        self.gl = gl
+        self._segment_program = self._link(
+            _SEGMENT_VERTEX_SHADER, _SEGMENT_FRAGMENT_SHADER
+        )
+        self._sprite_program = self._link(
+            _SPRITE_VERTEX_SHADER, _SPRITE_FRAGMENT_SHADER
+        )
+        self._corners = gl.createBuffer()
+        self._instances = gl.createBuffer()
+        self._texture = gl.createTexture()
+
+    @classmethod
+    def create(cls):
+        canvas = document.createElement("canvas")
+        attributes = to_js(
+            {"premultipliedAlpha": True, "antialias": True},
+            dict_converter=Object.fromEntries,
+        )
+        gl = canvas.getContext("webgl2", attributes)
+        if gl is None:
+            return None
+        try:
+            return cls(canvas, gl)
+        except RuntimeError:
+            return None
+
+    def _link(self, vertex_source, fragment_source):
+        gl = self.gl
+        program = gl.createProgram()
+        for kind, source in (
+            (gl.VERTEX_SHADER, vertex_source),
+            (gl.FRAGMENT_SHADER, fragment_source),
+        ):
+            shader = gl.createShader(kind)
+            gl.shaderSource(shader, source)
+            gl.compileShader(shader)
+            if not gl.getShaderParameter(shader, gl.COMPILE_STATUS):
+                raise RuntimeError(gl.getShaderInfoLog(shader))
+            gl.attachShader(program, shader)
+            gl.deleteShader(shader)
+        gl.linkProgram(program)
+        if not gl.getProgramParameter(program, gl.LINK_STATUS):
+            raise RuntimeError(gl.getProgramInfoLog(program))
+        return program
+
+    def _upload(self, buffer, array):
+        # The typed array is a view of the NumPy data, which bufferData
+        # copies to the GPU.
+        gl = self.gl
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        proxy = create_proxy(array)
+        data = proxy.getBuffer("f32")
+        try:
+            gl.bindBuffer(gl.ARRAY_BUFFER, buffer)
+            gl.bufferData(gl.ARRAY_BUFFER, data.data, gl.STREAM_DRAW)
+        finally:
+            data.release()
+            proxy.destroy()
+
+    def _attribute(self, program, name, size, stride, offset, divisor):
+        gl = self.gl
+        location = gl.getAttribLocation(program, name)
+        if location < 0:
+            return
+        gl.enableVertexAttribArray(location)
+        gl.vertexAttribPointer(location, size, gl.FLOAT, False, stride, offset)
+        gl.vertexAttribDivisor(location, divisor)
+
+    def begin(self, width, height):
+        """
+        Clears the layer, resizing it to *width* x *height* pixels if needed.
+        """
+        gl = self.gl
+        if self.canvas.width != width or self.canvas.height != height:
+            self.canvas.width = width
+            self.canvas.height = height
+        gl.viewport(0, 0, width, height)
+        gl.clearColor(0, 0, 0, 0)
+        gl.clear(gl.COLOR_BUFFER_BIT)
+        gl.enable(gl.BLEND)
+        gl.blendFunc(gl.ONE, gl.ONE_MINUS_SRC_ALPHA)
+
+    def _use(self, program, corners):
+        gl = self.gl
+        gl.useProgram(program)
+        gl.uniform2f(
+            gl.getUniformLocation(program, "u_resolution"),
+            self.canvas.width,
+            self.canvas.height,
+        )
+        self._upload(self._corners, corners)
+        self._attribute(program, "a_corner", 2, 8, 0, 0)
+
+    def draw_segments(self, segments, width, color, extend):
+        """
+        Draws the (N, 4) *segments* with a line *width* in pixels and the
+        premultiplied RGBA *color*, extending them by *extend* pixels at both
+        ends.
+        """
+        gl = self.gl
+        program = self._segment_program
+        self._use(program, [0, -1, 1, -1, 0, 1, 1, 1])
+        gl.uniform1f(gl.getUniformLocation(program, "u_width"), width / 2)
+        gl.uniform1f(gl.getUniformLocation(program, "u_extend"), extend)
+        gl.uniform4f(gl.getUniformLocation(program, "u_color"), *color)
+        self._upload(self._instances, segments)
+        self._attribute(program, "a_start", 2, 16, 0, 1)
+        self._attribute(program, "a_end", 2, 16, 8, 1)
+        gl.drawArraysInstanced(gl.TRIANGLE_STRIP, 0, 4, len(segments))
+
+    def draw_sprites(self, sprite, offsets, scales, faces, edges):
+        """
+        Draws the marker *sprite* (see `RendererWebGL._marker_sprite`) at the
+        (N, 2) *offsets*, scaled by *scales*, with the premultiplied RGBA
+        *faces* and *edges* colors. The scales and colors are cycled over.
+        """
+        gl = self.gl
+        canvas, width, height, origin_x, origin_y = sprite
+        count = len(offsets)
+        instances = np.empty((count, 11), dtype=np.float32)
+        instances[:, :2] = offsets
+        instances[:, 2] = np.resize(scales, count)
+        instances[:, 3:7] = np.resize(faces, (count, 4))
+        instances[:, 7:] = np.resize(edges, (count, 4))
+
+        program = self._sprite_program
+        self._use(program, [0, 0, 1, 0, 0, 1, 1, 1])
+        gl.uniform2f(gl.getUniformLocation(program, "u_size"), width, height)
+        gl.uniform2f(gl.getUniformLocation(program, "u_origin"), origin_x, origin_y)
+        gl.activeTexture(gl.TEXTURE0)
+        gl.bindTexture(gl.TEXTURE_2D, self._texture)
+        gl.pixelStorei(gl.UNPACK_PREMULTIPLY_ALPHA_WEBGL, True)
+        gl.texImage2D(gl.TEXTURE_2D, 0, gl.RGBA, gl.RGBA, gl.UNSIGNED_BYTE, canvas)
+        gl.texParameteri(gl.TEXTURE_2D, gl.TEXTURE_MIN_FILTER, gl.LINEAR)
+        gl.texParameteri(gl.TEXTURE_2D, gl.TEXTURE_MAG_FILTER, gl.LINEAR)
+        gl.texParameteri(gl.TEXTURE_2D, gl.TEXTURE_WRAP_S, gl.CLAMP_TO_EDGE)
+        gl.texParameteri(gl.TEXTURE_2D, gl.TEXTURE_WRAP_T, gl.CLAMP_TO_EDGE)
+        gl.uniform1i(gl.getUniformLocation(program, "u_sprite"), 0)
+        self._upload(self._instances, instances)
+        self._attribute(program, "a_offset", 2, 44, 0, 1)
+        self._attribute(program, "a_scale", 1, 44, 8, 1)
+        self._attribute(program, "a_face", 4, 44, 12, 1)
+        self._attribute(program, "a_edge", 4, 44, 28, 1)
+        gl.drawArraysInstanced(gl.TRIANGLE_STRIP, 0, 4, count)
+
+    def destroy(self):
+        gl = self.gl
+        gl.deleteBuffer(self._corners)
+        gl.deleteBuffer(self._instances)
+        gl.deleteTexture(self._texture)
+        gl.deleteProgram(self._segment_program)
+        gl.deleteProgram(self._sprite_program)
+        extension = gl.getExtension("WEBGL_lose_context")
+        if extension is not None:
+            extension.loseContext()
+
+
+class RendererWebGL(RendererHTMLCanvas):
+    """
+    The HTML5 canvas renderer, drawing the lines with at least *threshold*
+    vertices, and the markers and collections with at least *threshold*
+    items, on the WebGL *layer*.
+    """
+
+    def __init__(self, ctx, width, height, dpi, fig, layer, threshold):
+        super().__init__(ctx, width, height, dpi, fig)
+        self.layer = layer
+        self.threshold = threshold
+        self._sprites = {}
+        self._to_canvas = Affine2D().scale(1, -1).translate(0, self.height)
+
+    def _composite(self):
+        # The clipping of the artist is active on the 2D context
+        self.ctx.drawImage(self.layer.canvas, 0, 0)
+
+    def _gc_supported(self, gc):
+        return gc.get_hatch() is None and gc.get_dashes()[1] is None
+
+    def _gc_color(self, gc):
+        rgba = gc.get_rgb()
+        alpha = gc.get_alpha() if gc.get_forced_alpha() or len(rgba) < 4 else None
+        return _premultiplied(rgba if len(rgba) == 4 else (*rgba, 1), alpha)
+
+    def draw_path(self, gc, path, transform, rgbFace=None):
+        if (
+            rgbFace is not None
+            or not gc.stroke
+            or len(path.vertices) < self.threshold
+            or not self._gc_supported(gc)
+        ):
+            return super().draw_path(gc, path, transform, rgbFace)
+        vertices = (transform + self._to_canvas).transform(path.vertices)
+        segments = line_segments(vertices, path.codes)
+        if segments is None:
+            return super().draw_path(gc, path, transform, rgbFace)
+        width = self.points_to_pixels(gc.get_linewidth())
+        capstyle = gc.get_capstyle()
+        extend = 0 if capstyle == "butt" else width / 2
+        self.layer.begin(self.width, self.height)
+        if len(segments):
+            self.layer.draw_segments(segments, width, self._gc_color(gc)[0], extend)
+        self._composite()
+
+    def _marker_sprite(self, path, transform, linewidth, joinstyle):
+        """
+        Rasterizes the marker *path*, transformed to pixels by *transform*,
+        into a 2D canvas with the fill coverage in the red channel and the
+        edge coverage in the green one. Returns the canvas, its size and the
+        position of the marker origin in it.
+        """
+        key = (
+            path.vertices.tobytes(),
+            None if path.codes is None else path.codes.tobytes(),
+            transform.get_matrix().tobytes(),
+            linewidth,
+            joinstyle,
+        )
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            return sprite
+        transform = transform + Affine2D().scale(1, -1)
+        vertices = transform.transform(path.vertices)
+        vertices = vertices[np.isfinite(vertices).all(axis=1)]
+        pad = linewidth / 2 + 1
+        (x0, y0), (x1, y1) = vertices.min(axis=0) - pad, vertices.max(axis=0) + pad
+        width = max(int(np.ceil(x1 - x0)), 1)
+        height = max(int(np.ceil(y1 - y0)), 1)
+
+        canvas = document.createElement("canvas")
+        canvas.width = width
+        canvas.height = height
+        ctx = canvas.getContext("2d")
+        self._path_helper(ctx, path, transform + Affine2D().translate(-x0, -y0))
+        ctx.fillStyle = "#ff0000"
+        ctx.fill()
+        if linewidth:
+            ctx.globalCompositeOperation = "lighter"
+            ctx.lineJoin = joinstyle
+            ctx.lineWidth = linewidth
+            ctx.strokeStyle = "#00ff00"
+            ctx.stroke()
+        sprite = self._sprites[key] = (canvas, width, height, -x0, -y0)
+        return sprite
+
+    def _offsets(self, offsets, transform):
+        offsets = (transform + self._to_canvas).transform(offsets)
+        return offsets[np.isfinite(offsets).all(axis=1)]
+
+    def draw_markers(self, gc, marker_path, marker_trans, path, trans, rgbFace=None):
+        if len(path.vertices) < self.threshold or not self._gc_supported(gc):
+            return super().draw_markers(
+                gc, marker_path, marker_trans, path, trans, rgbFace
+            )
+        linewidth = self.points_to_pixels(gc.get_linewidth()) if gc.stroke else 0
+        sprite = self._marker_sprite(
+            marker_path, marker_trans, linewidth, gc.get_joinstyle()
+        )
+        if rgbFace is None:
+            face = _TRANSPARENT
+        else:
+            rgbFace = rgbFace if len(rgbFace) == 4 else (*rgbFace, 1)
+            alpha = gc.get_alpha() if gc.get_forced_alpha() else None
+            face = _premultiplied(rgbFace, alpha)
+        edge = self._gc_color(gc) if linewidth else _TRANSPARENT
+        self.layer.begin(self.width, self.height)
+        offsets = self._offsets(path.vertices, trans)
+        if len(offsets):
+            self.layer.draw_sprites(sprite, offsets, [1], face, edge)
+        self._composite()
+
+    def draw_path_collection(
+        self,
+        gc,
+        master_transform,
+        paths,
+        all_transforms,
+        offsets,
+        offset_trans,
+        facecolors,
+        edgecolors,
+        linewidths,
+        linestyles,
+        antialiaseds,
+        urls,
+        offset_position,
+    ):
+        args = (
+            gc,
+            master_transform,
+            paths,
+            all_transforms,
+            offsets,
+            offset_trans,
+            facecolors,
+            edgecolors,
+            linewidths,
+            linestyles,
+            antialiaseds,
+            urls,
+            offset_position,
+        )
+        offsets = np.asarray(offsets).reshape(-1, 2)
+        all_transforms = np.asarray(all_transforms).reshape(-1, 3, 3)
+        linewidths = np.unique(linewidths)
+        # Only collections of a single marker path, scaled but not rotated
+        # (e.g. scatter plots), are drawn with WebGL.
+        if (
+            len(paths) != 1
+            or len(offsets) < self.threshold
+            or not np.array_equal(master_transform.get_matrix(), np.eye(3))
+            or all_transforms[:, 0, 1].any()
+            or all_transforms[:, 1, 0].any()
+            or not np.array_equal(all_transforms[:, 0, 0], all_transforms[:, 1, 1])
+            or len(linewidths) > 1
+            or any(dashes is not None for _, dashes in linestyles)
+            or gc.get_hatch() is not None
+        ):
+            return super().draw_path_collection(*args)
+
+        scales = all_transforms[:, 0, 0] if len(all_transforms) else np.ones(1)
+        reference = scales.max()
+        if reference <= 0:
+            return
+        linewidth = self.points_to_pixels(linewidths[0]) if len(linewidths) else 0
+        if not len(edgecolors):
+            linewidth = 0
+        sprite = self._marker_sprite(
+            paths[0], Affine2D().scale(reference), linewidth, gc.get_joinstyle()
+        )
+        faces = _premultiplied(facecolors) if len(facecolors) else _TRANSPARENT
+        edges = _premultiplied(edgecolors) if linewidth else _TRANSPARENT
+        finite = np.isfinite(offset_trans.transform(offsets)).all(axis=1)
+        self.layer.begin(self.width, self.height)
+        if finite.any():
+            # Keep the scales and colors cycling in step with the offsets
+            count = len(offsets)
+            self.layer.draw_sprites(
+                sprite,
+                self._offsets(offsets[finite], offset_trans),
+                np.resize(scales / reference, count)[finite],
+                np.resize(faces, (count, 4))[finite],
+                np.resize(edges, (count, 4))[finite],
+            )
+        self._composite()
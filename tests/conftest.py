@@ -1,3 +1,5 @@
+import json
+import sys
 from functools import reduce
 from pathlib import Path
 
@@ -16,6 +18,70 @@ def matplotlib_test_decorator(f):
     return reduce(lambda x, g: g(x), DECORATORS, f)
 
 
+def pytest_addoption(parser):
+    group = parser.getgroup("matplotlib-pyodide benchmarks")
+    group.addoption(
+        "--run-benchmarks",
+        action="store_true",
+        default=False,
+        help="Run the rendering benchmarks (skipped by default)",
+    )
+    group.addoption(
+        "--benchmark-json",
+        default="benchmark-results.json",
+        help="File the benchmark results are written to",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: rendering benchmark, only run with --run-benchmarks"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with --run-benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def fake_browser(monkeypatch):
+    """
+    Installs the pure-Python stand-in for the browser (see fake_js.py), so
+    that the backends can be exercised under CPython, and returns its state.
+    """
+    matplotlib = pytest.importorskip("matplotlib")
+    import fake_js
+
+    def unload_backends():
+        # The backends bind the browser objects when they are imported
+        for name in list(sys.modules):
+            if name.split(".")[0] == "matplotlib_pyodide":
+                del sys.modules[name]
+
+    browser = fake_js.install(monkeypatch)
+    monkeypatch.setitem(
+        matplotlib.rcParams, "interactive", matplotlib.rcParams["interactive"]
+    )
+    unload_backends()
+    yield browser
+    unload_backends()
+
+
+@pytest.fixture(scope="session")
+def benchmark_results(request):
+    """Collects the benchmark results and writes them as JSON at the end"""
+    results = []
+    yield results
+    if results:
+        output = Path(request.config.getoption("--benchmark-json"))
+        output.write_text(json.dumps({"results": results}, indent=2))
+
+
 @pytest.fixture(scope="module")
 def wheel_path(tmp_path_factory):
     # Build a micropip wheel for testing
@@ -0,0 +1,639 @@
+"""
+A pure-Python stand-in for the browser, so that the backends can be imported
+and exercised under CPython.
+
+`install()` registers fake ``js``, ``pyodide``, ``pyodide.ffi`` and
+``pyodide.ffi.wrappers`` modules in ``sys.modules``. Every canvas operation,
+DOM allocation and buffer copy is recorded in ``browser.log`` so that tests
+can put upper bounds on the work done per draw. Timers and animation frames
+only run when the tests ask for it, with `Browser.run_timers` and
+`Browser.run_frame`.
+"""
+
+import sys
+import types
+from collections import Counter
+
+
+class OpLog:
+    def __init__(self):
+        self.ops = []
+
+    def record(self, kind, name):
+        self.ops.append((kind, name))
+
+    def clear(self):
+        self.ops.clear()
+
+    def count(self, kind=None, name=None):
+        return sum(
+            1
+            for k, n in self.ops
+            if (kind is None or k == kind) and (name is None or n == name)
+        )
+
+    def counter(self, kind):
+        return Counter(n for k, n in self.ops if k == kind)
+
+
+class FakeProxy:
+    """Stands in for the PyProxy returned by `create_proxy`."""
+
+    live = 0
+
+    def __init__(self, obj):
+        self._obj = obj
+        self.destroyed = False
+        FakeProxy.live += 1
+
+    def __call__(self, *args, **kwargs):
+        if self.destroyed:
+            raise RuntimeError("This borrowed proxy was automatically destroyed")
+        return self._obj(*args, **kwargs)
+
+    def destroy(self):
+        if self.destroyed:
+            raise RuntimeError("Object has already been destroyed")
+        self.destroyed = True
+        FakeProxy.live -= 1
+
+    def getBuffer(self, type=None):
+        browser.log.record("copy", "getBuffer")
+        return FakeBuffer(self._obj)
+
+
+class FakeBuffer:
+    def __init__(self, data):
+        self.data = data
+
+    def release(self):
+        pass
+
+
+class FakeStyle:
+    def __init__(self):
+        self.__dict__["_props"] = {}
+
+    def __getattr__(self, name):
+        return self._props.get(name, "")
+
+    def __setattr__(self, name, value):
+        self._props[name] = value
+
+
+class FakeClassList:
+    def __init__(self):
+        self.classes = []
+
+    def add(self, name):
+        if name not in self.classes:
+            self.classes.append(name)
+
+    def remove(self, name):
+        if name in self.classes:
+            self.classes.remove(name)
+
+
+_CONTEXT_METHODS = {
+    "arc",
+    "beginPath",
+    "bezierCurveTo",
+    "clearRect",
+    "clip",
+    "closePath",
+    "drawImage",
+    "fill",
+    "fillRect",
+    "fillText",
+    "getImageData",
+    "lineTo",
+    "measureText",
+    "moveTo",
+    "putImageData",
+    "quadraticCurveTo",
+    "rect",
+    "resetTransform",
+    "restore",
+    "rotate",
+    "save",
+    "scale",
+    "setLineDash",
+    "setTransform",
+    "stroke",
+    "strokeRect",
+    "transform",
+    "translate",
+}
+
+
+class FakeContext2D:
+    """Records every method call and property set made on a 2D context."""
+
+    def __init__(self, canvas):
+        self.__dict__["canvas"] = canvas
+        self.reset_state()
+
+    def reset_state(self):
+        # What resizing the canvas does
+        self.__dict__["_props"] = {
+            "lineWidth": 1.0,
+            "lineCap": "butt",
+            "lineJoin": "miter",
+            "fillStyle": "#000000",
+            "strokeStyle": "#000000",
+            "globalAlpha": 1.0,
+            "font": "10px sans-serif",
+        }
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name == "reset_state":
+            raise AttributeError(name)
+        if name in self._props:
+            browser.log.record("get", name)
+            return self._props[name]
+        if name not in _CONTEXT_METHODS:
+            raise AttributeError(name)
+
+        def method(*args):
+            browser.log.record("call", name)
+            if name == "getImageData":
+                return FakeImageData(None, args[2], args[3])
+            if name == "measureText":
+                return types.SimpleNamespace(width=len(args[0]) * 6.0)
+            return None
+
+        return method
+
+    def __setattr__(self, name, value):
+        browser.log.record("set", name)
+        self._props[name] = value
+
+
+class FakeElement:
+    def __init__(self, tag):
+        self.tagName = tag.upper()
+        self.id = ""
+        self.attributes = {}
+        self.style = FakeStyle()
+        self.classList = FakeClassList()
+        self.children = []
+        self.parentNode = None
+        self.textContent = ""
+        self.listeners = []
+        self._context = None
+        self._width = 300
+        self._height = 150
+
+    @property
+    def width(self):
+        return self._width
+
+    @width.setter
+    def width(self, value):
+        self._width = int(value)
+        self._reset()
+
+    @property
+    def height(self):
+        return self._height
+
+    @height.setter
+    def height(self, value):
+        self._height = int(value)
+        self._reset()
+
+    def _reset(self):
+        # Resizing a canvas clears it and resets the state of its context
+        if self._context is not None:
+            self._context.reset_state()
+
+    @property
+    def isConnected(self):
+        node = self
+        while node.parentNode is not None:
+            node = node.parentNode
+        return node.tagName in ("HEAD", "BODY")
+
+    @property
+    def firstChild(self):
+        return self.children[0] if self.children else None
+
+    def setAttribute(self, name, value):
+        if name in ("width", "height"):
+            setattr(self, name, value)
+        elif name == "style":
+            self.style = FakeStyle()
+        self.attributes[name] = value
+
+    def getAttribute(self, name):
+        return self.attributes.get(name)
+
+    def appendChild(self, child):
+        if child.parentNode is not None:
+            child.parentNode.removeChild(child)
+        child.parentNode = self
+        self.children.append(child)
+        return child
+
+    def insertBefore(self, child, reference):
+        if child.parentNode is not None:
+            child.parentNode.removeChild(child)
+        child.parentNode = self
+        self.children.insert(self.children.index(reference), child)
+        return child
+
+    def removeChild(self, child):
+        self.children.remove(child)
+        child.parentNode = None
+        return child
+
+    def getContext(self, kind, attributes=None):
+        browser.log.record("lookup", "getContext")
+        if kind != "2d":
+            # Like a browser without WebGL
+            return None
+        if self._context is None:
+            browser.log.record("alloc", "context")
+            self._context = FakeContext2D(self)
+        return self._context
+
+    def addEventListener(self, type, listener, options=None):
+        self.listeners.append((type, listener))
+
+    def removeEventListener(self, type, listener, options=None):
+        self.listeners = [
+            (t, f) for t, f in self.listeners if not (t == type and f is listener)
+        ]
+
+    def dispatch(self, type, event):
+        for t, f in list(self.listeners):
+            if t == type:
+                f(event)
+
+    def toDataURL(self, mimetype="image/png"):
+        return "data:image/png;base64,"
+
+    def focus(self):
+        pass
+
+    def blur(self):
+        pass
+
+    def scrollIntoView(self):
+        pass
+
+    def click(self):
+        pass
+
+    def iter(self):
+        yield self
+        for child in self.children:
+            yield from child.iter()
+
+
+class FakeFonts:
+    def __init__(self):
+        self.faces = []
+
+    def add(self, face):
+        self.faces.append(face)
+
+
+class FakeDocument:
+    def __init__(self):
+        self.head = FakeElement("head")
+        self.body = FakeElement("body")
+        self.fonts = FakeFonts()
+        self.visibilityState = "visible"
+        self.listeners = []
+
+    def addEventListener(self, type, listener, options=None):
+        self.listeners.append((type, listener))
+
+    def removeEventListener(self, type, listener, options=None):
+        self.listeners = [
+            (t, f) for t, f in self.listeners if not (t == type and f is listener)
+        ]
+
+    def dispatch(self, type, event=None):
+        for t, f in list(self.listeners):
+            if t == type:
+                f(event)
+
+    def createElement(self, tag):
+        browser.log.record("alloc", tag)
+        return FakeElement(tag)
+
+    def createTextNode(self, text):
+        node = FakeElement("#text")
+        node.textContent = text
+        return node
+
+    def getElementById(self, id):
+        browser.log.record("lookup", "getElementById")
+        for root in (self.head, self.body):
+            for element in root.iter():
+                if element.id == id:
+                    return element
+        return None
+
+
+class FakeImageData:
+    def __init__(self, data, width, height):
+        self.data = data
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def new(cls, data, width, height):
+        browser.log.record("alloc", "ImageData")
+        return cls(data, width, height)
+
+
+class FakeFuture:
+    def __init__(self, value):
+        self._value = value
+        self._callbacks = []
+
+    def add_done_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def result(self):
+        return self._value
+
+    def resolve(self):
+        for callback in self._callbacks:
+            callback(self)
+
+
+class FakeImageBitmap:
+    def __init__(self, source):
+        self.width = source.width
+        self.height = source.height
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def create_image_bitmap(source):
+    browser.log.record("alloc", "ImageBitmap")
+    future = FakeFuture(FakeImageBitmap(source))
+    browser.pending_bitmaps.append(future)
+    return future
+
+
+class FakeFontFace:
+    def __init__(self, family, source):
+        self.family = family
+        self.source = source
+
+    @classmethod
+    def new(cls, family, source):
+        return cls(family, source)
+
+    def load(self):
+        future = FakeFuture(self)
+        browser.pending_fonts.append(future)
+        return future
+
+
+class FakeObserver:
+    """Stands in for ResizeObserver."""
+
+    def __init__(self, callback, options=None):
+        self.callback = callback
+        self.targets = []
+
+    @classmethod
+    def new(cls, callback, options=None):
+        observer = cls(callback, options)
+        browser.observers.append(observer)
+        return observer
+
+    def observe(self, target):
+        self.targets.append(target)
+
+    def unobserve(self, target):
+        self.targets.remove(target)
+
+    def disconnect(self):
+        self.targets.clear()
+        if self in browser.observers:
+            browser.observers.remove(self)
+
+
+class FakeIntersectionObserver(FakeObserver):
+    """
+    Stands in for IntersectionObserver. Like in browsers, the initial state
+    of an observed element is reported after the next animation frame.
+    """
+
+    def observe(self, target):
+        super().observe(target)
+        browser.pending_intersections.append((self, target))
+
+
+class FakePerformance:
+    def __init__(self):
+        self.now_ms = 0.0
+        self.entries = []
+
+    def now(self):
+        return self.now_ms
+
+    def mark(self, name, options=None):
+        self.entries.append(("mark", name))
+
+    def measure(self, name, start=None, end=None):
+        self.entries.append(("measure", name))
+
+    def clearMarks(self, name=None):
+        pass
+
+    def clearMeasures(self, name=None):
+        pass
+
+
+class Browser:
+    """The state of the fake page: timers, animation frames and the op log."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.log = OpLog()
+        self.document = FakeDocument()
+        self.performance = FakePerformance()
+        self.timers = {}
+        self.frames = {}
+        self.observers = []
+        self.pending_fonts = []
+        self.pending_bitmaps = []
+        self.pending_intersections = []
+        self.hidden_elements = set()
+        # The js.devicePixelRatio seen by the backends imported afterwards
+        self.device_pixel_ratio = 1
+        self._next_id = 1
+
+    def _new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def set_timeout(self, callback, timeout):
+        id = self._new_id()
+        self.timers[id] = (callback, timeout, False)
+        return id
+
+    def set_interval(self, callback, interval):
+        id = self._new_id()
+        self.timers[id] = (callback, interval, True)
+        return id
+
+    def clear_timer(self, id):
+        self.timers.pop(id, None)
+
+    def run_timers(self, rounds=10):
+        """Runs the pending timeouts (and intervals once per round)."""
+        for _ in range(rounds):
+            if not self.timers:
+                return
+            for id, (callback, _, repeat) in list(self.timers.items()):
+                if id not in self.timers:
+                    continue
+                if not repeat:
+                    del self.timers[id]
+                callback()
+
+    def request_animation_frame(self, callback):
+        id = self._new_id()
+        self.frames[id] = callback
+        return id
+
+    def cancel_animation_frame(self, id):
+        self.frames.pop(id, None)
+
+    def run_frame(self, timestamp=None):
+        """Runs the animation frame callbacks that are currently queued."""
+        frames, self.frames = self.frames, {}
+        if timestamp is None:
+            timestamp = self.performance.now_ms
+        for callback in frames.values():
+            callback(timestamp)
+        pending, self.pending_intersections = self.pending_intersections, []
+        for observer, target in pending:
+            if target in observer.targets:
+                observer.callback(
+                    [
+                        types.SimpleNamespace(
+                            target=target,
+                            isIntersecting=id(target) not in self.hidden_elements,
+                        )
+                    ],
+                    observer,
+                )
+
+    def scroll(self, element, visible):
+        """Scrolls *element* into or out of the viewport."""
+        if visible:
+            self.hidden_elements.discard(id(element))
+        else:
+            self.hidden_elements.add(id(element))
+        for observer in self.observers:
+            if isinstance(observer, FakeIntersectionObserver):
+                if element in observer.targets:
+                    self.pending_intersections.append((observer, element))
+
+    def set_visibility_state(self, state):
+        """Shows or hides the page, as when switching tabs."""
+        self.document.visibilityState = state
+        self.document.dispatch("visibilitychange")
+
+    def create_bitmaps(self):
+        pending, self.pending_bitmaps = self.pending_bitmaps, []
+        for future in pending:
+            future.resolve()
+
+    def load_fonts(self):
+        pending, self.pending_fonts = self.pending_fonts, []
+        for future in pending:
+            future.resolve()
+
+
+browser = Browser()
+
+
+def _make_js_module():
+    js = types.ModuleType("js")
+
+    def __getattr__(name):
+        if name == "document":
+            return browser.document
+        if name == "performance":
+            return browser.performance
+        if name == "devicePixelRatio":
+            return browser.device_pixel_ratio
+        raise AttributeError(name)
+
+    js.__getattr__ = __getattr__
+    js.ImageData = FakeImageData
+    js.FontFace = FakeFontFace
+    js.createImageBitmap = create_image_bitmap
+    js.ResizeObserver = FakeObserver
+    js.IntersectionObserver = FakeIntersectionObserver
+    js.requestAnimationFrame = lambda callback: browser.request_animation_frame(
+        callback
+    )
+    js.cancelAnimationFrame = lambda id: browser.cancel_animation_frame(id)
+    js.Object = types.SimpleNamespace(fromEntries=dict)
+    return js
+
+
+def _make_pyodide_modules():
+    pyodide = types.ModuleType("pyodide")
+    ffi = types.ModuleType("pyodide.ffi")
+    wrappers = types.ModuleType("pyodide.ffi.wrappers")
+
+    ffi.create_proxy = FakeProxy
+    ffi.to_js = lambda obj, **kwargs: obj
+    ffi.JsProxy = object
+
+    _listeners = {}
+
+    def add_event_listener(elt, event, listener):
+        proxy = FakeProxy(listener)
+        _listeners[(id(elt), event, listener)] = proxy
+        elt.addEventListener(event, proxy)
+
+    def remove_event_listener(elt, event, listener):
+        proxy = _listeners.pop((id(elt), event, listener))
+        elt.removeEventListener(event, proxy)
+        proxy.destroy()
+
+    wrappers.add_event_listener = add_event_listener
+    wrappers.remove_event_listener = remove_event_listener
+    wrappers.set_timeout = lambda callback, timeout: browser.set_timeout(
+        callback, timeout
+    )
+    wrappers.set_interval = lambda callback, interval: browser.set_interval(
+        callback, interval
+    )
+    wrappers.clear_timeout = lambda id: browser.clear_timer(id)
+    wrappers.clear_interval = lambda id: browser.clear_timer(id)
+
+    pyodide.ffi = ffi
+    ffi.wrappers = wrappers
+    return {"pyodide": pyodide, "pyodide.ffi": ffi, "pyodide.ffi.wrappers": wrappers}
+
+
+def install(monkeypatch):
+    """
+    Registers the fake browser modules with *monkeypatch*, so that they are
+    removed at the end of the test, and returns the `browser` state.
+    """
+    browser.reset()
+    FakeProxy.live = 0
+    monkeypatch.setitem(sys.modules, "js", _make_js_module())
+    for name, module in _make_pyodide_modules().items():
+        monkeypatch.setitem(sys.modules, name, module)
+    return browser
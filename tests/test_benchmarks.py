@@ -0,0 +1,226 @@
+"""
+Rendering benchmarks for the Pyodide backends.
+
+These are skipped unless pytest is run with ``--run-benchmarks``. The timings
+are written as JSON to the file given by ``--benchmark-json``, so that the
+results of different releases can be compared.
+"""
+
+from functools import reduce
+
+import pytest
+from pytest_pyodide import run_in_pyodide
+
+BACKENDS = ["wasm_backend", "html5_canvas_backend", "hybrid_backend"]
+
+FIGURES = [
+    "line_1m",
+    "scatter_50k",
+    "imshow_2k",
+    "pcolormesh",
+    "text_200",
+    "mathtext",
+]
+
+REDRAWS = 5
+
+BENCHMARK_DECORATORS = [
+    pytest.mark.benchmark,
+    pytest.mark.xfail_browsers(node="No supported matplotlib backends on node"),
+    pytest.mark.skip_refcount_check,
+    pytest.mark.skip_pyproxy_check,
+    # The canvas renderer issues one call per path segment for the 1M points
+    # line, which takes a while.
+    pytest.mark.driver_timeout(900),
+]
+
+
+def benchmark_decorator(f):
+    return reduce(lambda x, g: g(x), BENCHMARK_DECORATORS, f)
+
+
+@run_in_pyodide(packages=["matplotlib"])
+def run_benchmark(selenium, backend, figure_name, redraws):
+    import statistics
+    import time
+
+    import matplotlib
+    import numpy as np
+    from matplotlib.figure import Figure
+
+    import matplotlib_pyodide
+    import pyodide
+
+    if backend == "wasm_backend":
+        from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm as Canvas
+    elif backend == "hybrid_backend":
+        from matplotlib_pyodide.hybrid_backend import FigureCanvasHybrid as Canvas
+    else:
+        from matplotlib_pyodide.html5_canvas_backend import (
+            FigureCanvasHTMLCanvas as Canvas,
+        )
+
+    rng = np.random.default_rng(0)
+    fig = Figure()
+    Canvas(fig)
+    ax = fig.add_subplot()
+    if figure_name == "line_1m":
+        ax.plot(rng.standard_normal(1_000_000).cumsum())
+    elif figure_name == "scatter_50k":
+        ax.scatter(*rng.random((2, 50_000)), s=2)
+    elif figure_name == "imshow_2k":
+        ax.imshow(rng.random((2000, 2000)))
+    elif figure_name == "pcolormesh":
+        ax.pcolormesh(rng.random((200, 200)))
+    elif figure_name == "text_200":
+        for i, (x, y) in enumerate(rng.random((200, 2))):
+            ax.text(x, y, f"label {i}")
+    elif figure_name == "mathtext":
+        for x, y in rng.random((20, 2)):
+            ax.text(x, y, r"$\sum_{i=0}^{\infty} \frac{x^i}{i!} = e^{x}$")
+    else:
+        raise ValueError(f"Unknown benchmark figure {figure_name}")
+
+    start = time.perf_counter()
+    fig.canvas.show()
+    # show() leaves the first draw to when the figure is reported in view
+    fig.canvas.draw()
+    first_render = (time.perf_counter() - start) * 1000
+
+    fig.canvas.start_profiling(per_artist=False)
+    redraw_times = []
+    for _ in range(redraws):
+        start = time.perf_counter()
+        fig.canvas.draw()
+        redraw_times.append((time.perf_counter() - start) * 1000)
+    phases = fig.canvas.stop_profiling()["mean"]
+    fig.canvas.destroy()
+
+    return {
+        "first_render_ms": first_render,
+        "redraw_ms": statistics.median(redraw_times),
+        "redraw_min_ms": min(redraw_times),
+        "redraw_phases_ms": phases,
+        "versions": {
+            "matplotlib_pyodide": getattr(matplotlib_pyodide, "__version__", None),
+            "matplotlib": matplotlib.__version__,
+            "pyodide": pyodide.__version__,
+        },
+    }
+
+
+@benchmark_decorator
+@pytest.mark.parametrize("figure_name", FIGURES)
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_render_benchmark(
+    selenium_standalone_matplotlib, benchmark_results, backend, figure_name
+):
+    selenium = selenium_standalone_matplotlib
+    result = run_benchmark(selenium, backend, figure_name, REDRAWS)
+    benchmark_results.append(
+        {
+            "benchmark": "render",
+            "browser": selenium.browser,
+            "backend": backend,
+            "figure": figure_name,
+            **result,
+        }
+    )
+
+
+ANIMATIONS = ["line", "scatter", "imshow"]
+
+ANIMATION_INTERVAL = 20
+
+ANIMATION_FRAMES = 100
+
+
+@run_in_pyodide(packages=["matplotlib"])
+async def run_animation_benchmark(selenium, animation, frame_aligned, interval, frames):
+    import asyncio
+    import statistics
+
+    import numpy as np
+    from js import performance
+    from matplotlib.animation import FuncAnimation
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    rng = np.random.default_rng(0)
+    fig = Figure()
+    canvas = FigureCanvasAggWasm(fig)
+    canvas.frame_aligned_timers = frame_aligned
+    ax = fig.add_subplot()
+    x = np.linspace(0, 2 * np.pi, 1000)
+    if animation == "line":
+        (artist,) = ax.plot(x, np.sin(x))
+
+        def update(i):
+            artist.set_ydata(np.sin(x + i / 10))
+            return (artist,)
+
+    elif animation == "scatter":
+        artist = ax.scatter(*rng.random((2, 2000)), s=4)
+
+        def update(i):
+            artist.set_offsets(rng.random((2000, 2)))
+            return (artist,)
+
+    elif animation == "imshow":
+        artist = ax.imshow(rng.random((200, 200)))
+
+        def update(i):
+            artist.set_data(rng.random((200, 200)))
+            return (artist,)
+
+    else:
+        raise ValueError(f"Unknown benchmark animation {animation}")
+
+    canvas.show()
+    timestamps = []
+    canvas.mpl_connect("draw_event", lambda event: timestamps.append(performance.now()))
+    done = asyncio.get_running_loop().create_future()
+
+    def frame_counter():
+        for i in range(frames):
+            yield i
+        done.set_result(None)
+
+    anim = FuncAnimation(
+        fig, update, frames=frame_counter, interval=interval, repeat=False
+    )
+    await asyncio.wait_for(done, 120)
+    anim.event_source.stop()
+    canvas.destroy()
+
+    frame_times = np.diff(timestamps)
+    return {
+        "fps": 1000 * len(frame_times) / (timestamps[-1] - timestamps[0]),
+        "frame_time_ms": statistics.median(frame_times),
+        "jitter_ms": statistics.stdev(frame_times),
+        "frame_time_max_ms": max(frame_times),
+    }
+
+
+@benchmark_decorator
+@pytest.mark.parametrize("frame_aligned", [False, True])
+@pytest.mark.parametrize("animation", ANIMATIONS)
+def test_animation_benchmark(
+    selenium_standalone_matplotlib, benchmark_results, animation, frame_aligned
+):
+    selenium = selenium_standalone_matplotlib
+    result = run_animation_benchmark(
+        selenium, animation, frame_aligned, ANIMATION_INTERVAL, ANIMATION_FRAMES
+    )
+    benchmark_results.append(
+        {
+            "benchmark": "animation",
+            "browser": selenium.browser,
+            "backend": "wasm_backend",
+            "animation": animation,
+            "frame_aligned": frame_aligned,
+            "target_fps": 1000 / ANIMATION_INTERVAL,
+            **result,
+        }
+    )
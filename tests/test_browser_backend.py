@@ -0,0 +1,795 @@
+"""
+Tests of the browser backend that run under plain CPython, against the
+browser stand-in of fake_js.py.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+
+def make_timer(fake_browser, interval, frame_aligned=True):
+    from matplotlib_pyodide.browser_backend import TimerWasm
+
+    ticks = []
+    timer = TimerWasm(interval=interval, frame_aligned=frame_aligned)
+    timer.add_callback(lambda: ticks.append(fake_browser.performance.now_ms))
+    return timer, ticks
+
+
+def run_frames(fake_browser, timestamps):
+    for timestamp in timestamps:
+        fake_browser.performance.now_ms = timestamp
+        fake_browser.run_frame(timestamp)
+
+
+def test_timer_interval_before_start(fake_browser):
+    from matplotlib_pyodide.browser_backend import TimerWasm
+
+    timer = TimerWasm(interval=50)
+    timer.interval = 20
+    assert not fake_browser.timers
+
+
+def test_frame_aligned_timer_no_drift(fake_browser):
+    timer, ticks = make_timer(fake_browser, 50)
+    timer.start()
+    assert not fake_browser.timers
+    # 60 Hz frames for one second
+    run_frames(fake_browser, [i * 1000 / 60 for i in range(61)])
+    # The ticks stay on the 50 ms schedule
+    assert len(ticks) == 20
+    for i, tick in enumerate(ticks, 1):
+        assert abs(tick - 50 * i) <= 1000 / 120
+
+
+def test_frame_aligned_timer_skips_missed_ticks(fake_browser):
+    timer, ticks = make_timer(fake_browser, 20)
+    timer.start()
+    run_frames(fake_browser, [0, 16, 32])
+    assert ticks == [16, 32]
+    # The ticks missed during a long frame (e.g. a slow draw) result in a
+    # single tick, and the timer then resumes on its schedule
+    run_frames(fake_browser, [200])
+    assert ticks == [16, 32, 200]
+    run_frames(fake_browser, [216, 232])
+    assert ticks == [16, 32, 200, 216, 232]
+
+
+def test_frame_aligned_timer_stop(fake_browser):
+    timer, ticks = make_timer(fake_browser, 20)
+    timer.start()
+    assert fake_browser.frames
+    proxy = timer._frame_proxy
+    timer.stop()
+    assert not fake_browser.frames
+    assert proxy.destroyed
+    run_frames(fake_browser, [0, 100])
+    assert ticks == []
+
+
+def test_single_shot_timer_not_frame_aligned(fake_browser):
+    timer, ticks = make_timer(fake_browser, 20)
+    timer.single_shot = True
+    timer.start()
+    assert not fake_browser.frames
+    fake_browser.run_timers()
+    assert len(ticks) == 1
+    assert not fake_browser.timers
+
+
+def test_canvas_frame_aligned_timers(fake_browser):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    canvas = FigureCanvasAggWasm(Figure())
+    assert not canvas.new_timer(interval=20)._frame_aligned
+    canvas.frame_aligned_timers = True
+    assert canvas.new_timer(interval=20)._frame_aligned
+
+
+def show_figures(fake_browser, count):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.wasm_backend import (
+        FigureCanvasAggWasm,
+        FigureManagerAggWasm,
+    )
+
+    canvases = []
+    for i in range(count):
+        fig = Figure()
+        fig.add_subplot().plot([0, i])
+        FigureManagerAggWasm(FigureCanvasAggWasm(fig), i)
+        fig.canvas.show()
+        canvases.append(fig.canvas)
+    # The first draws happen once the figures are reported to be in view
+    run_until_idle(fake_browser)
+    return canvases
+
+
+def run_until_idle(fake_browser):
+    # The scheduler may spread the draws over several frames
+    while fake_browser.frames or fake_browser.pending_intersections:
+        fake_browser.run_frame()
+
+
+def request_redraw(canvas):
+    # Redraws of figures that did not change are skipped
+    canvas.figure.stale = True
+    canvas.draw_idle()
+
+
+def record_draws(canvases):
+    draws = []
+    for i, canvas in enumerate(canvases):
+        canvas.mpl_connect("draw_event", lambda event, i=i: draws.append(i))
+    return draws
+
+
+def test_scheduler_coalesces_redraws(fake_browser):
+    (canvas,) = show_figures(fake_browser, 1)
+    draws = record_draws([canvas])
+    for _ in range(10):
+        request_redraw(canvas)
+    fake_browser.run_frame()
+    assert draws == [0]
+    fake_browser.run_frame()
+    assert draws == [0]
+
+
+def test_scheduler_priority(fake_browser):
+    from matplotlib_pyodide.scheduler import scheduler
+
+    canvases = show_figures(fake_browser, 3)
+    draws = record_draws(canvases)
+    for canvas in canvases:
+        request_redraw(canvas)
+    canvases[2].onmouseenter(
+        SimpleNamespace(offsetX=10, offsetY=10, button=0, preventDefault=None)
+    )
+    # The hovered figure first, then in queue order
+    scheduler.run()
+    assert draws == [2, 0, 1]
+
+
+def test_scheduler_frame_budget(fake_browser, monkeypatch):
+    from matplotlib_pyodide.scheduler import scheduler
+
+    canvases = show_figures(fake_browser, 4)
+    draws = record_draws(canvases)
+    monkeypatch.setattr(scheduler, "frame_budget", 0)
+    for canvas in canvases:
+        request_redraw(canvas)
+    # One figure per frame, the others carried over to the next frames
+    for i in range(4):
+        fake_browser.run_frame()
+        assert draws == list(range(i + 1))
+    assert len(scheduler) == 0
+    assert not fake_browser.frames
+
+
+def test_scheduler_skips_drawn_and_destroyed(fake_browser):
+    canvases = show_figures(fake_browser, 3)
+    draws = record_draws(canvases)
+    for canvas in canvases:
+        request_redraw(canvas)
+    canvases[0].draw()
+    canvases[1].destroy()
+    fake_browser.run_frame()
+    assert draws == [0, 2]
+
+
+def add_failing_artist(figure):
+    # An artist whose draw fails
+    from matplotlib.artist import Artist
+
+    class FailingArtist(Artist):
+        def draw(self, renderer):
+            raise ValueError("failed draw")
+
+    return figure.add_artist(FailingArtist())
+
+
+def test_scheduler_survives_failed_draw(fake_browser, caplog):
+    canvases = show_figures(fake_browser, 3)
+    draws = record_draws(canvases)
+    add_failing_artist(canvases[1].figure)
+    for canvas in canvases:
+        request_redraw(canvas)
+    run_until_idle(fake_browser)
+    assert draws == [0, 2]
+    assert "failed draw" in caplog.text
+    assert not any(canvas._idle_scheduled for canvas in canvases)
+
+    # The figures are queued again by their next changes
+    for canvas in canvases:
+        request_redraw(canvas)
+    run_until_idle(fake_browser)
+    assert draws == [0, 2, 0, 2]
+
+
+def test_failed_incremental_draw_keeps_last_frame(fake_browser):
+    import numpy as np
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig = Figure()
+    canvas = FigureCanvasAggWasm(fig)
+    for ax in fig.subplots(1, 2):
+        ax.plot([0, 1])
+    canvas.show()
+    run_until_idle(fake_browser)
+    buffer = np.asarray(canvas.get_renderer().buffer_rgba())
+    last = buffer.copy()
+    add_failing_artist(fig.axes[0])
+    assert canvas._plan_incremental_draw(canvas.get_renderer()) is not None
+    with pytest.raises(ValueError, match="failed draw"):
+        canvas.draw()
+    assert np.array_equal(buffer, last)
+
+
+def test_show_defers_first_draw_until_in_view(fake_browser):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.wasm_backend import (
+        FigureCanvasAggWasm,
+        FigureManagerAggWasm,
+    )
+
+    fig = Figure()
+    FigureManagerAggWasm(FigureCanvasAggWasm(fig), 1)
+    draws = record_draws([fig.canvas])
+    fig.canvas.show()
+    fake_browser.scroll(fig.canvas.get_element(""), False)
+    for _ in range(3):
+        fake_browser.run_frame()
+    assert draws == []
+
+    fake_browser.scroll(fig.canvas.get_element(""), True)
+    fake_browser.run_frame()
+    fake_browser.run_frame()
+    assert draws == [0]
+
+
+def test_offscreen_draws_deferred(fake_browser):
+    canvases = show_figures(fake_browser, 2)
+    draws = record_draws(canvases)
+    fake_browser.scroll(canvases[0].get_element(""), False)
+    fake_browser.run_frame()
+
+    line = canvases[0].figure.axes[0].lines[0]
+    for i in range(5):
+        line.set_ydata([i, i])
+        canvases[0].draw_idle()
+        request_redraw(canvases[1])
+        fake_browser.run_frame()
+    assert draws == [1] * 5
+
+    # Only the latest state is rendered once the figure is back in view
+    fake_browser.scroll(canvases[0].get_element(""), True)
+    fake_browser.run_frame()
+    fake_browser.run_frame()
+    assert draws == [1] * 5 + [0]
+    fake_browser.run_frame()
+    assert draws == [1] * 5 + [0]
+
+
+def test_hidden_page_draws_deferred(fake_browser):
+    canvases = show_figures(fake_browser, 2)
+    draws = record_draws(canvases)
+    for canvas in canvases:
+        request_redraw(canvas)
+    # The tab is hidden before the queued draws run
+    fake_browser.set_visibility_state("hidden")
+    fake_browser.run_frame()
+    assert draws == []
+    fake_browser.set_visibility_state("visible")
+    run_until_idle(fake_browser)
+    assert sorted(draws) == [0, 1]
+
+
+def test_container_resize_debounced(fake_browser):
+    (canvas,) = show_figures(fake_browser, 1)
+    draws = record_draws([canvas])
+    resizes = []
+    canvas.mpl_connect("resize_event", resizes.append)
+    element = canvas.get_element("canvas")
+    assert (element.width, element.height) == (640, 480)
+
+    # While the container is being resized, the last frame is stretched
+    for width in (500, 520, 540):
+        entry = SimpleNamespace(contentRect=SimpleNamespace(width=width, height=400))
+        canvas._resize_observer.callback([entry])
+        run_until_idle(fake_browser)
+        assert element.style.width == f"{width}px"
+        assert (element.width, element.height) == (640, 480)
+    assert resizes == []
+    assert draws == []
+    assert len(fake_browser.timers) == 1
+
+    # The canvas buffer is reallocated once, for the last size
+    fake_browser.run_timers()
+    run_until_idle(fake_browser)
+    assert len(resizes) == 1
+    assert (element.width, element.height) == (540, 400)
+    assert canvas.get_width_height() == (540, 400)
+    assert draws == [0]
+
+
+def test_destroy_releases_proxies(fake_browser):
+    from matplotlib_pyodide.browser_backend import get_live_proxies
+
+    (canvas,) = show_figures(fake_browser, 1)
+    timer = canvas.new_timer(interval=20, frame_aligned=True)
+    timer.add_callback(lambda: None)
+    timer.start()
+    canvas.get_element("rubberband").dispatch(
+        "mousemove", SimpleNamespace(offsetX=10, offsetY=10, button=0)
+    )
+    proxies = canvas.get_live_proxies()
+    # The toolbar buttons, the context menu and the frame-aligned timer
+    assert proxies["listener:click"] > 0
+    assert proxies["listener:contextmenu"] == 1
+    assert proxies["timer"] == 1
+    assert get_live_proxies() == {canvas._id: proxies}
+
+    listeners = [proxy for _, _, proxy in canvas._event_listeners]
+    canvas.destroy()
+    assert all(proxy.destroyed for proxy in listeners)
+    assert canvas.get_live_proxies() == {}
+    assert get_live_proxies() == {}
+    assert not fake_browser.frames
+    assert not fake_browser.timers
+    assert canvas.get_element("") is None
+    assert "renderer" not in vars(canvas)
+
+
+def test_destroy_before_show(fake_browser):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    canvas = FigureCanvasAggWasm(Figure())
+    canvas.destroy()
+    assert canvas.get_live_proxies() == {}
+
+
+def test_font_loaded_after_destroy(fake_browser):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.html5_canvas_backend import (
+        FigureCanvasHTMLCanvas,
+        FigureManagerHTMLCanvas,
+    )
+
+    fig = Figure()
+    fig.text(0.5, 0.5, "text")
+    FigureManagerHTMLCanvas(FigureCanvasHTMLCanvas(fig), 1)
+    fig.canvas.show()
+    run_until_idle(fake_browser)
+    assert fake_browser.pending_fonts
+    draws = record_draws([fig.canvas])
+    fig.canvas.destroy()
+    fake_browser.load_fonts()
+    assert fake_browser.document.fonts.faces
+    assert draws == []
+
+
+def test_font_loaded_after_show_again(fake_browser):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.html5_canvas_backend import FigureCanvasHTMLCanvas
+
+    fig = Figure()
+    fig.text(0.5, 0.5, "text")
+    canvas = FigureCanvasHTMLCanvas(fig)
+    canvas.show()
+    run_until_idle(fake_browser)
+    canvas.destroy()
+    canvas.show()
+    run_until_idle(fake_browser)
+    assert canvas.get_element("canvas").isConnected
+    draws = record_draws([canvas])
+    fake_browser.load_fonts()
+    assert draws == [0]
+
+
+def show_text_figures(fake_browser, n):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.html5_canvas_backend import FigureCanvasHTMLCanvas
+
+    canvases = []
+    for _ in range(n):
+        fig = Figure()
+        fig.text(0.5, 0.5, "text")
+        canvases.append(FigureCanvasHTMLCanvas(fig))
+        fig.canvas.show()
+    run_until_idle(fake_browser)
+    return canvases
+
+
+def test_draw_async_waits_for_fonts(fake_browser, loop):
+    (canvas,) = show_text_figures(fake_browser, 1)
+    assert fake_browser.pending_fonts
+    draws = record_draws([canvas])
+    task = loop.create_task(canvas.draw_async())
+    loop.run_until_complete(asyncio.sleep(0))
+    assert not task.done()
+    assert draws == [0]
+
+    fake_browser.load_fonts()
+    loop.run_until_complete(task)
+    # Redrawn with the loaded font
+    assert draws == [0, 0]
+
+    # Nothing left to wait for
+    loop.run_until_complete(canvas.draw_async())
+    assert draws == [0, 0, 0]
+
+
+def test_font_loaded_redraws_all_figures(fake_browser, loop):
+    # The second figure uses the font the first one started loading
+    canvases = show_text_figures(fake_browser, 2)
+    assert len(fake_browser.pending_fonts) == 1
+    draws = record_draws(canvases)
+    futures = [canvas.frame_ready() for canvas in canvases]
+    assert not any(future.done() for future in futures)
+
+    fake_browser.load_fonts()
+    assert sorted(draws) == [0, 1]
+    assert all(future.done() for future in futures)
+
+
+def test_frame_ready_waits_for_queued_redraw(fake_browser, loop):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig = Figure()
+    canvas = FigureCanvasAggWasm(fig)
+    fig.add_subplot().plot([0, 1])
+    draws = record_draws([canvas])
+    canvas.show()
+    # The first draw waits for the figure to be reported in view
+    future = canvas.frame_ready()
+    assert not future.done()
+    run_until_idle(fake_browser)
+    assert draws == [0]
+    assert future.done()
+
+    request_redraw(canvas)
+    future = canvas.frame_ready()
+    assert not future.done()
+    run_until_idle(fake_browser)
+    assert draws == [0, 0]
+    assert future.done()
+
+    # Resolves right away when nothing is queued
+    assert canvas.frame_ready().done()
+
+
+def test_frame_ready_waits_for_sliced_draw(fake_browser, loop):
+    canvas = show_sliced(fake_browser, loop)
+    draws = record_draws([canvas])
+    request_redraw(canvas)
+    run_until_idle(fake_browser)
+    loop.run_until_complete(canvas.frame_ready())
+    assert draws == [0]
+    assert canvas._sliced_draw is None
+
+
+def test_frame_ready_rejected_by_failed_draw(fake_browser, loop, caplog):
+    (canvas,) = show_figures(fake_browser, 1)
+    add_failing_artist(canvas.figure)
+    request_redraw(canvas)
+    future = canvas.frame_ready()
+    run_until_idle(fake_browser)
+    with pytest.raises(ValueError, match="failed draw"):
+        loop.run_until_complete(future)
+    with pytest.raises(ValueError, match="failed draw"):
+        loop.run_until_complete(canvas.draw_async())
+    assert canvas._frame_waiters == []
+
+    # And by failed time-sliced draws
+    canvas.time_sliced_draw = True
+    request_redraw(canvas)
+    future = canvas.frame_ready()
+    run_until_idle(fake_browser)
+    loop.run_until_complete(canvas._sliced_draw)
+    with pytest.raises(ValueError, match="failed draw"):
+        loop.run_until_complete(future)
+
+
+def test_frame_ready_waits_for_tiles(fake_browser, loop):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig = Figure(figsize=(4, 12))
+    canvas = FigureCanvasAggWasm(fig)
+    canvas.tiled = True
+    # Tiled figures are not time-sliced
+    canvas.time_sliced_draw = True
+    fig.subplots(12, 1)
+    draws = record_draws([canvas])
+    canvas.show()
+    future = canvas.frame_ready()
+    # The first draw lays out the tiles, which are drawn once reported in
+    # view
+    fake_browser.run_frame()
+    fake_browser.run_frame()
+    assert draws == []
+    assert not future.done()
+    run_until_idle(fake_browser)
+    assert draws == [0]
+    assert future.done()
+    assert canvas._sliced_draw is None
+
+
+def test_frame_ready_resolved_on_destroy(fake_browser, loop):
+    (canvas,) = show_text_figures(fake_browser, 1)
+    future = canvas.frame_ready()
+    assert not future.done()
+    canvas.destroy()
+    assert future.done()
+
+
+def test_pooled_elements_reused(fake_browser):
+    (first,) = show_figures(fake_browser, 1)
+    elements = dict(first._elements)
+    first.destroy()
+
+    (second,) = show_figures(fake_browser, 1)
+    assert second._elements["canvas"] is elements["canvas"]
+    assert second.get_element("canvas") is elements["canvas"]
+    assert second.get_element("") in fake_browser.document.body.children
+    assert first.get_live_proxies() == {}
+    # The toolbar buttons now act on the new figure
+    draws = record_draws([second])
+    zoom = next(
+        button for button, name in elements["toolbar_buttons"] if name == "zoom"
+    )
+    zoom.dispatch("click", None)
+    assert second.toolbar.mode == "zoom rect"
+    assert draws == []
+
+
+def test_pool_prefers_matching_size(fake_browser):
+    from matplotlib_pyodide.pool import ResourcePool
+
+    pool = ResourcePool(max_elements=2)
+    assert pool.put_elements("kind", (10, 10), "a")
+    assert pool.put_elements("kind", (20, 20), "b")
+    assert not pool.put_elements("kind", (20, 20), "c")
+    assert pool.take_elements("other", (10, 10)) is None
+    assert pool.take_elements("kind", (10, 10)) == "a"
+    assert pool.take_elements("kind", (10, 10)) == "b"
+    assert pool.take_elements("kind", (10, 10)) is None
+
+
+def test_pool_renderers_bounded(fake_browser):
+    from matplotlib_pyodide.pool import ResourcePool
+
+    pool = ResourcePool(max_renderers=2)
+    for i in range(3):
+        pool.put_renderer((i, i, 100), i)
+    assert pool.take_renderer((0, 0, 100)) is None
+    assert pool.take_renderer((2, 2, 100)) == 2
+
+
+def test_show_again_after_removal(fake_browser):
+    (canvas,) = show_figures(fake_browser, 1)
+    div = canvas.get_element("")
+    fake_browser.document.body.removeChild(div)
+    canvas.show()
+    assert div.isConnected
+    assert canvas.get_element("") is div
+
+
+@pytest.mark.parametrize("per_artist", [True, False])
+def test_profiling(fake_browser, per_artist):
+    from matplotlib_pyodide.profiling import RENDERER_METHODS
+
+    (canvas,) = show_figures(fake_browser, 1)
+    renderer = canvas.get_renderer()
+    # RendererAgg binds some of its methods on the instance
+    methods = {name: vars(renderer).get(name) for name in RENDERER_METHODS}
+    (line,) = canvas.figure.axes[0].lines
+    fake_browser.performance.entries.clear()
+    canvas.start_profiling(per_artist=per_artist)
+    request_redraw(canvas)
+    run_until_idle(fake_browser)
+    stats = canvas.get_render_stats()
+    assert stats["draws"] == 1
+    phases = {"total", "figure.draw", "transfer", "putImageData"}
+    assert stats["last"].keys() == phases | {"rasterize"}
+    assert stats["mean"] == stats["last"]
+    assert stats["renderer_calls"]["draw_path"] > 0
+    # The phases measured show up in the browser devtools
+    measures = [
+        name for kind, name in fake_browser.performance.entries if kind == "measure"
+    ]
+    assert sorted(measures) == sorted(f"{canvas._id}:{phase}" for phase in phases)
+    if per_artist:
+        assert {"Line2D", "XAxis", "YAxis"} <= stats["artists"].keys()
+    else:
+        assert stats["artists"] == {}
+
+    # The instrumented methods are restored after each draw
+    assert "draw" not in vars(line)
+    assert {name: vars(renderer).get(name) for name in RENDERER_METHODS} == methods
+    assert canvas.stop_profiling() == stats
+    assert canvas.get_render_stats() is None
+    fake_browser.performance.entries.clear()
+    request_redraw(canvas)
+    run_until_idle(fake_browser)
+    assert fake_browser.performance.entries == []
+
+
+def test_unchanged_figure_not_redrawn(fake_browser):
+    (canvas,) = show_figures(fake_browser, 1)
+    draws = record_draws([canvas])
+    canvas.start_profiling()
+    # E.g. a notebook frontend showing the figure again
+    canvas.show()
+    canvas.draw_idle()
+    run_until_idle(fake_browser)
+    assert draws == []
+    assert canvas.get_render_stats()["skipped"] == 1
+
+    canvas.figure.axes[0].lines[0].set_ydata([1, 0])
+    canvas.draw_idle()
+    run_until_idle(fake_browser)
+    assert draws == [0]
+
+    canvas.set_canvas_size(300, 200)
+    run_until_idle(fake_browser)
+    assert draws == [0, 0]
+    stats = canvas.stop_profiling()
+    assert stats["skipped"] == 1
+    assert stats["draws"] == 2
+
+    # Drawing explicitly always renders
+    canvas.draw()
+    assert draws == [0, 0, 0]
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+    asyncio.set_event_loop(None)
+
+
+def show_sliced(fake_browser, loop, canvas_class_name="FigureCanvasAggWasm"):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide import html5_canvas_backend, wasm_backend
+
+    module = wasm_backend if "Agg" in canvas_class_name else html5_canvas_backend
+    fig = Figure()
+    canvas = getattr(module, canvas_class_name)(fig)
+    canvas.time_sliced_draw = True
+    canvas.draw_slice_budget = 0
+    for ax in fig.subplots(2, 3).flat:
+        ax.plot([0, 1])
+    canvas.show()
+    fake_browser.run_frame()
+    fake_browser.run_frame()
+    return canvas
+
+
+def test_time_sliced_draw(fake_browser, loop):
+    canvas = show_sliced(fake_browser, loop)
+    draws = record_draws([canvas])
+    task = canvas._sliced_draw
+    assert task is not None
+    fake_browser.log.clear()
+    loop.run_until_complete(task)
+    # One Axes per slice, each followed by an upload of the figure drawn so
+    # far
+    assert fake_browser.log.count("call", "putImageData") == 6
+    assert draws == [0]
+    assert not canvas.figure.stale
+    assert canvas.figure.dpi == 100
+
+
+def test_time_sliced_draw_cancelled(fake_browser, loop):
+    canvas = show_sliced(fake_browser, loop, "FigureCanvasHTMLCanvas")
+    draws = record_draws([canvas])
+    first = canvas._sliced_draw
+    loop.run_until_complete(asyncio.sleep(0))
+    assert not first.done()
+
+    # A newer redraw request cancels the one in progress
+    request_redraw(canvas)
+    fake_browser.run_frame()
+    second = canvas._sliced_draw
+    assert second is not first
+    loop.run_until_complete(second)
+    assert first.cancelled()
+    assert draws == [0]
+    assert canvas._sliced_draw is None
+
+
+def test_time_sliced_draw_failed(fake_browser, loop, caplog):
+    canvas = show_sliced(fake_browser, loop)
+    loop.run_until_complete(canvas._sliced_draw)
+    draws = record_draws([canvas])
+    # The artist of the fourth slice fails
+    add_failing_artist(canvas.figure).set_zorder(0.5)
+    for ax in canvas.figure.axes[3:]:
+        ax.set_zorder(1)
+    request_redraw(canvas)
+    fake_browser.run_frame()
+    task = canvas._sliced_draw
+    fake_browser.log.clear()
+    loop.run_until_complete(task)
+    assert fake_browser.log.count("call", "putImageData") == 3
+    assert task.exception() is None
+    assert "failed draw" in caplog.text
+    assert draws == []
+    assert canvas._sliced_draw is None
+    assert not canvas._is_frame_pending()
+    assert canvas.figure.stale
+    assert canvas.figure.dpi == 100
+
+
+def test_draw_cancels_time_sliced_draw(fake_browser, loop):
+    canvas = show_sliced(fake_browser, loop)
+    draws = record_draws([canvas])
+    task = canvas._sliced_draw
+    canvas.draw()
+    assert draws == [0]
+    with pytest.raises(asyncio.CancelledError):
+        loop.run_until_complete(task)
+    assert draws == [0]
+
+
+def test_adaptive_quality(fake_browser):
+    from matplotlib.figure import Figure
+
+    fake_browser.device_pixel_ratio = 2
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig = Figure(figsize=(4, 3))
+    canvas = FigureCanvasAggWasm(fig)
+    fig.add_subplot().plot([0, 1])
+    canvas.adaptive_quality = True
+    # Every frame takes longer than the frame time budget
+    canvas.target_fps = 1e6
+    widths = []
+    canvas.mpl_connect("draw_event", lambda event: widths.append(event.renderer.width))
+    canvas.show()
+    run_until_idle(fake_browser)
+    element = canvas.get_element("canvas")
+    assert (element.width, element.height) == (800, 600)
+    assert widths == [800]
+
+    # The redraws following it are rendered at a lower ratio, and stretched
+    # over the canvas
+    log = fake_browser.log
+    log.clear()
+    request_redraw(canvas)
+    run_until_idle(fake_browser)
+    assert widths == [800, 400]
+    scaling_canvas = canvas._scaling_canvas
+    assert (scaling_canvas.width, scaling_canvas.height) == (400, 300)
+    assert log.count("call", "putImageData") == 1
+    assert log.count("call", "drawImage") == 1
+    assert fig.dpi == 100
+
+    # And the last one again at the full ratio, once idle
+    log.clear()
+    fake_browser.run_timers()
+    assert widths == [800, 400, 800]
+    assert log.count("call", "putImageData") == 1
+    assert log.count("call", "drawImage") == 0
+    assert not fake_browser.timers
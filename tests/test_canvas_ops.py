@@ -0,0 +1,539 @@
+"""
+Canvas operation count regression tests.
+
+These run under plain CPython against the browser stand-in of fake_js.py, and
+put upper bounds on the canvas calls, allocations and buffer copies done per
+draw. The bounds leave some headroom over the current counts: if one of them
+fails, either a change made drawing more expensive, or the bound should be
+lowered following an optimization.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+
+def make_figure(kind):
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.add_subplot()
+    if kind == "line":
+        ax.plot(np.arange(100))
+    elif kind == "scatter":
+        ax.scatter(np.arange(50), np.arange(50))
+    elif kind == "image":
+        ax.imshow(np.arange(100.0).reshape(10, 10))
+    elif kind == "text":
+        for i in range(10):
+            ax.text(0.1 * i, 0.5, f"label {i}")
+    return fig
+
+
+def show(canvas):
+    from fake_js import browser
+
+    canvas.show()
+    # The first draw happens once the figure is reported to be in view
+    browser.run_frame()
+    browser.run_frame()
+    return canvas
+
+
+def show_agg(kind):
+    from matplotlib_pyodide.wasm_backend import (
+        FigureCanvasAggWasm,
+        FigureManagerAggWasm,
+    )
+
+    fig = make_figure(kind)
+    FigureManagerAggWasm(FigureCanvasAggWasm(fig), 1)
+    return show(fig.canvas)
+
+
+def show_html5(kind):
+    from matplotlib_pyodide.html5_canvas_backend import (
+        FigureCanvasHTMLCanvas,
+        FigureManagerHTMLCanvas,
+    )
+
+    fig = make_figure(kind)
+    FigureManagerHTMLCanvas(FigureCanvasHTMLCanvas(fig), 1)
+    return show(fig.canvas)
+
+
+def show_hybrid(fig):
+    from matplotlib_pyodide.html5_canvas_backend import FigureManagerHTMLCanvas
+    from matplotlib_pyodide.hybrid_backend import FigureCanvasHybrid
+
+    FigureManagerHTMLCanvas(FigureCanvasHybrid(fig), 1)
+    return show(fig.canvas)
+
+
+def mouse_event(x, y, button=0, deltaY=0):
+    return SimpleNamespace(
+        offsetX=x,
+        offsetY=y,
+        button=button,
+        deltaY=deltaY,
+        preventDefault=lambda: None,
+        stopPropagation=lambda: None,
+    )
+
+
+def test_show_dom_allocations(fake_browser):
+    fake_browser.log.clear()
+    show_agg("line")
+    allocs = fake_browser.log.counter("alloc")
+    # The root, top bar, container, bottom bar and message divs, and the two
+    # stacked canvases
+    assert allocs["div"] <= 5
+    assert allocs["canvas"] <= 2
+    assert allocs["ImageData"] <= 1
+
+
+def test_show_pooled_dom_allocations(fake_browser):
+    canvas = show_agg("line")
+    renderer = canvas.get_renderer()
+    canvas.destroy()
+    fake_browser.log.clear()
+    canvas = show_agg("line")
+    # The elements and the Agg renderer of the closed figure are reused
+    assert (
+        fake_browser.log.count("alloc") - fake_browser.log.count("alloc", "ImageData")
+        == 0
+    )
+    assert canvas.get_renderer() is renderer
+
+
+@pytest.mark.parametrize("kind", ["line", "scatter", "image", "text"])
+def test_agg_draw(fake_browser, kind):
+    canvas = show_agg(kind)
+    fake_browser.log.clear()
+    canvas.draw()
+    log = fake_browser.log
+    # A single copy of the Agg buffer, uploaded with a single call
+    assert log.count("copy") <= 1
+    assert log.count("alloc", "ImageData") <= 1
+    assert log.count("call") <= 1
+    assert log.count("alloc") - log.count("alloc", "ImageData") == 0
+    # The canvas element and its context are cached
+    assert log.count("lookup") == 0
+
+
+@pytest.mark.parametrize(
+    "kind, max_calls, max_sets",
+    [
+        ("line", 380, 230),
+        ("scatter", 1050, 530),
+        ("image", 230, 200),
+        ("text", 320, 260),
+    ],
+)
+def test_html5_canvas_draw(fake_browser, kind, max_calls, max_sets):
+    canvas = show_html5(kind)
+    fake_browser.log.clear()
+    canvas.draw()
+    log = fake_browser.log
+    assert log.count("call") <= max_calls
+    assert log.count("set") <= max_sets
+    # Images are the only thing that need a buffer copy, and an in-memory
+    # canvas
+    images = 1 if kind == "image" else 0
+    assert log.count("lookup") <= images
+    assert log.count("copy") <= images
+    assert log.count("alloc", "ImageData") <= images
+    assert log.count("alloc", "canvas") <= images
+
+
+def test_html5_images_cached(fake_browser):
+    import fake_js
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.html5_canvas_backend import FigureCanvasHTMLCanvas
+    from matplotlib_pyodide.image_cache import image_cache
+
+    # Resampled images change with the view, and are not cached
+    show_html5("image")
+    assert image_cache.nbytes == 0
+
+    fig = Figure()
+    canvas = FigureCanvasHTMLCanvas(fig)
+    canvas.browser_image_scaling = True
+    ax = fig.add_subplot()
+    ax.imshow(np.arange(100.0).reshape(10, 10), interpolation="none")
+    show(canvas)
+    fake_browser.create_bitmaps()
+    ((image, _),) = image_cache._images.values()
+    assert isinstance(image, fake_js.FakeImageBitmap)
+    fake_browser.log.clear()
+    # Panning draws another part of the cached bitmap
+    ax.set_xlim(2, 12)
+    canvas.draw()
+    log = fake_browser.log
+    assert log.count("copy") == 0
+    assert log.count("alloc") == 0
+    assert log.count("call", "putImageData") == 0
+    assert log.count("call", "drawImage") == 1
+
+    (im,) = ax.images
+    im.set_data(np.arange(100.0).reshape(10, 10) ** 2)
+    canvas.draw()
+    assert log.count("alloc", "ImageData") == 1
+    im.set_cmap("gray")
+    canvas.draw()
+    assert log.count("alloc", "ImageData") == 2
+    assert len(image_cache._images) == 3
+
+
+def test_html5_image_modified_in_place(fake_browser):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.html5_canvas_backend import FigureCanvasHTMLCanvas
+
+    fig = Figure()
+    canvas = FigureCanvasHTMLCanvas(fig)
+    canvas.browser_image_scaling = True
+    ax = fig.add_subplot()
+    # The colormapped data of uint8 RGBA images is their data array
+    im = ax.imshow(np.zeros((10, 10, 4), np.uint8), interpolation="none")
+    show(canvas)
+    log = fake_browser.log
+    log.clear()
+    ax.set_xlim(2, 12)
+    canvas.draw()
+    assert log.count("alloc", "ImageData") == 0
+    im.get_array()[0, 0] = 255
+    im.changed()
+    canvas.draw()
+    assert log.count("alloc", "ImageData") == 1
+
+
+def test_html5_image_too_large_to_cache(fake_browser, monkeypatch):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.html5_canvas_backend import (
+        FigureCanvasHTMLCanvas,
+        RendererHTMLCanvas,
+    )
+    from matplotlib_pyodide.image_cache import image_cache
+
+    converted = []
+    convert_image = RendererHTMLCanvas._convert_image
+
+    def record(renderer, im):
+        converted.append(im.shape[:2])
+        return convert_image(renderer, im)
+
+    monkeypatch.setattr(RendererHTMLCanvas, "_convert_image", record)
+    monkeypatch.setattr(image_cache, "max_bytes", 100)
+    fig = Figure()
+    canvas = FigureCanvasHTMLCanvas(fig)
+    canvas.browser_image_scaling = True
+    ax = fig.add_subplot()
+    ax.imshow(np.arange(100.0).reshape(10, 10), interpolation="none")
+    ax.set(xlim=(2, 12), ylim=(7, 3))
+    show(canvas)
+    # Only the part in view is converted
+    assert converted == [(5, 8)]
+    assert image_cache.nbytes == 0
+
+
+def test_html5_browser_image_scaling(fake_browser):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.html5_canvas_backend import FigureCanvasHTMLCanvas
+    from matplotlib_pyodide.image_cache import image_cache
+
+    fig = Figure()
+    canvas = FigureCanvasHTMLCanvas(fig)
+    canvas.browser_image_scaling = True
+    ax = fig.add_subplot()
+    ax.imshow(np.arange(100.0).reshape(10, 10), interpolation="none")
+    show(canvas)
+    # The image is uploaded at the size of its data, and drawn scaled
+    ((image, nbytes),) = image_cache._images.values()
+    assert (image.width, image.height) == (10, 10)
+    log = fake_browser.log
+    log.clear()
+    ax.set_xlim(-5, 15)
+    canvas.draw()
+    # Zooming out only changes the transform
+    assert log.count("alloc", "ImageData") == 0
+    assert log.count("call", "transform") == 1
+    assert log.count("call", "drawImage") == 1
+
+
+def test_hybrid_dense_artists_rasterized(fake_browser):
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.add_subplot()
+    ax.plot(np.arange(100))
+    scatter = ax.scatter(*np.random.default_rng(0).random((2, 5000)))
+    ax.imshow(np.arange(100.0).reshape(10, 10), extent=(0, 100, 0, 100))
+    canvas = show_hybrid(fig)
+    fake_browser.log.clear()
+    canvas.draw()
+    log = fake_browser.log
+    # The scatter and the image are composited as a single bitmap, the
+    # sparse line and the axes are drawn with canvas calls
+    assert log.count("call", "drawImage") == 1
+    assert log.count("call", "arc") == 0
+    assert log.count("call", "lineTo") > 0
+    assert log.count("call") <= 380
+    assert not scatter.get_rasterized()
+
+
+def test_hybrid_profiled_per_artist(fake_browser):
+    import warnings
+
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.add_subplot()
+    ax.plot(np.arange(10000))
+    ax.imshow(np.arange(100.0).reshape(10, 10), extent=(0, 10000, 0, 10000))
+    canvas = show_hybrid(fig)
+    log = fake_browser.log
+    log.clear()
+    canvas.draw()
+    bitmaps = log.count("call", "drawImage")
+    lines = log.count("call", "lineTo")
+    canvas.start_profiling()
+    log.clear()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        canvas.draw()
+    # The dense line and the image are still rasterized
+    assert log.count("call", "drawImage") == bitmaps
+    assert log.count("call", "lineTo") == lines < 10000
+    assert "Line2D" in canvas.stop_profiling()["artists"]
+
+
+def test_hybrid_sparse_artists_on_canvas(fake_browser):
+    canvas = show_hybrid(make_figure("scatter"))
+    fake_browser.log.clear()
+    canvas.draw()
+    assert fake_browser.log.count("call", "drawImage") == 0
+
+
+def test_count_canvas_ops_matches_log(fake_browser):
+    canvas = show_html5("line")
+    fake_browser.log.clear()
+    report = canvas.count_canvas_ops()
+    log = fake_browser.log
+    assert report["total"] == log.count("call") + log.count("set") + log.count("get")
+
+
+def test_mouse_moves_coalesced(fake_browser):
+    canvas = show_agg("line")
+    moves = []
+    canvas.mpl_connect("motion_notify_event", lambda event: moves.append(event))
+    rubberband = canvas.get_element("rubberband")
+    for i in range(100):
+        rubberband.dispatch("mousemove", mouse_event(100 + i, 100))
+    assert moves == []
+    fake_browser.run_frame()
+    assert len(moves) == 1
+    assert moves[0].x == 199
+
+
+def test_pan_drag_does_not_render(fake_browser):
+    canvas = show_agg("line")
+    fake_browser.run_frame()
+    ax = canvas.figure.axes[0]
+    xlim = ax.get_xlim()
+    canvas.toolbar.pan()
+    rubberband = canvas.get_element("rubberband")
+
+    rubberband.dispatch("mousedown", mouse_event(300, 200))
+    fake_browser.log.clear()
+    for i in range(20):
+        rubberband.dispatch("mousemove", mouse_event(300 + 5 * i, 200))
+        fake_browser.run_frame()
+    fake_browser.run_timers()
+    # Each motion only draws the snapshot of the last frame
+    assert fake_browser.log.count("call", "putImageData") == 0
+    assert fake_browser.log.count("call", "drawImage") <= 20
+    assert ax.get_xlim() == xlim
+
+    rubberband.dispatch("mouseup", mouse_event(395, 200))
+    fake_browser.run_frame()
+    assert fake_browser.log.count("call", "putImageData") == 1
+    assert ax.get_xlim()[0] < xlim[0]
+
+
+def test_zoom_rubberband_no_lookups(fake_browser):
+    canvas = show_agg("line")
+    canvas.toolbar.zoom()
+    rubberband = canvas.get_element("rubberband")
+    rubberband.dispatch("mousedown", mouse_event(200, 200))
+    fake_browser.run_frame()
+    fake_browser.log.clear()
+    for i in range(20):
+        rubberband.dispatch("mousemove", mouse_event(210 + 5 * i, 220))
+        fake_browser.run_frame()
+    log = fake_browser.log
+    assert log.count("lookup") == 0
+    # One clear and one stroke per frame
+    assert log.count("call", "clearRect") == 20
+    assert log.count("call", "strokeRect") == 20
+
+
+def make_dashboard(canvas_class):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 12))
+    canvas_class(fig)
+    lines = [
+        ax.plot(np.sin(np.arange(100) / 10 + i))[0]
+        for i, ax in enumerate(fig.subplots(4, 4).flat)
+    ]
+    return fig, lines
+
+
+def test_agg_incremental_draw(fake_browser, monkeypatch):
+    import fake_js
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig, lines = make_dashboard(FigureCanvasAggWasm)
+    canvas = show(fig.canvas)
+    uploads = []
+    new = fake_js.FakeImageData.new.__func__
+    monkeypatch.setattr(
+        fake_js.FakeImageData,
+        "new",
+        classmethod(lambda cls, *args: uploads.append(args[1:]) or new(cls, *args)),
+    )
+    draws = []
+    canvas.mpl_connect("draw_event", draws.append)
+    lines[5].set_ydata(np.cos(np.arange(100) / 10))
+    canvas.draw()
+    # Only the panel that changed is rendered and uploaded
+    assert not fig.stale
+    assert len(draws) == 1
+    ((width, height),) = uploads
+    full_width, full_height = canvas.get_width_height()
+    assert width * height < full_width * full_height / 8
+    incremental = np.asarray(canvas.buffer_rgba()).copy()
+
+    # Same as redrawing the whole figure
+    canvas.incremental_draw = False
+    fig.stale = True
+    canvas.draw()
+    assert uploads[-1] == (full_width, full_height)
+    np.testing.assert_array_equal(incremental, np.asarray(canvas.buffer_rgba()))
+
+
+def test_html5_incremental_draw(fake_browser):
+    from matplotlib_pyodide.html5_canvas_backend import FigureCanvasHTMLCanvas
+
+    fig, lines = make_dashboard(FigureCanvasHTMLCanvas)
+    canvas = show(fig.canvas)
+    fake_browser.log.clear()
+    canvas.draw()
+    full = fake_browser.log.count("call")
+    fake_browser.log.clear()
+    lines[5].set_ydata(np.cos(np.arange(100) / 10))
+    canvas.draw()
+    assert fake_browser.log.count("call", "clearRect") == 1
+    # The neighbouring panels, whose tick labels overlap the one that
+    # changed, are redrawn as well, clipped to its region
+    assert fake_browser.log.count("call") < full / 4
+
+
+@pytest.mark.parametrize(
+    "change",
+    ["suptitle", "facecolor", "overlap", "new_axes"],
+)
+def test_incremental_draw_falls_back(fake_browser, change):
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig, lines = make_dashboard(FigureCanvasAggWasm)
+    if change == "overlap":
+        fig.text(0.4, 0.6, "note")
+    canvas = show(fig.canvas)
+    lines[5].set_ydata(np.cos(np.arange(100) / 10))
+    if change == "suptitle":
+        fig.suptitle("title")
+    elif change == "facecolor":
+        fig.set_facecolor("red")
+    elif change == "new_axes":
+        fig.add_axes((0.4, 0.4, 0.2, 0.2))
+    fake_browser.log.clear()
+    plan = canvas._plan_incremental_draw(canvas.get_renderer())
+    assert plan is None
+
+
+def make_layered(canvas_class):
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    canvas = canvas_class(fig)
+    canvas.layered = True
+    ax = fig.add_subplot()
+    ax.plot(np.arange(100))
+    (line,) = ax.plot(np.arange(100)[::-1], animated=True)
+    return fig, line
+
+
+@pytest.mark.parametrize("backend", ["agg", "html5"])
+def test_layered_redraws_foreground_only(fake_browser, backend):
+    from matplotlib_pyodide.html5_canvas_backend import FigureCanvasHTMLCanvas
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    canvas_class = FigureCanvasAggWasm if backend == "agg" else FigureCanvasHTMLCanvas
+    fig, line = make_layered(canvas_class)
+    canvas = show(fig.canvas)
+    foreground = canvas.get_element("foreground")
+    container = canvas.get_element("container")
+    # Stacked between the figure canvas and the rubberband one
+    assert container.children.index(foreground) == 1
+    draws = []
+    canvas.mpl_connect("draw_event", draws.append)
+
+    line.set_ydata(np.zeros(100))
+    assert not fig.stale
+    canvas.draw()
+    assert draws == []
+
+    # Changing the limits redraws the background
+    fig.axes[0].set_xlim(10, 20)
+    canvas.draw()
+    assert len(draws) == 1
+    canvas.draw()
+    assert len(draws) == 1
+
+    # And so does resizing
+    canvas.set_canvas_size(400, 300)
+    assert foreground.width == 400
+    canvas.draw()
+    assert len(draws) == 2
+
+
+def test_layered_agg_foreground_upload(fake_browser, monkeypatch):
+    import fake_js
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig, line = make_layered(FigureCanvasAggWasm)
+    canvas = show(fig.canvas)
+    uploads = []
+    new = fake_js.FakeImageData.new.__func__
+    monkeypatch.setattr(
+        fake_js.FakeImageData,
+        "new",
+        classmethod(lambda cls, *args: uploads.append(args[1:]) or new(cls, *args)),
+    )
+    line.set_data([40, 60], [40, 60])
+    canvas.draw()
+    # The part covered by the line now, or in the last frame
+    ((width, height),) = uploads
+    assert width * height < np.prod(canvas.get_width_height())
+    uploads.clear()
+    canvas.draw()
+    ((small_width, small_height),) = uploads
+    assert small_width * small_height < width * height
@@ -22,28 +22,11 @@ def save_canvas_data(selenium, output_path):
 
 
 @run_in_pyodide(packages=["matplotlib"])
-def patch_font_loading_and_dpi(selenium, handle, target_font=""):
-    """Monkey-patches font loading and dpi to allow testing"""
-    from matplotlib_pyodide.html5_canvas_backend import (
-        FigureCanvasHTMLCanvas,
-        RendererHTMLCanvas,
-    )
+def patch_dpi(selenium):
+    """Monkey-patches dpi to allow testing"""
+    from matplotlib_pyodide.html5_canvas_backend import FigureCanvasHTMLCanvas
 
     FigureCanvasHTMLCanvas.get_dpi_ratio = lambda self, context: 2.0
-    load_font_into_web = RendererHTMLCanvas.load_font_into_web
-
-    def load_font_into_web_wrapper(
-        self, loaded_font, font_url, orig_function=load_font_into_web
-    ):
-        fontface = orig_function(self, loaded_font, font_url)
-
-        if not target_font or target_font == fontface.family:
-            try:
-                handle.font_loaded = True
-            except Exception as e:
-                raise ValueError("unable to resolve") from e
-
-    RendererHTMLCanvas.load_font_into_web = load_font_into_web_wrapper
 
 
 def compare_func_handle(selenium):
@@ -52,19 +35,15 @@ def compare_func_handle(selenium):
         from pytest_pyodide.decorator import PyodideHandle
 
         class Handle:
-            def __init__(self):
-                self.font_loaded = False
-
             async def compare(self, ref):
-                import asyncio
                 import io
 
                 import matplotlib.pyplot as plt
                 import numpy as np
                 from PIL import Image
 
-                while not self.font_loaded:  # wait until font is loading
-                    await asyncio.sleep(0.2)
+                # Until the fonts have loaded and the figure was redrawn
+                await plt.gcf().canvas.frame_ready()
 
                 canvas_data = plt.gcf().canvas.get_pixel_data()
                 ref_data = np.asarray(Image.open(io.BytesIO(ref)))
@@ -102,7 +81,7 @@ def test_rendering(selenium_standalone_matplotlib):
 
     ref = (REFERENCE_IMAGES_PATH / f"canvas-{selenium.browser}.png").read_bytes()
     handle = compare_func_handle(selenium)
-    patch_font_loading_and_dpi(selenium, handle)
+    patch_dpi(selenium)
     run(selenium, handle, ref)
 
 
@@ -141,7 +120,7 @@ def test_draw_image(selenium_standalone_matplotlib):
 
     ref = (REFERENCE_IMAGES_PATH / f"canvas-image-{selenium.browser}.png").read_bytes()
     handle = compare_func_handle(selenium)
-    patch_font_loading_and_dpi(selenium, handle)
+    patch_dpi(selenium)
     run(selenium, handle, ref)
 
 
@@ -219,7 +198,7 @@ def test_draw_image_affine_transform(selenium_standalone_matplotlib):
         REFERENCE_IMAGES_PATH / f"canvas-image-affine-{selenium.browser}.png"
     ).read_bytes()
     handle = compare_func_handle(selenium)
-    patch_font_loading_and_dpi(selenium, handle)
+    patch_dpi(selenium)
     run(selenium, handle, ref)
 
 
@@ -271,7 +250,7 @@ def test_draw_text_rotated(selenium_standalone_matplotlib):
         REFERENCE_IMAGES_PATH / f"canvas-text-rotated-{selenium.browser}.png"
     ).read_bytes()
     handle = compare_func_handle(selenium)
-    patch_font_loading_and_dpi(selenium, handle)
+    patch_dpi(selenium)
     run(selenium, handle, ref)
 
 
@@ -400,7 +379,7 @@ def test_draw_math_text(selenium_standalone_matplotlib):
         REFERENCE_IMAGES_PATH / f"canvas-math-text-{selenium.browser}.png"
     ).read_bytes()
     handle = compare_func_handle(selenium)
-    patch_font_loading_and_dpi(selenium, handle)
+    patch_dpi(selenium)
     run(selenium, handle, ref)
 
 
@@ -433,7 +412,7 @@ def test_custom_font_text(selenium_standalone_matplotlib):
         REFERENCE_IMAGES_PATH / f"canvas-custom-font-text-{selenium.browser}.png"
     ).read_bytes()
     handle = compare_func_handle(selenium)
-    patch_font_loading_and_dpi(selenium, handle)
+    patch_dpi(selenium)
     run(selenium, handle, ref)
 
 
@@ -474,7 +453,7 @@ def test_zoom_on_polar_plot(selenium_standalone_matplotlib):
         REFERENCE_IMAGES_PATH / f"canvas-polar-zoom-{selenium.browser}.png"
     ).read_bytes()
     handle = compare_func_handle(selenium)
-    patch_font_loading_and_dpi(selenium, handle)
+    patch_dpi(selenium)
     run(selenium, handle, ref)
 
 
@@ -512,5 +491,46 @@ def test_transparency(selenium_standalone_matplotlib):
         REFERENCE_IMAGES_PATH / f"canvas-transparency-{selenium.browser}.png"
     ).read_bytes()
     handle = compare_func_handle(selenium)
-    patch_font_loading_and_dpi(selenium, handle)
+    patch_dpi(selenium)
     run(selenium, handle, ref)
+
+
+@matplotlib_test_decorator
+def test_webgl_rendering(selenium_standalone_matplotlib):
+    @run_in_pyodide(packages=["matplotlib"])
+    def run(selenium):
+        import numpy as np
+        from matplotlib.figure import Figure
+
+        from matplotlib_pyodide.html5_canvas_backend import (
+            FigureCanvasHTMLCanvas,
+            FigureManagerHTMLCanvas,
+        )
+
+        def render(webgl):
+            rng = np.random.default_rng(0)
+            fig = Figure()
+            canvas = FigureCanvasHTMLCanvas(fig)
+            canvas.webgl = webgl
+            canvas.webgl_threshold = 100
+            FigureManagerHTMLCanvas(canvas, 1)
+            ax = fig.add_subplot()
+            ax.set_axis_off()
+            ax.plot(rng.standard_normal(2000).cumsum(), linewidth=1.5)
+            ax.plot(np.arange(500), np.zeros(500), "o", markersize=3)
+            ax.scatter(*rng.random((2, 500)) * [[2000], [40]], s=20, c="tab:red")
+            canvas.show()
+            canvas.draw()
+            pixels = canvas.get_pixel_data().astype(float)
+            webgl_used = canvas._webgl_layer is not None
+            canvas.destroy()
+            return pixels, webgl_used
+
+        reference, _ = render(False)
+        pixels, webgl_used = render(True)
+        # Works with the software rasterizers of the headless browsers
+        assert webgl_used
+        # Only the antialiasing differs
+        assert np.mean(np.abs(pixels - reference)) < 2
+
+    run(selenium_standalone_matplotlib)
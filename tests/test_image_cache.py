@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+
+class Bitmap:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_key_of_source_image():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.image_cache import ImageCache
+
+    fig = Figure()
+    renderer = FigureCanvasAgg(fig).get_renderer()
+    ax = fig.add_subplot()
+    image = ax.imshow(np.zeros((10, 10, 4), np.uint8), interpolation="none")
+    ax.set(xlim=(2, 12), ylim=(7, 3))
+    im, *_ = image.make_image(renderer, unsampled=True)
+    key, position = ImageCache.get_key(im, fig)
+    assert position == (3, 2)
+    # The masked data array of the image
+    source = np.asarray(im).base
+    assert key[0].obj is source
+    assert ImageCache.get_key(source[:2], fig)[0] == key
+    # The key changes with the image
+    image.get_array()[0, 0] = 255
+    image.changed()
+    im, *_ = image.make_image(renderer, unsampled=True)
+    assert np.asarray(im).base is source
+    assert ImageCache.get_key(im, fig)[0] != key
+    # Only the parts of the source array of an image are keyed
+    assert ImageCache.get_key(im.copy(), fig) is None
+    assert ImageCache.get_key(source[::2], fig) is None
+    assert ImageCache.get_key(np.zeros((4, 5, 4), np.uint8)[:2], fig) is None
+
+
+def test_least_recently_drawn_dropped():
+    from matplotlib_pyodide.image_cache import ImageCache
+
+    cache = ImageCache(max_bytes=100)
+    a, b, c = Bitmap(), Bitmap(), Bitmap()
+    assert cache.put("a", a, 40)
+    assert cache.put("b", b, 40)
+    assert cache.get("a") is a
+    assert cache.put("c", c, 40)
+    assert cache.get("b") is None
+    assert b.closed
+    assert cache.nbytes == 80
+    # Too large to be cached at all
+    assert not cache.put("d", Bitmap(), 101)
+    assert cache.get("a") is a
+
+
+@pytest.mark.parametrize("dropped", [False, True])
+def test_replace(dropped):
+    from matplotlib_pyodide.image_cache import ImageCache
+
+    cache = ImageCache()
+    canvas, bitmap = object(), Bitmap()
+    cache.put("a", canvas, 16)
+    if dropped:
+        cache.discard("a")
+    cache.replace("a", canvas, bitmap)
+    assert cache.get("a") is (None if dropped else bitmap)
+    assert bitmap.closed == dropped
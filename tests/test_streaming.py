@@ -0,0 +1,176 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+
+
+def test_append_keeps_last_points():
+    from matplotlib_pyodide.streaming import StreamingLine
+
+    line = StreamingLine(5, [0, 1], [10, 11])
+    for i in range(2, 12):
+        line.append(i, 10 + i)
+    np.testing.assert_array_equal(line.get_xdata(), [7, 8, 9, 10, 11])
+    np.testing.assert_array_equal(line.get_ydata(), [17, 18, 19, 20, 21])
+    line.append(np.arange(12, 20), np.arange(22, 30))
+    np.testing.assert_array_equal(line.get_xdata(), [15, 16, 17, 18, 19])
+    assert line._appended == 20
+    assert line._dropped == 15
+
+    line.set_data([1, 2], [3, 4])
+    np.testing.assert_array_equal(line.get_xdata(), [1, 2])
+    with pytest.raises(ValueError):
+        line.append([1, 2], [3])
+
+
+def test_only_other_changes_bump_version():
+    from matplotlib_pyodide.streaming import StreamingLine
+
+    line = StreamingLine(10)
+    version = line._version
+    line.append([0, 1], [0, 1])
+    assert line.stale
+    assert line._version == version
+    line.set_color("red")
+    assert line._version == version + 1
+
+
+def make_monitor(canvas_class):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.streaming import StreamingLine
+
+    fig = Figure()
+    canvas_class(fig)
+    ax = fig.add_subplot()
+    ax.set(xlim=(0, 1000), ylim=(-1.5, 1.5))
+    line = StreamingLine(1000)
+    ax.add_line(line)
+    x = np.arange(500)
+    line.append(x, np.sin(x / 20))
+    return fig, line
+
+
+def append(line, n):
+    x = np.arange(line._appended, line._appended + n)
+    line.append(x, np.sin(x / 20))
+
+
+def test_agg_append_draw(fake_browser, monkeypatch):
+    import fake_js
+    from test_canvas_ops import show
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig, line = make_monitor(FigureCanvasAggWasm)
+    canvas = show(fig.canvas)
+    uploads = []
+    new = fake_js.FakeImageData.new.__func__
+    monkeypatch.setattr(
+        fake_js.FakeImageData,
+        "new",
+        classmethod(lambda cls, *args: uploads.append(args[1:]) or new(cls, *args)),
+    )
+    draws = []
+    canvas.mpl_connect("draw_event", draws.append)
+    for _ in range(5):
+        append(line, 10)
+        canvas.draw()
+    assert not fig.stale
+    assert len(draws) == 5
+    # Only the new segments are uploaded
+    full_width, full_height = canvas.get_width_height()
+    for width, height in uploads:
+        assert width * height < full_width * full_height / 20
+    appended = np.asarray(canvas.buffer_rgba()).copy()
+
+    # Nearly the same as redrawing the whole line, which Agg simplifies
+    fig.stale = True
+    canvas.incremental_draw = False
+    canvas.draw()
+    assert uploads[-1] == (full_width, full_height)
+    different = np.any(appended != np.asarray(canvas.buffer_rgba()), axis=-1)
+    assert different.mean() < 5e-3
+
+
+def test_html5_append_draw(fake_browser):
+    from test_canvas_ops import show
+
+    from matplotlib_pyodide.html5_canvas_backend import FigureCanvasHTMLCanvas
+
+    fig, line = make_monitor(FigureCanvasHTMLCanvas)
+    canvas = show(fig.canvas)
+    fake_browser.log.clear()
+    canvas.draw()
+    full = fake_browser.log.count("call")
+    fake_browser.log.clear()
+    append(line, 10)
+    canvas.draw()
+    assert not fig.stale
+    assert fake_browser.log.count("call", "clearRect") == 0
+    assert fake_browser.log.count("call") < full / 10
+
+
+def test_append_draw_over_other_lines(fake_browser):
+    from test_canvas_ops import show
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig, line = make_monitor(FigureCanvasAggWasm)
+    ax = line.axes
+    # Drawn after the streaming line, away from and across its new points
+    (away,) = ax.plot([0, 1000], [1.2, 1.2])
+    (across,) = ax.plot([0, 1000], [0, 0])
+    canvas = show(fig.canvas)
+    renderer = canvas.get_renderer()
+    append(line, 10)
+    assert canvas._plan_append_draw(renderer, canvas._frame_key) is None
+    across.remove()
+    fig.canvas.draw()
+    append(line, 10)
+    ((planned, _),) = canvas._plan_append_draw(renderer, canvas._frame_key)
+    assert planned is line
+
+
+@pytest.mark.parametrize("change", ["xlim", "color", "dropped", "title", "other"])
+def test_append_draw_falls_back(fake_browser, change):
+    from test_canvas_ops import show
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig, line = make_monitor(FigureCanvasAggWasm)
+    ax = line.axes
+    (other,) = ax.plot([0, 1000], [1.2, 1.2])
+    canvas = show(fig.canvas)
+    renderer = canvas.get_renderer()
+    frame_key = canvas._frame_key
+    append(line, 10)
+    assert canvas._plan_append_draw(renderer, frame_key) is not None
+    if change == "xlim":
+        ax.set_xlim(0, 2000)
+    elif change == "color":
+        line.set_color("red")
+    elif change == "dropped":
+        append(line, 600)
+    elif change == "title":
+        ax.set_title("signal")
+    elif change == "other":
+        other.set_ydata([1, 1])
+    assert canvas._plan_append_draw(renderer, frame_key) is None
+
+
+def test_append_draw_under_legend(fake_browser):
+    from test_canvas_ops import show
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig, line = make_monitor(FigureCanvasAggWasm)
+    line.set_label("signal")
+    legend = line.axes.legend(loc="center")
+    canvas = show(fig.canvas)
+    append(line, 10)
+    assert canvas._plan_append_draw(canvas.get_renderer(), canvas._frame_key) is None
+    legend.set_loc("upper left")
+    canvas.draw()
+    append(line, 10)
+    assert canvas._plan_append_draw(canvas.get_renderer(), canvas._frame_key)
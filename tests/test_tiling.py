@@ -0,0 +1,210 @@
+import io
+
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+
+
+def make_tall_figure(canvas_class=None, rows=12):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(4, rows), dpi=100)
+    if canvas_class is not None:
+        canvas_class(fig)
+    x = np.linspace(0, 10, 200)
+    for i, ax in enumerate(fig.subplots(rows, 1)):
+        ax.plot(x, np.sin(x + i), "o-", ms=2)
+        ax.scatter(np.arange(10), np.arange(10) % 3, c=np.arange(10))
+        ax.set_title(rf"$\alpha_{i}$ rotated", rotation=5)
+    fig.axes[1].imshow(np.arange(100).reshape(10, 10))
+    fig.axes[2].pcolormesh(np.arange(30).reshape(5, 6))
+    return fig
+
+
+def render_full(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="rgba")
+    width, height = (int(value) for value in fig.bbox.size)
+    return np.frombuffer(buffer.getvalue(), np.uint8).reshape(height, width, 4)
+
+
+def test_tile_renderer_matches_agg():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    from matplotlib_pyodide.tiling import RendererAggTile
+
+    fig = make_tall_figure(FigureCanvasAgg, rows=3)
+    full = render_full(fig)
+    height, width, _ = full.shape
+    size = 128
+    tiled = np.zeros_like(full)
+    renderer = RendererAggTile(size, size, fig.dpi)
+    for row in range(-(-height // size)):
+        for col in range(-(-width // size)):
+            renderer.set_offset(col * size, height - (row + 1) * size)
+            renderer.clear()
+            fig.draw(renderer)
+            h, w = min(size, height - row * size), min(size, width - col * size)
+            tiled[
+                row * size : row * size + h, col * size : col * size + w
+            ] = np.asarray(renderer.buffer_rgba())[:h, :w]
+    # Only the antialiasing of a few pixels of the paths clipped and
+    # simplified differently differs
+    difference = np.abs(tiled.astype(int) - full)
+    assert difference.max() <= 16
+    assert np.any(difference, axis=-1).mean() < 5e-3
+
+
+def show_tiled(fake_browser, visible_rows):
+    """
+    Shows a tall figure as 512 x 512 tiles (a column of 3 tiles), with only
+    the tiles of *visible_rows* in the viewport.
+    """
+    from test_canvas_ops import show
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig = make_tall_figure(FigureCanvasAggWasm)
+    canvas = fig.canvas
+    canvas.tiled = True
+    uploads = []
+    put_pixels = canvas._put_pixels
+
+    def record(name, buffer, bounds, scaled=False):
+        x0, y0, x1, y1 = bounds
+        uploads.append((name, np.asarray(buffer)[y0:y1, x0:x1].copy()))
+        put_pixels(name, buffer, bounds, scaled)
+
+    canvas._put_pixels = record
+    update_tiles = canvas._update_tiles
+
+    def hide_tiles():
+        # The tiles are laid out by the first draw, and reported in view at
+        # the end of the same frame
+        update_tiles()
+        for name in [name for name in canvas._elements if name.startswith("tile:")]:
+            if int(name.split(":")[2]) not in visible_rows:
+                fake_browser.hidden_elements.add(id(canvas.get_element(name)))
+
+    canvas._update_tiles = hide_tiles
+    show(canvas)
+    fake_browser.run_frame()
+    return canvas, uploads
+
+
+def test_tiled_draws_visible_tiles(fake_browser):
+    canvas, uploads = show_tiled(fake_browser, visible_rows={0, 1})
+    assert canvas.get_element("canvas") is None
+    tiles = [name for name in canvas._elements if name.startswith("tile:")]
+    assert tiles == ["tile:0:0", "tile:0:1", "tile:0:2"]
+    assert [name for name, _ in uploads] == ["tile:0:0", "tile:0:1"]
+    # The tiles of the first two rows, and the rest of the figure
+    assert [pixels.shape for _, pixels in uploads] == [
+        (512, 400, 4),
+        (512, 400, 4),
+    ]
+    assert canvas.get_element("tile:0:2").height == 0
+    assert not canvas.figure.stale
+
+    # The tiles match the figure rendered whole
+    full = render_full(canvas.figure)
+    for (_, pixels), row in zip(uploads, (0, 1), strict=True):
+        expected = full[row * 512 : (row + 1) * 512]
+        assert np.abs(pixels.astype(int) - expected).max() <= 16
+
+
+def test_tiled_draws_tiles_scrolled_to(fake_browser):
+    canvas, uploads = show_tiled(fake_browser, visible_rows={0})
+    uploads.clear()
+    first, last = canvas.get_element("tile:0:0"), canvas.get_element("tile:0:2")
+    fake_browser.scroll(last, True)
+    fake_browser.scroll(first, False)
+    fake_browser.run_frame()
+    fake_browser.run_frame()
+    assert [name for name, _ in uploads] == ["tile:0:2"]
+    assert last.height == 1200 - 1024
+    # The tiles scrolled away are released
+    assert first.width == first.height == 0
+
+    # Redrawing a figure that did not change draws nothing
+    uploads.clear()
+    canvas.draw_idle()
+    fake_browser.run_frame()
+    assert uploads == []
+
+    # Changing it only redraws the visible tiles
+    canvas.figure.axes[-1].set_ylim(-2, 2)
+    canvas.draw_idle()
+    fake_browser.run_frame()
+    assert [name for name, _ in uploads] == ["tile:0:2"]
+
+
+def test_tiled_draws_axes_over_tiles(fake_browser, monkeypatch):
+    from matplotlib.axes import Axes
+
+    draws = []
+    draw = Axes.draw
+
+    def record(ax, renderer):
+        draws.append(ax.figure.axes.index(ax))
+        draw(ax, renderer)
+
+    monkeypatch.setattr(Axes, "draw", record)
+    canvas, uploads = show_tiled(fake_browser, visible_rows={0})
+    monkeypatch.undo()
+    assert [name for name, _ in uploads] == ["tile:0:0"]
+    # Only the Axes over the upper 512 pixels of the figure are drawn
+    assert draws == [0, 1, 2, 3, 4, 5]
+    full = render_full(canvas.figure)
+    assert np.abs(uploads[0][1].astype(int) - full[:512]).max() <= 16
+
+
+def test_tiled_draw_event_sent_once(fake_browser):
+    from test_canvas_ops import show
+
+    from matplotlib_pyodide.wasm_backend import FigureCanvasAggWasm
+
+    fig = make_tall_figure(FigureCanvasAggWasm)
+    fig.canvas.tiled = True
+    draws = []
+    fig.canvas.mpl_connect("draw_event", draws.append)
+    show(fig.canvas)
+    fake_browser.run_frame()
+    fake_browser.run_frame()
+    assert fig.canvas._drawn_tiles == {(0, 0), (0, 1), (0, 2)}
+    assert len(draws) == 1
+
+
+def test_tiled_resize_lays_out_tiles(fake_browser):
+    canvas, uploads = show_tiled(fake_browser, visible_rows={0, 1, 2})
+    canvas.set_canvas_size(600, 1200)
+    fake_browser.run_frame()
+    tiles = sorted(name for name in canvas._elements if name.startswith("tile:"))
+    assert tiles == [f"tile:{col}:{row}" for col in (0, 1) for row in (0, 1, 2)]
+    assert len(canvas.get_element("tiles").children) == 6
+
+
+def test_tiled_rubberband(fake_browser):
+    canvas, _ = show_tiled(fake_browser, visible_rows={0})
+    box = canvas.get_element("rubberband_box")
+    canvas.draw_rubberband(10, 1190, 50, 1170)
+    assert (box.style.left, box.style.top) == ("10px", "10px")
+    assert (box.style.width, box.style.height) == ("40px", "20px")
+    assert box.style.display == "block"
+    canvas.remove_rubberband()
+    assert box.style.display == "none"
+
+
+def test_tiled_saved_whole(fake_browser):
+    canvas, _ = show_tiled(fake_browser, visible_rows={0})
+    assert canvas.get_renderer().width == 512
+    assert render_full(canvas.figure).shape == (1200, 400, 4)
+
+
+def test_tiled_destroy_releases_proxies(fake_browser):
+    canvas, _ = show_tiled(fake_browser, visible_rows={0})
+    assert canvas.get_live_proxies()["tile_observer"] == 1
+    canvas.destroy()
+    assert canvas.get_live_proxies() == {}
+    assert canvas._visible_tiles == set()
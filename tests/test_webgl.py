@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def line_segments(fake_browser):
+    from matplotlib_pyodide.webgl import line_segments
+
+    return line_segments
+
+
+def test_line_segments(line_segments):
+    segments = line_segments([(0, 0), (1, 0), (1, 1)], None)
+    assert segments.dtype == np.float32
+    np.testing.assert_array_equal(segments, [[0, 0, 1, 0], [1, 0, 1, 1]])
+
+
+def test_line_segments_breaks(line_segments):
+    from matplotlib.path import Path
+
+    vertices = [(0, 0), (1, 0), (np.nan, 0), (2, 0), (3, 0), (4, 4), (5, 5)]
+    codes = [Path.MOVETO] + [Path.LINETO] * 4 + [Path.MOVETO, Path.LINETO]
+    segments = line_segments(vertices, codes)
+    np.testing.assert_array_equal(segments, [[0, 0, 1, 0], [2, 0, 3, 0], [4, 4, 5, 5]])
+
+
+def test_line_segments_closed(line_segments):
+    from matplotlib.path import Path
+
+    path = Path([(0, 0), (1, 0), (1, 1), (0, 0)], closed=True)
+    segments = line_segments(path.vertices, path.codes)
+    np.testing.assert_array_equal(segments[-1], [1, 1, 0, 0])
+
+
+def test_line_segments_curves(line_segments):
+    from matplotlib.path import Path
+
+    assert line_segments(Path.unit_circle().vertices, Path.unit_circle().codes) is None
+
+
+def test_webgl_unavailable_fallback(fake_browser):
+    from matplotlib.figure import Figure
+
+    from matplotlib_pyodide.html5_canvas_backend import (
+        FigureCanvasHTMLCanvas,
+        FigureManagerHTMLCanvas,
+        RendererHTMLCanvas,
+    )
+
+    fig = Figure()
+    canvas = FigureCanvasHTMLCanvas(fig)
+    canvas.webgl = True
+    FigureManagerHTMLCanvas(canvas, 1)
+    fig.add_subplot().plot(np.random.default_rng(0).standard_normal(5000))
+    canvas.show()
+    fake_browser.log.clear()
+    canvas.draw()
+    # The stand-in has no WebGL: the line is drawn on the 2D canvas, and the
+    # WebGL context is only looked for once
+    assert canvas._webgl_unavailable
+    assert fake_browser.log.count("call", "lineTo") > 1000
+    canvas.draw()
+    assert fake_browser.log.count("alloc", "canvas") == 1
+    ctx = canvas.get_context()
+    assert type(canvas._make_renderer(ctx, 10, 10)) is RendererHTMLCanvas